@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
 from passlib.context import CryptContext
 from fastapi import Header, HTTPException
 
-from .db import get_conn, query, execute
+from .db import transaction, query, execute
 
 
 # Gunakan pbkdf2_sha256 (pure-Python, tanpa ketergantungan C seperti bcrypt)
@@ -21,36 +28,294 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+# pbkdf2 berjalan di hashlib (C) dan melepas GIL, jadi thread pool khusus sudah cukup
+# dan tidak berebut worker dengan threadpool default FastAPI.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "64"))
+
+
+class HasherBusy(RuntimeError):
+    """Antrian hashing penuh; request sebaiknya ditolak (503) daripada menumpuk."""
+
+
+class PasswordHasher:
+    """Executor terbatas untuk hash/verify password dengan API async."""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_queue: int = HASH_MAX_QUEUE):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwd-hash")
+            return self._executor
+
+    def _done(self, _fut) -> None:
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _submit(self, fn, *args) -> "asyncio.Future":
+        executor = self._get_executor()
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HasherBusy("Antrian hashing password penuh")
+            self._pending += 1
+            self.peak_queue_depth = max(self.peak_queue_depth, self._pending - self.workers)
+        fut = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        fut.add_done_callback(self._done)
+        return fut
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._submit(verify_password, password, password_hash)
+
+    @property
+    def queue_depth(self) -> int:
+        with self._lock:
+            return max(0, self._pending - self.workers)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._pending,
+                "queue_depth": max(0, self._pending - self.workers),
+                "peak_queue_depth": self.peak_queue_depth,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_hasher = PasswordHasher()
+
+
 def create_user(name: str, email: str, password: str) -> None:
-    conn = get_conn()
-    execute(
-        conn,
-        "INSERT INTO users(name,email,password_hash) VALUES(?,?,?)",
-        (name, email, hash_password(password)),
-    )
-    conn.close()
+    create_user_with_hash(name, email, hash_password(password))
+
+
+def create_user_with_hash(name: str, email: str, password_hash: str) -> None:
+    with transaction() as conn:
+        execute(
+            conn,
+            "INSERT INTO users(name,email,password_hash) VALUES(?,?,?)",
+            (name, email, password_hash),
+        )
 
 
 def find_user(email: str):
-    conn = get_conn()
-    rows = query(conn, "SELECT * FROM users WHERE email=?", (email,))
-    conn.close()
+    with transaction() as conn:
+        rows = query(conn, "SELECT * FROM users WHERE email=?", (email,))
     return rows[0] if rows else None
 
 
+# Masa berlaku token login (detik). <= 0 berarti token tidak pernah kedaluwarsa.
+TOKEN_TTL_SECONDS = int(os.getenv("TOKEN_TTL_SECONDS", str(30 * 24 * 3600)))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+# Interval (detik) cek auth_state.revocation_gen di DB. Logout di worker lain
+# terlihat paling lambat setelah interval ini, bukan setelah TOKEN_CACHE_TTL.
+TOKEN_REVOCATION_CHECK = float(os.getenv("TOKEN_REVOCATION_CHECK", "1"))
+
+
+@dataclass
+class _CacheEntry:
+    email: str
+    deadline: float  # epoch detik, entri dianggap basi setelah ini
+
+
+class TokenCache:
+    """
+    Cache LRU + TTL untuk token -> email, supaya request terautentikasi tidak selalu ke DB.
+
+    Hanya lookup positif yang disimpan. Setiap pencabutan token menaikkan
+    revocation_gen di DB; begitu generasi yang terlihat naik, seluruh cache dikosongkan
+    dan entri hasil lookup dari generasi lama ditolak oleh put().
+    """
+
+    def __init__(
+        self,
+        maxsize: int = TOKEN_CACHE_SIZE,
+        ttl: float = TOKEN_CACHE_TTL,
+        check_interval: float = TOKEN_REVOCATION_CHECK,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.check_interval = check_interval
+        self.generation = 0
+        self._checked_at = 0.0
+        self._data: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def needs_check(self) -> bool:
+        """True (sekali per interval) jika generasi di DB perlu dibaca ulang."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            return True
+
+    def advance(self, generation: int) -> None:
+        """Catat generasi pencabutan terbaru; kosongkan cache jika naik."""
+        with self._lock:
+            if generation > self.generation:
+                self.generation = generation
+                self._data.clear()
+
+    def get(self, token: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(token)
+            if entry is None or entry.deadline <= now:
+                if entry is not None:
+                    del self._data[token]
+                self.misses += 1
+                return None
+            self._data.move_to_end(token)
+            self.hits += 1
+            return entry.email
+
+    def put(
+        self, token: str, email: str, expires_at: Optional[float] = None, generation: Optional[int] = None
+    ) -> None:
+        """`generation` = revocation_gen saat lookup; hasil lookup yang sudah basi tidak disimpan."""
+        if self.maxsize <= 0:
+            return
+        deadline = time.time() + self.ttl
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        with self._lock:
+            if generation is not None and generation < self.generation:
+                return
+            self._data[token] = _CacheEntry(email, deadline)
+            self._data.move_to_end(token)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token: str) -> None:
+        with self._lock:
+            self._data.pop(token, None)
+
+    def invalidate_email(self, email: str) -> None:
+        with self._lock:
+            for token in [t for t, e in self._data.items() if e.email == email]:
+                del self._data[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+
+def _expiry_for_new_token() -> Tuple[Optional[str], Optional[float]]:
+    if TOKEN_TTL_SECONDS <= 0:
+        return None, None
+    expires_ts = time.time() + TOKEN_TTL_SECONDS
+    # format sama dengan CURRENT_TIMESTAMP SQLite (UTC) agar bisa dibandingkan langsung
+    expires_at = datetime.fromtimestamp(expires_ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return expires_at, expires_ts
+
+
 def issue_token(email: str) -> str:
     token = uuid.uuid4().hex
-    conn = get_conn()
-    execute(conn, "INSERT INTO tokens(token,email) VALUES(?,?)", (token, email))
-    conn.close()
+    expires_at, expires_ts = _expiry_for_new_token()
+    with transaction() as conn:
+        execute(conn, "INSERT INTO tokens(token,email,expires_at) VALUES(?,?,?)", (token, email, expires_at))
+    token_cache.put(token, email, expires_ts)
     return token
 
 
+def _revocation_generation(conn) -> int:
+    rows = query(conn, "SELECT revocation_gen FROM auth_state WHERE id=1")
+    return int(rows[0]["revocation_gen"]) if rows else 0
+
+
 def get_email_from_token(token: str) -> Optional[str]:
-    conn = get_conn()
-    rows = query(conn, "SELECT email FROM tokens WHERE token=?", (token,))
-    conn.close()
-    return rows[0]["email"] if rows else None
+    if token_cache.needs_check():
+        with transaction() as conn:
+            token_cache.advance(_revocation_generation(conn))
+    email = token_cache.get(token)
+    if email is not None:
+        return email
+    with transaction() as conn:
+        # generasi dibaca di transaksi yang sama dengan lookup token
+        generation = _revocation_generation(conn)
+        rows = query(
+            conn,
+            """
+            SELECT email, CAST(strftime('%s', expires_at) AS INTEGER) AS expires_ts
+            FROM tokens
+            WHERE token=? AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+            """,
+            (token,),
+        )
+    token_cache.advance(generation)
+    if not rows:
+        return None
+    email = rows[0]["email"]
+    token_cache.put(token, email, rows[0]["expires_ts"], generation)
+    return email
+
+
+def _revoke(sql: str, params: Tuple) -> None:
+    with transaction() as conn:
+        execute(conn, sql, params)
+        execute(conn, "UPDATE auth_state SET revocation_gen = revocation_gen + 1 WHERE id=1")
+        generation = _revocation_generation(conn)
+    token_cache.advance(generation)
+
+
+def revoke_token(token: str) -> None:
+    """Logout: hapus token dari DB dan cache (semua worker, lewat revocation_gen)."""
+    _revoke("DELETE FROM tokens WHERE token=?", (token,))
+
+
+def revoke_user_tokens(email: str) -> None:
+    """Cabut semua sesi milik user (misal setelah ganti password)."""
+    _revoke("DELETE FROM tokens WHERE email=?", (email,))
+
+
+def purge_expired_tokens() -> int:
+    with transaction() as conn:
+        cur = conn.execute("DELETE FROM tokens WHERE expires_at <= CURRENT_TIMESTAMP")
+        return cur.rowcount
 
 
 def user_from_auth(authorization: Optional[str] = Header(None)) -> str:
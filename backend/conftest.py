@@ -0,0 +1,19 @@
+"""
+Fixture bersama untuk test backend: DB aplikasi diarahkan ke file sementara,
+jadi test tidak pernah menulis ke backend/data/app.db.
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend import db
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _temporary_app_db(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(db, "DB_PATH", tmp_path_factory.mktemp("db") / "app.db")
+        db.close_pool()
+        db.init_db()
+        yield
+        db.close_pool()
@@ -1,17 +1,195 @@
 from __future__ import annotations
 
+import os
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Iterable, Tuple, Any
+from typing import Iterable, Iterator, List, Tuple, Any, Dict, Optional
 
 DB_PATH = Path(__file__).resolve().parent / "data" / "app.db"
 DB_PATH.parent.mkdir(exist_ok=True)
 
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# Diterapkan sekali saat koneksi dibuat, bukan per request.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",  # ~16 MB per koneksi
+    "PRAGMA mmap_size=268435456",  # 256 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+
+class PoolTimeout(RuntimeError):
+    """Tidak ada koneksi yang bebas dalam batas waktu tunggu."""
+
+
+class PooledConnection(sqlite3.Connection):
+    """Koneksi sqlite3 yang dikembalikan ke pool saat close() dipanggil."""
+
+    pool: Optional["ConnectionPool"] = None
+    in_block: bool = False
+
+    def close(self) -> None:
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+    def close_physical(self) -> None:
+        super().close()
+
+
+class ConnectionPool:
+    """Pool koneksi SQLite berukuran tetap (LIFO supaya koneksi yang hangat dipakai ulang)."""
+
+    def __init__(self, path: Optional[Path | str] = None, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        # None = DB_PATH saat ini (dibaca saat dipanggil, jadi bisa diganti oleh test)
+        self.path = str(DB_PATH if path is None else path)
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[PooledConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def _connect(self) -> PooledConnection:
+        conn = sqlite3.connect(self.path, factory=PooledConnection, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        if self._closed:
+            raise RuntimeError("Connection pool sudah ditutup")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+                    self.waits += 1
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                started = time.perf_counter()
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise PoolTimeout(f"Tidak ada koneksi DB bebas setelah {self.timeout}s")
+                finally:
+                    with self._lock:
+                        self.wait_seconds += time.perf_counter() - started
+        with self._lock:
+            self.checkouts += 1
+        return conn
+
+    def release(self, conn: PooledConnection) -> None:
+        conn.in_block = False
+        if conn.in_transaction:
+            # statement yang belum di-commit tidak boleh bocor ke request berikutnya
+            conn.rollback()
+        if self._closed:
+            conn.close_physical()
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close_physical()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            checkouts = self.checkouts
+            created = self._created
+            return {
+                "size": self.size,
+                "open": created,
+                "idle": self._idle.qsize(),
+                "checkouts": checkouts,
+                "waits": self.waits,
+                "wait_seconds": round(self.wait_seconds, 6),
+                "reuse_ratio": round((checkouts - created) / checkouts, 4) if checkouts else 0.0,
+            }
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def configure_pool(path: Optional[Path | str] = None, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT) -> ConnectionPool:
+    """Ganti pool global (misal untuk DB lain saat testing)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(path, size=size, timeout=timeout)
+    return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+
+
+def pool_stats() -> Dict[str, Any]:
+    return get_pool().stats()
+
 
 def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Ambil koneksi dari pool. Panggil conn.close() untuk mengembalikannya."""
+    return get_pool().acquire()
+
+
+@contextmanager
+def transaction() -> Iterator[sqlite3.Connection]:
+    """Kelompokkan semua statement dalam blok ke satu transaksi (satu commit)."""
+    conn = get_conn()
+    conn.in_block = True
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 def init_db():
@@ -81,6 +259,125 @@ def init_db():
     )
     conn.commit()
     conn.close()
+    migrate()
+
+
+# Migrasi berversi; versi yang sudah diterapkan disimpan di PRAGMA user_version.
+# Jangan ubah entri lama, tambahkan versi baru di akhir list.
+MIGRATIONS: List[Tuple[int, str]] = [
+    (
+        1,
+        """
+        -- rowid ikut di setiap index, jadi ORDER BY id juga terlayani
+        CREATE INDEX IF NOT EXISTS idx_tokens_email ON tokens(email);
+        CREATE INDEX IF NOT EXISTS idx_conversations_user_email ON conversations(user_email);
+        CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
+        CREATE INDEX IF NOT EXISTS idx_onboarding_email ON onboarding(email);
+        CREATE INDEX IF NOT EXISTS idx_subskill_scores_email ON subskill_scores(email);
+        CREATE INDEX IF NOT EXISTS idx_progress_email_course ON progress(email, course_id);
+        CREATE INDEX IF NOT EXISTS idx_progress_email_updated ON progress(email, updated_at);
+        """,
+    ),
+    (
+        2,
+        """
+        -- NULL = token lama tanpa masa berlaku
+        ALTER TABLE tokens ADD COLUMN expires_at TIMESTAMP;
+        CREATE INDEX IF NOT EXISTS idx_tokens_expires_at ON tokens(expires_at);
+        """,
+    ),
+    (
+        3,
+        """
+        -- stok soal assessment hasil pre-generate Gemini (lihat ml/question_pool.py)
+        CREATE TABLE IF NOT EXISTS generated_questions(
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subskill_key TEXT NOT NULL,
+            subskill TEXT NOT NULL,
+            question TEXT NOT NULL,
+            options TEXT NOT NULL,
+            answer TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(subskill_key, question)
+        );
+        -- subskill yang diminta tetapi kurang soal di dataset
+        CREATE TABLE IF NOT EXISTS question_demand(
+            subskill_key TEXT PRIMARY KEY,
+            subskill TEXT NOT NULL,
+            requests INTEGER NOT NULL DEFAULT 0,
+            last_requested TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ),
+    (
+        4,
+        """
+        -- naik setiap ada token dicabut; cache token tiap worker membandingkan nilai ini
+        CREATE TABLE IF NOT EXISTS auth_state(
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revocation_gen INTEGER NOT NULL DEFAULT 0
+        );
+        INSERT OR IGNORE INTO auth_state(id, revocation_gen) VALUES (1, 0);
+        """,
+    ),
+    (
+        5,
+        """
+        -- lease job background lintas worker uvicorn; expires_at = epoch detik
+        CREATE TABLE IF NOT EXISTS worker_leases(
+            name TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+        """,
+    ),
+]
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return int(conn.execute("PRAGMA user_version").fetchone()[0])
+
+
+def _statements(sql: str) -> Iterator[str]:
+    """Pecah skrip migrasi menjadi statement tunggal (executescript selalu commit sendiri)."""
+    buf = ""
+    for line in sql.splitlines(keepends=True):
+        buf += line
+        if sqlite3.complete_statement(buf):
+            yield buf
+            buf = ""
+
+
+def migrate() -> int:
+    """Terapkan migrasi yang belum berjalan. Mengembalikan versi skema terbaru.
+
+    Setiap versi diterapkan di dalam BEGIN IMMEDIATE dan user_version dibaca ulang
+    setelah lock tulis didapat, jadi worker yang start bersamaan tidak menerapkan
+    migrasi yang sama dua kali.
+    """
+    conn = get_conn()
+    try:
+        current = schema_version(conn)
+        for version, sql in MIGRATIONS:
+            if version <= current:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current = schema_version(conn)
+                if version <= current:
+                    conn.rollback()
+                    continue
+                for stmt in _statements(sql):
+                    conn.execute(stmt)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            current = version
+        return current
+    finally:
+        conn.close()
 
 
 def query(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = ()) -> Iterable[sqlite3.Row]:
@@ -90,5 +387,7 @@ def query(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = ()) -> I
 
 def execute(conn: sqlite3.Connection, sql: str, params: Tuple[Any, ...] = ()) -> int:
     cur = conn.execute(sql, params)
-    conn.commit()
+    # di dalam transaction() commit dilakukan sekali di akhir blok
+    if not getattr(conn, "in_block", False):
+        conn.commit()
     return cur.lastrowid
@@ -1,13 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import os
+import statistics
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
 import httpx
-from typing import List
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from .response_cache import response_cache
 
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-lite")
 API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+STREAM_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:streamGenerateContent"
+# Batas waktu total per panggilan (antri semaphore + request), dalam detik
+GEMINI_DEADLINE = float(os.getenv("GEMINI_DEADLINE", "20"))
+# Streaming boleh berjalan lebih lama karena jawaban dikirim bertahap
+GEMINI_STREAM_DEADLINE = float(os.getenv("GEMINI_STREAM_DEADLINE", "60"))
+# Maksimal panggilan Gemini paralel per worker
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_KEEPALIVE = int(os.getenv("GEMINI_MAX_KEEPALIVE", "8"))
+
+OFFLINE_REPLY = "(Mode offline) Tetap semangat! Susun target kecil mingguan dan lanjutkan progresmu."
+DEFAULT_REPLY = "Terima kasih, tetap semangat!"
+UNAVAILABLE_REPLY = "(Layanan motivasi tidak tersedia) Tetap semangat dan lanjutkan belajar dengan langkah kecil."
 
 
 def _make_payload(parts: List[str]):
@@ -20,24 +40,318 @@ def _make_payload(parts: List[str]):
     }
 
 
-def generate_message(parts: List[str]) -> str:
+def _prompt_text(parts: List[str]) -> str:
+    return "\n".join(text for text in parts if text)
+
+
+class EmptyReply(Exception):
+    """Gemini tidak mengembalikan kandidat; tidak boleh masuk cache."""
+
+
+class StreamInterrupted(RuntimeError):
+    """Stream Gemini gagal setelah sebagian jawaban terkirim; jawabannya terpotong."""
+
+
+def _parse_reply(data: Dict[str, Any]) -> str:
+    candidates = data.get("candidates") or []
+    if candidates:
+        parts = candidates[0].get("content", {}).get("parts", [])
+        if parts:
+            return parts[0].get("text", DEFAULT_REPLY)
+    raise EmptyReply
+
+
+def _error_reply(exc: BaseException) -> str:
+    return f"(Layanan motivasi tidak tersedia) {exc}. Tetap semangat dan lanjutkan belajar dengan langkah kecil."
+
+
+# -------- Client sync (dipakai ulang, bukan dibuat per panggilan) --------
+_client: Optional[httpx.Client] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(
+                    timeout=GEMINI_DEADLINE,
+                    limits=httpx.Limits(max_keepalive_connections=GEMINI_MAX_KEEPALIVE),
+                )
+    return _client
+
+
+def _post(parts: List[str]) -> str:
+    resp = get_client().post(
+        f"{API_URL}?key={GEMINI_API_KEY}",
+        json=_make_payload(parts),
+    )
+    resp.raise_for_status()
+    return _parse_reply(resp.json())
+
+
+def generate_message(parts: List[str], call_site: Optional[str] = None, semantic_text: Optional[str] = None) -> str:
     if not GEMINI_API_KEY:
-        return "(Mode offline) Tetap semangat! Susun target kecil mingguan dan lanjutkan progresmu."
+        return OFFLINE_REPLY
 
     try:
-        with httpx.Client(timeout=20) as client:
-            resp = client.post(
-                f"{API_URL}?key={GEMINI_API_KEY}",
-                json=_make_payload(parts),
+        if call_site:
+            return response_cache.cached_call(
+                call_site, GEMINI_MODEL, _prompt_text(parts), lambda: _post(parts), semantic_text
             )
-            resp.raise_for_status()
-            data = resp.json()
-        candidates = data.get("candidates") or []
-        if candidates:
-            parts = candidates[0].get("content", {}).get("parts", [])
-            if parts:
-                return parts[0].get("text", "Terima kasih, tetap semangat!")
+        return _post(parts)
+    except EmptyReply:
+        return UNAVAILABLE_REPLY
     except Exception as exc:  # pragma: no cover (fallback)
-        return f"(Layanan motivasi tidak tersedia) {exc}. Tetap semangat dan lanjutkan belajar dengan langkah kecil."
+        return _error_reply(exc)
+
+
+# -------- Client async --------
+# AsyncClient & semaphore terikat ke event loop, jadi dibuat ulang bila loop berganti
+# (mis. beberapa asyncio.run di test/script).
+class _AsyncState:
+    def __init__(self):
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {
+            "calls": 0, "streams": 0, "stream_cache_hits": 0,
+            "in_flight": 0, "waiting": 0, "timeouts": 0, "cancelled": 0, "errors": 0,
+        }
+        # waktu sampai potongan teks pertama (detik), hanya untuk stream yang benar-benar ke Gemini
+        self.ttfb = deque(maxlen=500)
+        # aclose() client lama yang masih berjalan (referensi supaya task tidak di-GC)
+        self.closing: set = set()
+
+
+_async_state = _AsyncState()
+
+
+def _discard_client(old_loop: Optional[asyncio.AbstractEventLoop], client: Optional[httpx.AsyncClient]) -> None:
+    """Tutup client milik event loop lama sebelum diganti, supaya koneksinya tidak bocor."""
+    if client is None or client.is_closed:
+        return
+    if old_loop is not None and old_loop.is_running() and not old_loop.is_closed():
+        # loop lama masih hidup (thread lain): tutup di loop pemiliknya
+        asyncio.run_coroutine_threadsafe(client.aclose(), old_loop)
+        return
+
+    async def close_quietly():
+        try:
+            await client.aclose()
+        except Exception:
+            # transport milik loop yang sudah ditutup bisa gagal ditutup rapi; abaikan
+            pass
+
+    st = _async_state
+    task = asyncio.ensure_future(close_quietly())
+    st.closing.add(task)
+    task.add_done_callback(st.closing.discard)
+
+
+def _async_resources():
+    loop = asyncio.get_running_loop()
+    st = _async_state
+    if st.loop is not loop or st.client is None or st.client.is_closed:
+        _discard_client(st.loop, st.client)
+        st.loop = loop
+        st.client = httpx.AsyncClient(
+            timeout=GEMINI_DEADLINE,
+            limits=httpx.Limits(
+                max_connections=GEMINI_MAX_CONCURRENCY,
+                max_keepalive_connections=GEMINI_MAX_KEEPALIVE,
+            ),
+        )
+        st.semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+    return st.client, st.semaphore
+
+
+@asynccontextmanager
+async def _slot():
+    """Ambil satu slot semaphore; menunggu dan yang sedang berjalan tercatat di stats."""
+    client, semaphore = _async_resources()
+    st = _async_state.stats
+    st["waiting"] += 1
+    try:
+        await semaphore.acquire()
+    finally:
+        st["waiting"] -= 1
+    st["in_flight"] += 1
+    try:
+        yield client
+    finally:
+        st["in_flight"] -= 1
+        semaphore.release()
+
+
+async def _post_async(parts: List[str]) -> str:
+    async with _slot() as client:
+        resp = await client.post(f"{API_URL}?key={GEMINI_API_KEY}", json=_make_payload(parts))
+        resp.raise_for_status()
+        return _parse_reply(resp.json())
+
+
+async def generate_message_async(
+    parts: List[str],
+    deadline: Optional[float] = None,
+    call_site: Optional[str] = None,
+    semantic_text: Optional[str] = None,
+) -> str:
+    """Versi non-blocking generate_message dengan deadline total & konkurensi terbatas.
+
+    Pembatalan task (mis. klien HTTP putus) diteruskan sebagai CancelledError dan
+    ikut membatalkan request ke Gemini. Jika call_site diisi, jawaban diambil dari /
+    disimpan ke response_cache.
+    """
+    if not GEMINI_API_KEY:
+        return OFFLINE_REPLY
+
+    st = _async_state.stats
+    st["calls"] += 1
+    if call_site:
+        call = response_cache.cached_call_async(
+            call_site, GEMINI_MODEL, _prompt_text(parts), lambda: _post_async(parts), semantic_text
+        )
+    else:
+        call = _post_async(parts)
+    try:
+        return await asyncio.wait_for(call, timeout=deadline or GEMINI_DEADLINE)
+    except asyncio.TimeoutError:
+        st["timeouts"] += 1
+        return _error_reply("batas waktu habis")
+    except asyncio.CancelledError:
+        st["cancelled"] += 1
+        raise
+    except EmptyReply:
+        return UNAVAILABLE_REPLY
+    except Exception as exc:
+        st["errors"] += 1
+        return _error_reply(exc)
+
+
+def _chunk_text(line: str) -> str:
+    """Ambil teks dari satu baris SSE `data: {...}` streamGenerateContent."""
+    if not line.startswith("data:"):
+        return ""
+    try:
+        data = json.loads(line[5:].strip())
+    except ValueError:
+        return ""
+    candidates = data.get("candidates") or []
+    if not candidates:
+        return ""
+    return "".join(p.get("text", "") for p in candidates[0].get("content", {}).get("parts", []))
+
+
+async def stream_message_async(
+    parts: List[str],
+    deadline: Optional[float] = None,
+    call_site: Optional[str] = None,
+    semantic_text: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Stream jawaban Gemini per potongan teks (streamGenerateContent, alt=sse).
+
+    Gangguan sebelum potongan pertama menghasilkan satu pesan fallback seperti
+    generate_message; gangguan di tengah stream menaikkan StreamInterrupted, jadi
+    pemanggil tahu teks yang sudah terkirim tidak lengkap. Cache hit dikirim sebagai
+    satu potongan; hanya stream yang selesai utuh yang disimpan ke cache.
+    """
+    if not GEMINI_API_KEY:
+        yield OFFLINE_REPLY
+        return
+
+    st = _async_state.stats
+    st["streams"] += 1
+    loop = asyncio.get_running_loop()
+    prompt = _prompt_text(parts)
+    if call_site:
+        hit = await asyncio.to_thread(response_cache.get, call_site, GEMINI_MODEL, prompt, semantic_text)
+        if hit is not None:
+            # bukan latensi upstream: jangan masuk metrik TTFB
+            st["stream_cache_hits"] += 1
+            yield hit
+            return
+    started = loop.time()
+    end = started + (deadline or GEMINI_STREAM_DEADLINE)
+    sent = False
+    chunks: List[str] = []
+    try:
+        async with _slot() as client:
+            async with client.stream(
+                "POST", f"{STREAM_URL}?alt=sse&key={GEMINI_API_KEY}", json=_make_payload(parts)
+            ) as resp:
+                resp.raise_for_status()
+                lines = resp.aiter_lines()
+                while True:
+                    remaining = end - loop.time()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    try:
+                        line = await asyncio.wait_for(lines.__anext__(), timeout=remaining)
+                    except StopAsyncIteration:
+                        break
+                    text = _chunk_text(line)
+                    if not text:
+                        continue
+                    if not sent:
+                        _async_state.ttfb.append(loop.time() - started)
+                        sent = True
+                    chunks.append(text)
+                    yield text
+    except asyncio.CancelledError:
+        st["cancelled"] += 1
+        raise
+    except asyncio.TimeoutError:
+        st["timeouts"] += 1
+        if sent:
+            raise StreamInterrupted("batas waktu habis") from None
+        yield _error_reply("batas waktu habis")
+        return
+    except Exception as exc:
+        st["errors"] += 1
+        if sent:
+            raise StreamInterrupted(str(exc) or type(exc).__name__) from exc
+        yield _error_reply(exc)
+        return
+    if not sent:
+        yield UNAVAILABLE_REPLY
+    elif call_site:
+        await asyncio.to_thread(response_cache.put, call_site, GEMINI_MODEL, prompt, "".join(chunks), semantic_text)
+
+
+def _ttfb_stats() -> Dict[str, Any]:
+    samples = sorted(_async_state.ttfb)
+    if not samples:
+        return {"count": 0}
+    return {
+        "count": len(samples),
+        "p50_ms": round(statistics.median(samples) * 1000, 1),
+        "p95_ms": round(samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000, 1),
+        "max_ms": round(samples[-1] * 1000, 1),
+    }
+
+
+def stats() -> Dict[str, Any]:
+    return dict(
+        _async_state.stats,
+        max_concurrency=GEMINI_MAX_CONCURRENCY,
+        deadline=GEMINI_DEADLINE,
+        stream_ttfb=_ttfb_stats(),
+        cache=response_cache.stats(),
+    )
+
 
-    return "(Layanan motivasi tidak tersedia) Tetap semangat dan lanjutkan belajar dengan langkah kecil."
+async def shutdown() -> None:
+    """Tutup koneksi yang masih terbuka saat aplikasi berhenti."""
+    global _client
+    st = _async_state
+    if st.client is not None:
+        await st.client.aclose()
+        st.client = None
+    st.loop = None
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+    response_cache.close()
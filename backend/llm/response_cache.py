@@ -0,0 +1,345 @@
+"""
+Cache jawaban LLM bersama untuk semua pemanggil Gemini.
+
+Lookup dua tahap:
+1. exact match: sha256 dari model + prompt yang dinormalisasi (spasi & huruf besar/kecil);
+2. opsional, kemiripan embedding untuk pertanyaan yang hampir sama. Hanya dicari di
+   antara entri dengan call site, model dan "scope" (prompt tanpa teks pertanyaan)
+   yang sama, jadi konteks lain (persona, daftar skill, dll) tetap harus identik.
+
+Disimpan di SQLite terpisah dari app.db, dengan TTL per call site dan eviction LRU
+berdasarkan jumlah entri dan total ukuran. Jumlah entri & ukuran dihitung berjalan di
+memori, jadi put() hanya menjalankan eviction saat batas terlampaui; entri kedaluwarsa
+dibersihkan (dan hitungan disinkronkan ulang dengan DB) paling sering tiap
+LLM_CACHE_PURGE_INTERVAL detik.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import numpy as np
+
+try:  # embedding opsional untuk lookup semantik
+    from sentence_transformers import SentenceTransformer  # type: ignore
+except Exception:  # pragma: no cover
+    SentenceTransformer = None
+
+
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", str(Path(__file__).resolve().parents[1] / "data" / "llm_cache.db")))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "64"))
+LLM_CACHE_PURGE_INTERVAL = float(os.getenv("LLM_CACHE_PURGE_INTERVAL", "300"))
+# Lookup semantik aktif hanya jika diminta dan sentence-transformers tersedia
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "0") == "1"
+LLM_CACHE_EMBED_MODEL = os.getenv("LLM_CACHE_EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+LLM_CACHE_SIM_THRESHOLD = float(os.getenv("LLM_CACHE_SIM_THRESHOLD", "0.95"))
+
+# TTL per call site (detik). Prompt deteksi role/skill praktis statis, jawaban chat lebih cepat basi.
+CALL_SITE_TTLS = {
+    "bot_reply": 6 * 3600,
+    "detect_job_role": 30 * 86400,
+    "detect_skills": 30 * 86400,
+    "generate_questions": 86400,
+    "learning_strategy": 86400,
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    call_site TEXT NOT NULL,
+    model TEXT NOT NULL,
+    scope TEXT,
+    response TEXT NOT NULL,
+    embedding BLOB,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at);
+CREATE INDEX IF NOT EXISTS idx_llm_cache_scope ON llm_cache(call_site, model, scope);
+"""
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS_RE.sub(" ", prompt).strip().casefold()
+
+
+def _digest(*parts: str) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: Path | str = LLM_CACHE_PATH,
+        default_ttl: float = LLM_CACHE_TTL,
+        ttls: Optional[Dict[str, float]] = None,
+        max_entries: int = LLM_CACHE_MAX_ENTRIES,
+        max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024),
+        embedder: Optional[Callable[[str], np.ndarray]] = None,
+        sim_threshold: float = LLM_CACHE_SIM_THRESHOLD,
+        purge_interval: float = LLM_CACHE_PURGE_INTERVAL,
+    ):
+        self.path = Path(path)
+        self.default_ttl = default_ttl
+        self.ttls = dict(CALL_SITE_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.embedder = embedder
+        self.sim_threshold = sim_threshold
+        self.purge_interval = purge_interval
+        self._conn: Optional[sqlite3.Connection] = None
+        # hitungan berjalan; disinkronkan ulang dari DB saat purge (worker lain ikut menulis)
+        self._entries = 0
+        self._bytes = 0
+        self._purged_at = 0.0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0}
+        )
+        self.evictions = 0
+
+    # ---- storage ----
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            self._resync(conn)
+        return self._conn
+
+    def _resync(self, db: sqlite3.Connection) -> None:
+        self._entries, self._bytes = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def ttl_for(self, call_site: str) -> float:
+        return self.ttls.get(call_site, self.default_ttl)
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        if self.embedder is None or not text:
+            return None
+        vec = np.asarray(self.embedder(text), dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else None
+
+    @staticmethod
+    def _keys(model: str, prompt: str, semantic_text: Optional[str]):
+        norm = normalize_prompt(prompt)
+        key = _digest(model, norm)
+        scope = None
+        if semantic_text:
+            scope = _digest(model, norm.replace(normalize_prompt(semantic_text), "\0"))
+        return key, scope
+
+    # ---- lookup ----
+    def get(self, call_site: str, model: str, prompt: str, semantic_text: Optional[str] = None) -> Optional[str]:
+        key, scope = self._keys(model, prompt, semantic_text)
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                "SELECT response FROM llm_cache WHERE key=? AND expires_at>?", (key, now)
+            ).fetchone()
+            if row is not None:
+                db.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (now, key))
+                db.commit()
+                self._stats[call_site]["hits"] += 1
+                return row[0]
+        if scope is not None:
+            hit = self._semantic_get(call_site, model, scope, semantic_text, now)
+            if hit is not None:
+                return hit
+        with self._lock:
+            self._stats[call_site]["misses"] += 1
+        return None
+
+    def _semantic_get(self, call_site, model, scope, semantic_text, now) -> Optional[str]:
+        query = self._embed(semantic_text)
+        if query is None:
+            return None
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT key, response, embedding FROM llm_cache "
+                "WHERE call_site=? AND model=? AND scope=? AND expires_at>? AND embedding IS NOT NULL",
+                (call_site, model, scope, now),
+            ).fetchall()
+        if not rows:
+            return None
+        matrix = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+        if matrix.shape[1] != query.shape[0]:
+            return None
+        sims = matrix @ query
+        best = int(np.argmax(sims))
+        if float(sims[best]) < self.sim_threshold:
+            return None
+        with self._lock:
+            db = self._db()
+            db.execute("UPDATE llm_cache SET last_used=? WHERE key=?", (now, rows[best][0]))
+            db.commit()
+            self._stats[call_site]["semantic_hits"] += 1
+        return rows[best][1]
+
+    def put(
+        self,
+        call_site: str,
+        model: str,
+        prompt: str,
+        response: str,
+        semantic_text: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        key, scope = self._keys(model, prompt, semantic_text)
+        emb = self._embed(semantic_text) if scope is not None else None
+        now = time.time()
+        ttl = self.ttl_for(call_site) if ttl is None else ttl
+        size = len(response.encode("utf-8")) + (emb.nbytes if emb is not None else 0)
+        with self._lock:
+            db = self._db()
+            old = db.execute("SELECT size FROM llm_cache WHERE key=?", (key,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_cache(key,call_site,model,scope,response,embedding,size,created_at,expires_at,last_used) "
+                "VALUES(?,?,?,?,?,?,?,?,?,?)",
+                (key, call_site, model, scope, response, emb.tobytes() if emb is not None else None, size, now, now + ttl, now),
+            )
+            if old is None:
+                self._entries += 1
+            else:
+                self._bytes -= old[0]
+            self._bytes += size
+            self._stats[call_site]["stores"] += 1
+            if now - self._purged_at >= self.purge_interval:
+                self._purge_expired(db, now)
+            if self._over_limit():
+                self._evict_lru(db)
+            db.commit()
+
+    def _over_limit(self) -> bool:
+        return self._entries > self.max_entries or self._bytes > self.max_bytes
+
+    def _purge_expired(self, db: sqlite3.Connection, now: float) -> None:
+        self.evictions += db.execute("DELETE FROM llm_cache WHERE expires_at<=?", (now,)).rowcount
+        self._resync(db)
+        self._purged_at = now
+
+    def _evict_lru(self, db: sqlite3.Connection) -> None:
+        # hapus entri yang paling lama tidak dipakai sampai kembali di bawah batas
+        drop, freed = 0, 0
+        for (size,) in db.execute("SELECT size FROM llm_cache ORDER BY last_used"):
+            if self._entries - drop <= self.max_entries and self._bytes - freed <= self.max_bytes:
+                break
+            drop += 1
+            freed += size
+        db.execute(
+            "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)", (drop,)
+        )
+        self._entries -= drop
+        self._bytes -= freed
+        self.evictions += drop
+
+    def clear(self) -> None:
+        with self._lock:
+            db = self._db()
+            db.execute("DELETE FROM llm_cache")
+            db.commit()
+            self._entries = self._bytes = 0
+
+    # ---- pembungkus panggilan ----
+    def cached_call(
+        self,
+        call_site: str,
+        model: str,
+        prompt: str,
+        fn: Callable[[], str],
+        semantic_text: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> str:
+        """Kembalikan jawaban dari cache, atau panggil fn() dan simpan hasilnya.
+
+        Exception dari fn() diteruskan dan tidak pernah di-cache.
+        """
+        hit = self.get(call_site, model, prompt, semantic_text)
+        if hit is not None:
+            return hit
+        response = fn()
+        if response:
+            self.put(call_site, model, prompt, response, semantic_text, ttl)
+        return response
+
+    async def cached_call_async(
+        self,
+        call_site: str,
+        model: str,
+        prompt: str,
+        fn: Callable[[], Awaitable[str]],
+        semantic_text: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ) -> str:
+        hit = await asyncio.to_thread(self.get, call_site, model, prompt, semantic_text)
+        if hit is not None:
+            return hit
+        response = await fn()
+        if response:
+            await asyncio.to_thread(self.put, call_site, model, prompt, response, semantic_text, ttl)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sites = {}
+            for site, s in self._stats.items():
+                lookups = s["hits"] + s["semantic_hits"] + s["misses"]
+                sites[site] = dict(s, hit_rate=round((s["hits"] + s["semantic_hits"]) / lookups, 3) if lookups else 0.0)
+            entries = 0
+            if self._conn is not None:
+                entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            return {
+                "entries": entries,
+                "evictions": self.evictions,
+                "semantic": self.embedder is not None,
+                "call_sites": sites,
+            }
+
+
+def _default_embedder() -> Optional[Callable[[str], np.ndarray]]:
+    if not LLM_CACHE_SEMANTIC or SentenceTransformer is None:
+        return None
+    model = None
+    lock = threading.Lock()
+
+    def embed(text: str) -> np.ndarray:
+        nonlocal model
+        if model is None:
+            with lock:
+                if model is None:
+                    model = SentenceTransformer(LLM_CACHE_EMBED_MODEL)
+        return model.encode(text, normalize_embeddings=True)
+
+    return embed
+
+
+response_cache = ResponseCache(embedder=_default_embedder())
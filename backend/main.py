@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, HTTPException, Header
+from fastapi import FastAPI, Depends, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -25,6 +25,42 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/db")
+def health_db():
+    return {"status": "ok", "pool": pool_stats()}
+
+
+@app.get("/health/auth")
+def health_auth():
+    return {"status": "ok", "token_cache": token_cache.stats(), "hasher": password_hasher.stats()}
+
+
+@app.get("/health/catalog")
+def health_catalog():
+    return {"status": "ok", "catalog": supabase_client.catalog_cache.stats()}
+
+
+@app.get("/health/llm")
+def health_llm():
+    return {
+        "status": "ok",
+        "gemini": gemini_client.stats(),
+        "job_role": job_role_stats(),
+        "question_pool": question_pool.stats(),
+    }
+
+
+@app.get("/health/embeddings")
+def health_embeddings():
+    recommender = ml_advanced._course_recommender
+    encoder = recommender.encoder if recommender is not None else None
+    return {
+        "status": "ok",
+        "query_cache": query_embedding_cache.stats(),
+        "encoder": encoder.stats() if encoder is not None else None,
+    }
+
+
 @app.post("/chat")
 def chat(req: ChatRequest):
     text = req.message.strip()
@@ -32,16 +68,48 @@ def chat(req: ChatRequest):
     return {"reply": reply}
 
 # -------- Data endpoints (membaca .xlsx lokal) --------
+import asyncio
+import json
 from typing import Optional, List
+from fastapi.responses import StreamingResponse
 from fastapi import Query
 from .services.data_loader import load_excel_as_records
-from .db import init_db, get_conn, execute, query
-from .auth import create_user, find_user, verify_password, issue_token, get_email_from_token
+from .db import init_db, close_pool, transaction, execute, query, pool_stats
+from .auth import (
+    create_user_with_hash,
+    find_user,
+    issue_token,
+    get_email_from_token,
+    revoke_token,
+    purge_expired_tokens,
+    token_cache,
+    password_hasher,
+    HasherBusy,
+)
+from .utils import supabase_client
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
 
 
 # Inisialisasi DB saat start
 init_db()
+purge_expired_tokens()
+
+
+@app.on_event("startup")
+async def startup_resources():
+    await supabase_client.startup()
+    question_pool.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    await supabase_client.shutdown()
+    await gemini_client.shutdown()
+    question_pool.stop()
+    query_embedding_cache.close()
+    password_hasher.shutdown()
+    close_pool()
 
 
 @app.get("/data/lp_course_mapping")
@@ -60,11 +128,16 @@ def resource_data(sheet: Optional[str] = Query(default=None)):
 # Mount routers
 from .routes.recommend import router as recommend_router
 from .routes.assessment import router as assessment_router
+from .routes import ml_advanced
 from .routes.ml_advanced import router as ml_router
 from .routes.progress import router as progress_router, build_progress_text
 # from .routes.ml_advanced import router as ml_advanced_router  # ✨ BARU
 from .ml.simple_nlp import recommend_by_query
-from .llm.gemini_client import generate_message
+from .ml.job_detector import job_role_stats
+from .ml.question_pool import question_pool
+from .ml.query_embedding_cache import query_embedding_cache
+from .llm import gemini_client
+from .llm.gemini_client import generate_message_async, stream_message_async
 from .auth import user_from_auth
 
 app.include_router(recommend_router)
@@ -87,23 +160,41 @@ class LoginReq(BaseModel):
 
 
 @app.post("/auth/register")
-def register(req: RegisterReq):
-    if find_user(req.email):
+async def register(req: RegisterReq):
+    if await run_in_threadpool(find_user, req.email):
         raise HTTPException(400, "Email sudah terdaftar")
-    create_user(req.name, req.email, req.password)
-    token = issue_token(req.email)
+    try:
+        password_hash = await password_hasher.hash(req.password)
+    except HasherBusy:
+        raise HTTPException(503, "Server sedang sibuk, coba lagi sebentar")
+    await run_in_threadpool(create_user_with_hash, req.name, req.email, password_hash)
+    token = await run_in_threadpool(issue_token, req.email)
     return {"token": token, "email": req.email, "name": req.name}
 
 
 @app.post("/auth/login")
-def login(req: LoginReq):
-    user = find_user(req.email)
-    if not user or not verify_password(req.password, user["password_hash"]):
+async def login(req: LoginReq):
+    user = await run_in_threadpool(find_user, req.email)
+    if not user:
         raise HTTPException(401, "Email atau password salah")
-    token = issue_token(req.email)
+    try:
+        ok = await password_hasher.verify(req.password, user["password_hash"])
+    except HasherBusy:
+        raise HTTPException(503, "Server sedang sibuk, coba lagi sebentar")
+    if not ok:
+        raise HTTPException(401, "Email atau password salah")
+    token = await run_in_threadpool(issue_token, req.email)
     return {"token": token, "email": req.email, "name": user["name"]}
 
 
+@app.post("/auth/logout")
+def logout(authorization: Optional[str] = Header(None)):
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(401, "Token tidak ditemukan")
+    revoke_token(authorization.split(" ", 1)[1])
+    return {"status": "ok"}
+
+
 def user_from_auth(authorization: Optional[str] = Header(None)) -> str:
     if not authorization or not authorization.lower().startswith("bearer "):
         raise HTTPException(401, "Token tidak ditemukan")
@@ -123,13 +214,12 @@ class OnboardingReq(BaseModel):
 
 @app.post("/onboarding")
 def save_onboarding(req: OnboardingReq, email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    execute(
-        conn,
-        "INSERT INTO onboarding(email,role,experience,goal) VALUES(?,?,?,?)",
-        (email, req.role, req.experience, req.goal),
-    )
-    conn.close()
+    with transaction() as conn:
+        execute(
+            conn,
+            "INSERT INTO onboarding(email,role,experience,goal) VALUES(?,?,?,?)",
+            (email, req.role, req.experience, req.goal),
+        )
     return {"status": "ok"}
 
 
@@ -148,44 +238,38 @@ class NewConvReq(BaseModel):
 
 @app.post("/conversations")
 def create_conversation(req: NewConvReq, email: str = Depends(user_from_auth)):
-    conn = get_conn()
     title = req.title or "Obrolan baru"
-    cid = execute(conn, "INSERT INTO conversations(user_email,title) VALUES(?,?)", (email, title))
-    conn.close()
+    with transaction() as conn:
+        cid = execute(conn, "INSERT INTO conversations(user_email,title) VALUES(?,?)", (email, title))
     return {"id": cid, "title": title}
 
 
 @app.delete("/conversations/{cid}")
 def delete_conversation(cid: int, email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    rows = query(conn, "SELECT user_email FROM conversations WHERE id=?", (cid,))
-    if not rows or rows[0]["user_email"] != email:
-        conn.close()
-        raise HTTPException(404, "Percakapan tidak ditemukan")
-    execute(conn, "DELETE FROM messages WHERE conversation_id=?", (cid,))
-    execute(conn, "DELETE FROM conversations WHERE id=?", (cid,))
-    conn.close()
+    with transaction() as conn:
+        rows = query(conn, "SELECT user_email FROM conversations WHERE id=?", (cid,))
+        if not rows or rows[0]["user_email"] != email:
+            raise HTTPException(404, "Percakapan tidak ditemukan")
+        execute(conn, "DELETE FROM messages WHERE conversation_id=?", (cid,))
+        execute(conn, "DELETE FROM conversations WHERE id=?", (cid,))
     return {"status": "deleted"}
 
 
 @app.get("/conversations")
 def list_conversations(email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    rows = query(conn, "SELECT id,title,created_at FROM conversations WHERE user_email=? ORDER BY id DESC", (email,))
-    conn.close()
+    with transaction() as conn:
+        rows = query(conn, "SELECT id,title,created_at FROM conversations WHERE user_email=? ORDER BY id DESC", (email,))
     return [dict(r) for r in rows]
 
 
 @app.get("/conversations/{cid}/messages")
 def get_messages(cid: int, email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    # verifikasi kepemilikan
-    rows = query(conn, "SELECT user_email FROM conversations WHERE id=?", (cid,))
-    if not rows or rows[0]["user_email"] != email:
-        conn.close()
-        raise HTTPException(404, "Percakapan tidak ditemukan")
-    msgs = query(conn, "SELECT role,text,created_at FROM messages WHERE conversation_id=? ORDER BY id ASC", (cid,))
-    conn.close()
+    with transaction() as conn:
+        # verifikasi kepemilikan
+        rows = query(conn, "SELECT user_email FROM conversations WHERE id=?", (cid,))
+        if not rows or rows[0]["user_email"] != email:
+            raise HTTPException(404, "Percakapan tidak ditemukan")
+        msgs = query(conn, "SELECT role,text,created_at FROM messages WHERE conversation_id=? ORDER BY id ASC", (cid,))
     return [dict(m) for m in msgs]
 
 
@@ -193,8 +277,7 @@ class NewMessageReq(BaseModel):
     text: str
 
 
-async def bot_reply(text: str, email: str) -> str:
-    """Semua dialog diarahkan ke Gemini dengan konteks profil & progres."""
+def _build_prompt(text: str, email: str) -> List[str]:
     info = get_latest_onboarding(email) or {}
     persona = f"Role: {info.get('role') or '-'}, Level: {info.get('experience') or '-'}, Goal: {info.get('goal') or '-'}"
     progress_summary = build_progress_text(email)
@@ -203,62 +286,136 @@ async def bot_reply(text: str, email: str) -> str:
         "Jawablah singkat (maks 3 paragraf), beri langkah praktis & rekomendasi kursus relevan. "
         "Jika data terbatas, jelaskan apa yang perlu pengguna lengkapi."
     )
-    prompt = [
+    return [
         prompt_intro,
         f"Persona pengguna: {persona}",
         f"Ringkasan progres: {progress_summary}",
         f"Pertanyaan terbaru: {text}",
     ]
+
+
+def _fallback_reply(text: str) -> str:
+    # Fallback manual jika GEMINI_API_KEY belum di-set/ada gangguan koneksi.
+    items = recommend_by_query(text, limit=3)
+    if items:
+        rows = []
+        for item in items:
+            name = item.get("name") or item.get("title") or item.get("course_name") or "Kursus Dicoding"
+            level = item.get("level") or item.get("course_level") or item.get("category") or ""
+            rows.append(f"- {name}{f' ({level})' if level else ''}")
+        return (
+            "Mode Gemini belum aktif, berikut opsi yang tetap bisa kamu eksplor:\n"
+            + "\n".join(rows)
+            + "\nKlik Mulai di Dashboard untuk menyimpan progresnya."
+        )
+    return "Server AI belum siap. Set GEMINI_API_KEY dan jalankan ulang backend untuk jawaban optimal."
+
+
+async def bot_reply(text: str, email: str) -> str:
+    """Semua dialog diarahkan ke Gemini dengan konteks profil & progres."""
+    # akses DB (pool bisa menunggu koneksi) tidak boleh memblokir event loop
+    prompt = await run_in_threadpool(_build_prompt, text, email)
     try:
-        return generate_message(prompt)
+        return await generate_message_async(prompt, call_site="bot_reply", semantic_text=text)
     except Exception:
-        # Fallback manual jika GEMINI_API_KEY belum di-set/ada gangguan koneksi.
-        items = recommend_by_query(text, limit=3)
-        if items:
-            rows = []
-            for item in items:
-                name = item.get("name") or item.get("title") or item.get("course_name") or "Kursus Dicoding"
-                level = item.get("level") or item.get("course_level") or item.get("category") or ""
-                rows.append(f"- {name}{f' ({level})' if level else ''}")
-            return (
-                "Mode Gemini belum aktif, berikut opsi yang tetap bisa kamu eksplor:\n"
-                + "\n".join(rows)
-                + "\nKlik Mulai di Dashboard untuk menyimpan progresnya."
-            )
-        return "Server AI belum siap. Set GEMINI_API_KEY dan jalankan ulang backend untuk jawaban optimal."
+        return await run_in_threadpool(_fallback_reply, text)
 
 
-@app.post("/conversations/{cid}/messages")
-async def post_message(cid: int, req: NewMessageReq, email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    # verifikasi
-    rows = query(conn, "SELECT user_email FROM conversations WHERE id=?", (cid,))
-    if not rows or rows[0]["user_email"] != email:
-        conn.close()
-        raise HTTPException(404, "Percakapan tidak ditemukan")
-
-    execute(conn, "INSERT INTO messages(conversation_id,role,text) VALUES(?,?,?)", (cid, "user", req.text))
-    # update judul percakapan jika masih default
-    conv_rows = query(conn, "SELECT title FROM conversations WHERE id=?", (cid,))
-    if conv_rows:
-        current_title = conv_rows[0]["title"] or ""
-        snippet = req.text.strip()[:40]
+async def _cancel_on_disconnect(request: Request, coro, poll: float = 0.5):
+    """Jalankan coro, batalkan bila klien HTTP memutus koneksi sebelum selesai."""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(499, "Klien memutus koneksi")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _save_user_message(cid: int, text: str, email: str) -> None:
+    with transaction() as conn:
+        # verifikasi
+        rows = query(conn, "SELECT user_email, title FROM conversations WHERE id=?", (cid,))
+        if not rows or rows[0]["user_email"] != email:
+            raise HTTPException(404, "Percakapan tidak ditemukan")
+
+        execute(conn, "INSERT INTO messages(conversation_id,role,text) VALUES(?,?,?)", (cid, "user", text))
+        # update judul percakapan jika masih default
+        current_title = rows[0]["title"] or ""
+        snippet = text.strip()[:40]
         if current_title.lower().startswith("obrolan baru") and snippet:
             execute(conn, "UPDATE conversations SET title=? WHERE id=?", (snippet, cid))
-    reply = await bot_reply(req.text, email)
-    execute(conn, "INSERT INTO messages(conversation_id,role,text) VALUES(?,?,?)", (cid, "bot", reply))
-    conn.close()
+
+
+def _save_bot_message(cid: int, reply: str) -> None:
+    with transaction() as conn:
+        execute(conn, "INSERT INTO messages(conversation_id,role,text) VALUES(?,?,?)", (cid, "bot", reply))
+
+
+@app.post("/conversations/{cid}/messages")
+async def post_message(cid: int, req: NewMessageReq, request: Request, email: str = Depends(user_from_auth)):
+    # semua akses DB lewat threadpool: acquire() pool bisa menunggu hingga POOL_TIMEOUT
+    await run_in_threadpool(_save_user_message, cid, req.text, email)
+    # koneksi tidak ditahan selama menunggu jawaban LLM
+    reply = await _cancel_on_disconnect(request, bot_reply(req.text, email))
+    await run_in_threadpool(_save_bot_message, cid, reply)
     return {"reply": reply}
 
 
-def get_latest_onboarding(email: str):
-    conn = get_conn()
-    rows = query(
-        conn,
-        "SELECT role, experience, goal FROM onboarding WHERE email=? ORDER BY id DESC LIMIT 1",
-        (email,),
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/conversations/{cid}/messages/stream")
+async def post_message_stream(cid: int, req: NewMessageReq, email: str = Depends(user_from_auth)):
+    """Seperti post_message, tetapi jawaban dikirim bertahap sebagai Server-Sent Events.
+
+    Event: `chunk` {"text"} per potongan, lalu `done` {"reply"} setelah pesan bot
+    tersimpan. Jika Gemini gagal setelah potongan pertama, dikirim `error`
+    {"message", "partial"} dan jawaban terpotong tidak disimpan. Jika klien putus di
+    tengah jalan, pesan bot juga tidak disimpan.
+    """
+    await run_in_threadpool(_save_user_message, cid, req.text, email)
+    prompt = await run_in_threadpool(_build_prompt, req.text, email)
+
+    async def events():
+        chunks: List[str] = []
+        try:
+            async for piece in stream_message_async(prompt, call_site="bot_reply", semantic_text=req.text):
+                chunks.append(piece)
+                yield _sse("chunk", {"text": piece})
+        except Exception as exc:
+            if chunks:
+                # gagal setelah potongan pertama (StreamInterrupted): jangan simpan jawaban terpotong
+                print(f"⚠️ Stream Gemini terputus: {exc}")
+                yield _sse("error", {"message": "Jawaban terputus, silakan kirim ulang pesan.", "partial": "".join(chunks)})
+                return
+            reply = await run_in_threadpool(_fallback_reply, req.text)
+            chunks.append(reply)
+            yield _sse("chunk", {"text": reply})
+        reply = "".join(chunks)
+        await run_in_threadpool(_save_bot_message, cid, reply)
+        yield _sse("done", {"reply": reply})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
-    conn.close()
+
+
+def get_latest_onboarding(email: str):
+    with transaction() as conn:
+        rows = query(
+            conn,
+            "SELECT role, experience, goal FROM onboarding WHERE email=? ORDER BY id DESC LIMIT 1",
+            (email,),
+        )
     if rows:
         return dict(rows[0])
     return None
\ No newline at end of file
@@ -3,13 +3,22 @@ Assessment Engine untuk generate pertanyaan dari dataset atau Gemini AI
 """
 from __future__ import annotations
 
+import hashlib
+import os
 import re
 import random
-from typing import List, Dict, Any, Optional
+import sys
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Union
 from difflib import SequenceMatcher
 import pandas as pd
 
-from ..llm.gemini_client import GEMINI_API_KEY, API_URL
+from ..llm.gemini_client import GEMINI_API_KEY, GEMINI_MODEL, API_URL
+from ..llm.response_cache import response_cache
+from ..services.data_loader import resolve_excel, workbook_registry
+from ..services.datasets import load_frame
+from .question_pool import QUESTION_POOL_SYNC_FALLBACK, question_pool
 import httpx
 
 # ============================================
@@ -40,9 +49,161 @@ def calculate_level(correct: int, total: int) -> str:
 # ============================================
 
 
+def _answer_letter(options: List[str], correct_answer: Any) -> Optional[str]:
+    """Convert correct_answer (text) ke huruf (A/B/C/D)."""
+    if pd.isna(correct_answer):
+        return None
+    correct_text = str(correct_answer).strip()
+
+    # Exact match dulu
+    for i, opt in enumerate(options):
+        if opt.lower() == correct_text.lower():
+            return chr(65 + i)
+
+    # Fuzzy matching jika tidak ketemu
+    best_match_idx = 0
+    best_similarity = 0
+    for i, opt in enumerate(options):
+        similarity = SequenceMatcher(None, opt.lower(), correct_text.lower()).ratio()
+        if similarity > best_similarity:
+            best_similarity = similarity
+            best_match_idx = i
+
+    if best_similarity > 0.8:
+        return chr(65 + best_match_idx)
+    return None
+
+
+TECH_QUESTIONS_FILE = "Resource Data Learning Buddy.xlsx"
+TECH_QUESTIONS_SHEET = "Current Tech Questions"
+# Batas jumlah subskill ternormalisasi yang hasil pencariannya di-memo per bank (LRU)
+QUESTION_BANK_MEMO_SIZE = int(os.getenv("QUESTION_BANK_MEMO_SIZE", "1024"))
+QUESTION_COLUMNS = ["question_desc", "option_1", "option_2", "option_3", "option_4", "correct_answer"]
+
+
+class QuestionBank:
+    """
+    Bank soal "Current Tech Questions" yang dibangun sekali saat load.
+
+    Opsi terformat dan huruf jawaban dihitung di muka. Pencarian subskill memakai
+    inverted index trigram -> id soal (kandidat), lalu verifikasi substring pada
+    teks soal; hasilnya di-memo (LRU, maks memo_size subskill ternormalisasi),
+    sehingga request berikutnya hanya mengambil sampel id integer.
+    """
+
+    def __init__(self, tech_qs_df: pd.DataFrame, memo_size: int = QUESTION_BANK_MEMO_SIZE):
+        self.questions: List[Dict[str, Any]] = []
+        self._texts: List[str] = []
+        for row in tech_qs_df.itertuples(index=False):
+            options = [
+                str(row.option_1).strip(),
+                str(row.option_2).strip(),
+                str(row.option_3).strip(),
+                str(row.option_4).strip(),
+            ]
+            self.questions.append({
+                "question": row.question_desc,
+                "options": [f"{chr(65+i)}. {opt}" for i, opt in enumerate(options)],
+                "answer": _answer_letter(options, row.correct_answer),
+            })
+            self._texts.append(row.question_desc.lower() if isinstance(row.question_desc, str) else "")
+
+        self._trigrams: Dict[str, set] = {}
+        for qid, text in enumerate(self._texts):
+            for i in range(len(text) - 2):
+                self._trigrams.setdefault(text[i:i + 3], set()).add(qid)
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.questions)
+
+    def ids_for(self, subskill: str) -> Tuple[int, ...]:
+        """Id soal yang teksnya memuat subskill (case-insensitive, literal)."""
+        key = (subskill or "").lower()
+        with self._lock:
+            hit = self._memo.get(key)
+            if hit is not None:
+                self._memo.move_to_end(key)
+                return hit
+        if not key:
+            ids: Tuple[int, ...] = tuple(i for i, q in enumerate(self.questions) if isinstance(q["question"], str))
+        else:
+            if len(key) >= 3:
+                postings = [self._trigrams.get(key[i:i + 3], set()) for i in range(len(key) - 2)]
+                candidates = set.intersection(*sorted(postings, key=len))
+            else:
+                candidates = range(len(self._texts))
+            ids = tuple(qid for qid in sorted(candidates) if key in self._texts[qid])
+        if self.memo_size > 0:
+            with self._lock:
+                self._memo[key] = ids
+                self._memo.move_to_end(key)
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return ids
+
+    def sample(self, subskill: str, num_questions: int) -> Optional[List[Dict[str, Any]]]:
+        ids = self.ids_for(subskill)
+        if not ids:
+            return None
+        if len(ids) >= num_questions:
+            ids = random.sample(ids, num_questions)
+        # salinan, karena pemanggil boleh memodifikasi dict soal
+        return [dict(self.questions[qid], options=list(self.questions[qid]["options"])) for qid in ids]
+
+    def nbytes(self) -> int:
+        # perkiraan kasar: teks soal + opsi (~4x teks soal) + set id per trigram
+        text_bytes = sum(sys.getsizeof(t) for t in self._texts)
+        return text_bytes * 5 + sum(sys.getsizeof(ids) for ids in self._trigrams.values())
+
+
+def load_question_bank(
+    filename: str = TECH_QUESTIONS_FILE, sheet_name: str = TECH_QUESTIONS_SHEET
+) -> QuestionBank:
+    """QuestionBank bersama, disimpan di workbook_registry (dibangun ulang jika Excel berubah)."""
+    return workbook_registry.get_or_load(
+        resolve_excel(filename),
+        ("question_bank", sheet_name),
+        lambda _h: QuestionBank(load_frame(filename, sheet_name)),
+        lambda bank: bank.nbytes(),
+    )
+
+
+# Bank untuk pemanggil yang masih mengirim DataFrame, dikunci sidik jari isi kolom soal
+_FRAME_BANKS_SIZE = 4
+_frame_banks: "OrderedDict[bytes, QuestionBank]" = OrderedDict()
+_frame_banks_lock = threading.Lock()
+
+
+def _frame_fingerprint(df: pd.DataFrame) -> bytes:
+    """Hash isi kolom yang dipakai QuestionBank; sama untuk DataFrame dengan isi sama."""
+    hashes = pd.util.hash_pandas_object(df[QUESTION_COLUMNS], index=False).to_numpy()
+    return hashlib.blake2b(hashes.tobytes(), digest_size=16).digest()
+
+
+def _bank_for(source: Union[QuestionBank, pd.DataFrame]) -> QuestionBank:
+    if isinstance(source, QuestionBank):
+        return source
+    key = _frame_fingerprint(source)
+    with _frame_banks_lock:
+        bank = _frame_banks.get(key)
+        if bank is not None:
+            _frame_banks.move_to_end(key)
+            return bank
+    bank = QuestionBank(source)
+    with _frame_banks_lock:
+        bank = _frame_banks.setdefault(key, bank)
+        _frame_banks.move_to_end(key)
+        while len(_frame_banks) > _FRAME_BANKS_SIZE:
+            _frame_banks.popitem(last=False)
+    return bank
+
+
 def get_questions_for_subskill_from_dataset(
     subskill: str,
-    tech_qs_df: pd.DataFrame,
+    tech_qs_df: Union[QuestionBank, pd.DataFrame],
     num_questions: int = 3
 ) -> Optional[List[Dict[str, Any]]]:
     """
@@ -50,7 +211,7 @@ def get_questions_for_subskill_from_dataset(
     
     Args:
         subskill: Nama subskill
-        tech_qs_df: DataFrame Current Tech Questions
+        tech_qs_df: QuestionBank atau DataFrame Current Tech Questions
         num_questions: Jumlah pertanyaan yang diinginkan
     
     Returns:
@@ -61,67 +222,17 @@ def get_questions_for_subskill_from_dataset(
             "answer": "A" | "B" | "C" | "D" | None
         }
     """
-    filtered = tech_qs_df[
-        tech_qs_df['question_desc'].str.contains(subskill, case=False, na=False)
-    ]
-    
-    if len(filtered) >= num_questions:
-        filtered = filtered.sample(n=num_questions)
-    elif len(filtered) == 0:
-        return None
-    
-    questions = []
-    for _, row in filtered.iterrows():
-        options = [
-            str(row['option_1']).strip(),
-            str(row['option_2']).strip(),
-            str(row['option_3']).strip(),
-            str(row['option_4']).strip()
-        ]
-        
-        formatted_options = [f"{chr(65+i)}. {opt}" for i, opt in enumerate(options)]
-        
-        # Convert correct_answer (text) ke huruf (A/B/C/D)
-        answer_letter = None
-        if not pd.isna(row['correct_answer']):
-            correct_text = str(row['correct_answer']).strip()
-            
-            # Exact match dulu
-            for i, opt in enumerate(options):
-                if opt.lower() == correct_text.lower():
-                    answer_letter = chr(65 + i)
-                    break
-            
-            # Fuzzy matching jika tidak ketemu
-            if answer_letter is None:
-                best_match_idx = 0
-                best_similarity = 0
-                
-                for i, opt in enumerate(options):
-                    similarity = SequenceMatcher(None, opt.lower(), correct_text.lower()).ratio()
-                    if similarity > best_similarity:
-                        best_similarity = similarity
-                        best_match_idx = i
-                
-                if best_similarity > 0.8:
-                    answer_letter = chr(65 + best_match_idx)
-        
-        questions.append({
-            "question": row['question_desc'],
-            "options": formatted_options,
-            "answer": answer_letter
-        })
-    
-    return questions
+    return _bank_for(tech_qs_df).sample(subskill, num_questions)
 
 
-def generate_questions_gemini(subskill: str, num_questions: int = 3) -> List[Dict[str, Any]]:
+def generate_questions_gemini(subskill: str, num_questions: int = 3, use_cache: bool = True) -> List[Dict[str, Any]]:
     """
     Generate pertanyaan via Gemini AI jika dataset kurang.
     
     Args:
         subskill: Nama subskill
         num_questions: Jumlah pertanyaan
+        use_cache: False untuk selalu minta soal baru (dipakai question_pool)
     
     Returns:
         List dict dengan format sama seperti get_questions_for_subskill_from_dataset
@@ -148,7 +259,7 @@ def generate_questions_gemini(subskill: str, num_questions: int = 3) -> List[Dic
     D. jawaban4
     """
     
-    try:
+    def _call() -> str:
         with httpx.Client(timeout=30) as client:
             resp = client.post(
                 f"{API_URL}?key={GEMINI_API_KEY}",
@@ -163,7 +274,15 @@ def generate_questions_gemini(subskill: str, num_questions: int = 3) -> List[Dic
         if candidates:
             parts = candidates[0].get("content", {}).get("parts", [])
             if parts:
-                resp_text = parts[0].get("text", "").strip()
+                return parts[0].get("text", "").strip()
+        return ""
+
+    resp_text = ""
+    try:
+        if use_cache:
+            resp_text = response_cache.cached_call("generate_questions", GEMINI_MODEL, prompt, _call)
+        else:
+            resp_text = _call()
     except Exception as e:
         print(f"Error generate_questions_gemini: {e}")
         resp_text = ""
@@ -207,7 +326,7 @@ def generate_questions_gemini(subskill: str, num_questions: int = 3) -> List[Dic
 
 def prepare_assessment(
     detected_subskills: List[str],
-    tech_qs_df: pd.DataFrame,
+    tech_qs_df: Union[QuestionBank, pd.DataFrame],
     total_questions: int = 18
 ) -> Dict[str, List[Dict[str, Any]]]:
     """
@@ -215,7 +334,7 @@ def prepare_assessment(
     
     Args:
         detected_subskills: List subskill yang terdeteksi
-        tech_qs_df: DataFrame Current Tech Questions
+        tech_qs_df: QuestionBank (disarankan) atau DataFrame Current Tech Questions
         total_questions: Total pertanyaan (default 18)
     
     Returns:
@@ -224,16 +343,19 @@ def prepare_assessment(
     num_subskills = len(detected_subskills)
     questions_per_subskill = total_questions // num_subskills
     
+    bank = _bank_for(tech_qs_df)
     assessment = {}
     for subskill in detected_subskills:
-        questions = get_questions_for_subskill_from_dataset(
-            subskill, tech_qs_df, num_questions=questions_per_subskill
-        )
+        questions = bank.sample(subskill, questions_per_subskill)
         
         if questions is None or len(questions) < questions_per_subskill:
-            needed = questions_per_subskill if questions is None else questions_per_subskill - len(questions)
-            generated = generate_questions_gemini(subskill, num_questions=needed)
-            questions = (questions or []) + generated
+            questions = questions or []
+            # Soal kurang: ambil dari stok pre-generate, catat demand agar worker mengisi ulang
+            question_pool.record_demand(subskill)
+            questions += question_pool.take(subskill, questions_per_subskill - len(questions))
+            needed = questions_per_subskill - len(questions)
+            if needed > 0 and QUESTION_POOL_SYNC_FALLBACK:
+                questions += generate_questions_gemini(subskill, num_questions=needed)
         
         # Validasi format
         for i, q in enumerate(questions):
@@ -0,0 +1,195 @@
+"""
+Inverted index BM25 (varian Okapi, sama dengan rank_bm25.BM25Okapi) yang bisa
+diperbarui per dokumen.
+
+Posting list disimpan per term (doc -> tf), panjang dokumen dan IDF dihitung di
+muka. Pencarian hanya menyentuh posting list dari term query dan memakai heap
+untuk top-k, jadi tidak perlu menilai seluruh korpus tiap query.
+"""
+from __future__ import annotations
+
+import heapq
+import math
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._doc_len: Dict[Hashable, int] = {}
+        self._doc_terms: Dict[Hashable, Tuple[str, ...]] = {}
+        self._total_len = 0
+        self._idf: Dict[str, float] = {}
+        self._idf_dirty = False
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._doc_len
+
+    # ---- update ----
+    def add(self, doc_id: Hashable, tokens: Sequence[str]) -> None:
+        with self._lock:
+            if doc_id in self._doc_len:
+                self.remove(doc_id)
+            tf = Counter(tokens)
+            for term, freq in tf.items():
+                self._postings.setdefault(term, {})[doc_id] = freq
+            self._doc_terms[doc_id] = tuple(tf)
+            self._doc_len[doc_id] = len(tokens)
+            self._total_len += len(tokens)
+            self._idf_dirty = True
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            if doc_id not in self._doc_len:
+                return
+            for term in self._doc_terms.pop(doc_id):
+                plist = self._postings[term]
+                plist.pop(doc_id, None)
+                if not plist:
+                    del self._postings[term]
+            self._total_len -= self._doc_len.pop(doc_id)
+            self._idf_dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._doc_len.clear()
+            self._doc_terms.clear()
+            self._total_len = 0
+            self._idf.clear()
+            self._idf_dirty = False
+
+    def _refresh_idf(self) -> None:
+        # Rumus & floor epsilon sama dengan BM25Okapi supaya ranking tidak berubah
+        n_docs = len(self._doc_len)
+        idf: Dict[str, float] = {}
+        negative = []
+        for term, plist in self._postings.items():
+            value = math.log(n_docs - len(plist) + 0.5) - math.log(len(plist) + 0.5)
+            idf[term] = value
+            if value < 0:
+                negative.append(term)
+        if idf:
+            eps = self.epsilon * (sum(idf.values()) / len(idf))
+            for term in negative:
+                idf[term] = eps
+        self._idf = idf
+        self._idf_dirty = False
+
+    # ---- query ----
+    def search(
+        self, tokens: Iterable[str], k: int, tiebreak: Optional[Callable[[Hashable], Any]] = None
+    ) -> List[Tuple[Hashable, float]]:
+        """Top-k (doc_id, skor) untuk dokumen yang memuat minimal satu term query."""
+        with self._lock:
+            if not self._doc_len or k <= 0:
+                return []
+            if self._idf_dirty:
+                self._refresh_idf()
+            avgdl = self._total_len / len(self._doc_len) or 1.0
+            k1, b = self.k1, self.b
+            scores: Dict[Hashable, float] = {}
+            # term yang muncul berulang di query dihitung berulang, sama seperti get_scores
+            for term, q_count in Counter(tokens).items():
+                plist = self._postings.get(term)
+                if not plist:
+                    continue
+                weight = self._idf[term] * q_count * (k1 + 1)
+                for doc_id, tf in plist.items():
+                    norm = k1 * (1 - b + b * self._doc_len[doc_id] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf / (tf + norm)
+        if tiebreak is None:
+            return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return heapq.nlargest(k, scores.items(), key=lambda item: (item[1], tiebreak(item[0])))
+
+
+class CorpusIndex:
+    """BM25Index yang disinkronkan dengan list baris (mis. snapshot katalog kursus).
+
+    Selama objek snapshot sama, index dipakai ulang apa adanya. Jika snapshot
+    berganti, hanya baris yang teksnya berubah yang di-index ulang.
+    """
+
+    def __init__(
+        self,
+        text_fn: Callable[[Dict[str, Any]], str],
+        tokenizer: Callable[[str], List[str]],
+        key_fn: Optional[Callable[[Dict[str, Any]], Any]] = None,
+        **bm25_kwargs: Any,
+    ):
+        self.text_fn = text_fn
+        self.tokenizer = tokenizer
+        self.key_fn = key_fn
+        self.index = BM25Index(**bm25_kwargs)
+        self._source: Optional[list] = None
+        self._texts: Dict[Hashable, str] = {}
+        self._rows: Dict[Hashable, Dict[str, Any]] = {}
+        self._order: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._lock = threading.RLock()
+        self.rebuilds = 0
+
+    def _doc_keys(self, rows: Sequence[Dict[str, Any]]) -> List[Hashable]:
+        keys: List[Hashable] = []
+        seen = set()
+        for pos, row in enumerate(rows):
+            key = self.key_fn(row) if self.key_fn else None
+            if key is None or key in seen:
+                key = ("pos", pos)
+            seen.add(key)
+            keys.append(key)
+        return keys
+
+    def sync(self, rows: List[Dict[str, Any]]) -> None:
+        if rows is self._source:
+            return
+        with self._lock:
+            if rows is self._source:
+                return
+            keys = self._doc_keys(rows)
+            changed = False
+            for pos, (key, row) in enumerate(zip(keys, rows)):
+                text = self.text_fn(row)
+                if self._texts.get(key) != text:
+                    self.index.add(key, self.tokenizer(text))
+                    self._texts[key] = text
+                    changed = True
+                self._rows[key] = row
+                self._order[key] = pos
+            for key in set(self._rows) - set(keys):
+                self.index.remove(key)
+                del self._rows[key], self._texts[key], self._order[key]
+                changed = True
+            if changed:
+                self.rebuilds += 1
+            self._keys = keys
+            self._source = rows
+
+    def search(self, rows: List[Dict[str, Any]], query_tokens: List[str], limit: int) -> List[Dict[str, Any]]:
+        """Top-`limit` baris; sisanya diisi baris tanpa kecocokan sesuai urutan asli."""
+        with self._lock:
+            self.sync(rows)
+            order = self._order
+            # tie-break mengikuti urutan asli (stabil seperti sorted())
+            top = self.index.search(query_tokens, limit, tiebreak=lambda key: -order[key])
+            out = [self._rows[key] for key, _ in top]
+            if len(out) < limit:
+                matched = {key for key, _ in top}
+                for key in self._keys:
+                    if len(out) >= limit:
+                        break
+                    if key not in matched:
+                        out.append(self._rows[key])
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        return {"docs": len(self.index), "terms": len(self.index._postings), "rebuilds": self.rebuilds}
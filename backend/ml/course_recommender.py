@@ -1,12 +1,14 @@
 """
 Course Recommender menggunakan Sentence Transformers - 100% SESUAI NOTEBOOK
-FIXED: JSON compliant - removes NaN/Infinity values
+NaN/Infinity tidak dibersihkan di sini; diubah jadi null saat encode (utils.fast_json)
 """
 from __future__ import annotations
 
+import os
 import re
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Tuple, Union
 import pandas as pd
 import numpy as np
 
@@ -19,16 +21,38 @@ except ImportError:
     SentenceTransformer = None
     torch = None
 
-try:
-    from sklearn.metrics.pairwise import cosine_similarity
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
-    cosine_similarity = None
+from .embedding_index import EmbeddingIndex, normalize_rows, top_k_indices
+from .embedding_pipeline import ENCODE_BATCH_SIZE, refresh_store, row_hashes
+from .embedding_store import EMBEDDING_STORE_DTYPE, EmbeddingStore, corpus_hash, write_store
+from .encoder_service import BatchingEncoder
+from .query_embedding_cache import query_embedding_cache
+from .vector_index import VECTOR_INDEX_BACKEND, VectorIndex, build_index
+from ..services.datasets import load_frame
+from ..utils.fast_json import frame_records
 
 
 MODEL_NAME = "BAAI/bge-base-en-v1.5"
+LEVELS = ("Beginner", "Intermediate", "Advanced")
+# Format lama (torch pickle); hanya dibaca sekali untuk migrasi ke embedding store
 EMBEDDINGS_PATH = Path(__file__).parent / "models" / "course_embeddings.pt"
+EMBEDDING_STORE_PATH = Path(__file__).parent / "models" / "course_embeddings.emb"
+# (file, sheet) sumber data kursus: Learning Path Answer + Course
+LP_ANSWER_SOURCE = ("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
+COURSE_SOURCE = ("LP and Course Mapping.xlsx", "Course")
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """(inode, mtime_ns) file; berubah setiap kali store di-swap dengan os.replace."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+def load_course_frames() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """(lp_answer_df, course_df) terbaru; load_frame membaca ulang jika file Excel berubah."""
+    return load_frame(*LP_ANSWER_SOURCE), load_frame(*COURSE_SOURCE)
 
 
 def clean_text(text) -> str:
@@ -44,29 +68,6 @@ def clean_text(text) -> str:
     return text
 
 
-def clean_dataframe_for_json(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    ✅ FIXED: Clean DataFrame untuk JSON compliance
-    - Replace NaN dengan None
-    - Replace Infinity dengan None
-    - Convert numpy types ke Python native types
-    """
-    df = df.copy()
-    
-    # Replace NaN dan Infinity
-    df = df.replace([np.inf, -np.inf], None)
-    df = df.where(pd.notna(df), None)
-    
-    # Convert numpy types ke Python native
-    for col in df.columns:
-        if df[col].dtype == np.float64 or df[col].dtype == np.float32:
-            df[col] = df[col].astype(object).where(df[col].notna(), None)
-        elif df[col].dtype == np.int64 or df[col].dtype == np.int32:
-            df[col] = df[col].astype(object).where(df[col].notna(), None)
-    
-    return df
-
-
 class CourseRecommenderST:
     """
     Course Recommender dengan Sentence Transformer - 100% SESUAI NOTEBOOK.
@@ -75,7 +76,17 @@ class CourseRecommenderST:
     def __init__(self):
         self.model = None
         self.embeddings = None
+        self.store: Optional[EmbeddingStore] = None
+        self._store_stamp: Optional[Tuple[int, int]] = None
+        self.index: Optional[Union[EmbeddingIndex, VectorIndex]] = None
+        self.encoder: Optional[BatchingEncoder] = None
         self.lp_combined = None
+        # (lp_combined, records) — records hanya valid untuk frame yang sama
+        self._records: Optional[Tuple[pd.DataFrame, List[Dict[str, Any]]]] = None
+        # frame, store dan index selalu di-swap bersama di bawah lock ini
+        self._swap_lock = threading.Lock()
+        # sumber data kursus terbaru untuk refresh / reload (bisa diganti, mis. di test)
+        self.frame_loader: Callable[[], pd.DataFrame] = self.load_course_frame
         self.learning_path_mapping = {
             1: "AI Engineer",
             2: "Android Developer",
@@ -95,6 +106,7 @@ class CourseRecommenderST:
         if SENTENCE_TRANSFORMER_AVAILABLE:
             try:
                 self.model = SentenceTransformer(MODEL_NAME)
+                self.encoder = BatchingEncoder(self.model.encode)
             except Exception as e:
                 print(f"Failed to load Sentence Transformer: {e}")
     
@@ -108,15 +120,28 @@ class CourseRecommenderST:
         """
         self.prepare_courses(lp_answer_df, course_df)
         
-        # Auto load atau build embeddings
-        if not self.load_embeddings():
+        # Auto load atau rebuild embeddings (incremental dari store lama jika ada)
+        if not self.load_embeddings() and self.model is not None:
             print("🔄 Building new embeddings...")
-            self.build_embeddings(save=True)
+            print(self.refresh_embeddings())
+        self.warm_query_cache()
     
     def prepare_courses(self, lp_answer_df: pd.DataFrame, course_df: pd.DataFrame) -> pd.DataFrame:
         """
         Prepare course data - 100% PERSIS NOTEBOOK (tanpa fuzzy matching).
         """
+        lp_combined = self.build_course_frame(lp_answer_df, course_df)
+        with self._swap_lock:
+            self.lp_combined = lp_combined
+            self._records = None
+        return lp_combined
+    
+    def load_course_frame(self) -> pd.DataFrame:
+        """lp_combined dari isi Excel saat ini (tanpa mengubah state recommender)."""
+        return self.build_course_frame(*load_course_frames())
+    
+    def build_course_frame(self, lp_answer_df: pd.DataFrame, course_df: pd.DataFrame) -> pd.DataFrame:
+        """Gabungan Learning Path Answer + Course dengan combined_text, tanpa disimpan."""
         course_level_mapping = {
             1: "Beginner",
             2: "Beginner",
@@ -162,7 +187,10 @@ class CourseRecommenderST:
             lp_combined['tech_final']
         ).apply(clean_text)
         
-        self.lp_combined = lp_combined
+        # Kolom filter berulang di setiap baris → simpan sebagai category
+        for col in ('learning_path', 'course_level'):
+            lp_combined[col] = lp_combined[col].astype('category')
+        
         return lp_combined
     
     def build_embeddings(self, save: bool = True) -> Optional[Any]:
@@ -178,32 +206,179 @@ class CourseRecommenderST:
         
         texts = self.lp_combined['combined_text'].tolist()
         self.embeddings = self.model.encode(texts, show_progress_bar=True)
+        self.store = None
         
-        if save and torch is not None:
-            EMBEDDINGS_PATH.parent.mkdir(parents=True, exist_ok=True)
-            torch.save(self.embeddings, EMBEDDINGS_PATH)
-            print(f"Embeddings saved to {EMBEDDINGS_PATH}")
+        if save:
+            self._save_store(self.embeddings)
+        else:
+            self._build_index()
         
         return self.embeddings
     
+    def _corpus_hash(self, frame: Optional[pd.DataFrame] = None) -> str:
+        frame = self.lp_combined if frame is None else frame
+        return corpus_hash(frame['combined_text'].tolist())
+    
+    def _save_store(self, embeddings: Any) -> None:
+        """Simpan ke embedding store lalu pakai versi memmap-nya (dibagi antar worker)."""
+        texts = self.lp_combined['combined_text'].tolist()
+        write_store(
+            EMBEDDING_STORE_PATH, embeddings, MODEL_NAME, corpus_hash(texts), EMBEDDING_STORE_DTYPE,
+            row_hashes=row_hashes(texts),
+        )
+        print(f"Embeddings saved to {EMBEDDING_STORE_PATH} ({EMBEDDING_STORE_DTYPE})")
+        self._open_store(EmbeddingStore(EMBEDDING_STORE_PATH))
+    
+    def _open_store(self, store: EmbeddingStore, frame: Optional[pd.DataFrame] = None) -> None:
+        """Pakai store (dan frame kursus yang cocok); frame, store dan index di-swap bersama."""
+        frame = self.lp_combined if frame is None else frame
+        index = self._make_index(frame, store, store.matrix)
+        with self._swap_lock:
+            if frame is not self.lp_combined:
+                self.lp_combined = frame
+                self._records = None
+            self.store = store
+            self.embeddings = store.matrix
+            self._store_stamp = _file_stamp(store.path)
+            self.index = index
+    
     def load_embeddings(self) -> bool:
         """
-        Load embeddings dari file.
+        Load embeddings dari embedding store (np.memmap), valid hanya jika model dan
+        isi korpus sama. File .pt lama dimigrasikan sekali ke format store.
         """
-        if not EMBEDDINGS_PATH.exists():
-            return False
+        if self.lp_combined is None:
+            raise ValueError("Call prepare_courses() first")
         
-        if torch is None:
-            return False
+        try:
+            if EMBEDDING_STORE_PATH.exists():
+                store = EmbeddingStore(EMBEDDING_STORE_PATH)
+                if store.matches(MODEL_NAME, self._corpus_hash()) and len(store) == len(self.lp_combined):
+                    self._open_store(store)
+                    print(f"Embeddings loaded from {EMBEDDING_STORE_PATH} ({store.header['dtype']})")
+                    return True
+                print("Embedding store tidak cocok dengan data kursus saat ini")
+            
+            if EMBEDDINGS_PATH.exists() and torch is not None and not EMBEDDING_STORE_PATH.exists():
+                legacy = torch.load(EMBEDDINGS_PATH, weights_only=True)
+                if len(legacy) == len(self.lp_combined):
+                    self._save_store(legacy)
+                    return True
+        except Exception as e:
+            print(f"Failed to load embeddings: {e}")
+        return False
+    
+    def refresh_embeddings(self, batch_size: int = ENCODE_BATCH_SIZE, reload_data: bool = False) -> Dict[str, Any]:
+        """
+        Rebuild incremental: vektor baris yang teksnya tidak berubah dipakai ulang,
+        hanya baris baru/berubah yang di-encode, lalu store di-swap atomik.
+        reload_data=True membaca ulang data kursus (frame_loader) lebih dulu, jadi
+        perubahan di sheet Excel ikut masuk; frame baru dipakai bersama store barunya.
+        """
+        if not SENTENCE_TRANSFORMER_AVAILABLE or self.model is None:
+            raise RuntimeError("Sentence Transformer tidak tersedia")
+        frame = self.frame_loader() if reload_data else self.lp_combined
+        if frame is None:
+            raise ValueError("Call prepare_courses() first")
         
+        result = refresh_store(
+            EMBEDDING_STORE_PATH,
+            frame['combined_text'].tolist(),
+            MODEL_NAME,
+            self.model.encode,
+            EMBEDDING_STORE_DTYPE,
+            batch_size,
+        )
+        self._open_store(EmbeddingStore(EMBEDDING_STORE_PATH), frame)
+        return result
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Muat ulang store jika file-nya di-swap proses lain (CLI / worker lain).
+        Cukup satu os.stat per panggilan. Jika korpus store baru berbeda dari data kursus
+        di memori, data kursus dibaca ulang (frame_loader) dan dipakai hanya jika cocok
+        dengan store; frame dan index lalu di-swap bersama.
+        """
+        stamp = _file_stamp(EMBEDDING_STORE_PATH)
+        if stamp is None or stamp == self._store_stamp or self.lp_combined is None:
+            return False
+        self._store_stamp = stamp
         try:
-            self.embeddings = torch.load(EMBEDDINGS_PATH, weights_only=True)
-            print(f"Embeddings loaded from {EMBEDDINGS_PATH}")
+            store = EmbeddingStore(EMBEDDING_STORE_PATH)
+            if store.model != MODEL_NAME:
+                return False
+            frame = self.lp_combined
+            if store.corpus_hash != self._corpus_hash(frame):
+                frame = self.frame_loader()
+                if store.corpus_hash != self._corpus_hash(frame) or len(store) != len(frame):
+                    print("⚠️ Embedding store baru tidak cocok dengan data kursus saat ini")
+                    return False
+            self._open_store(store, frame)
             return True
         except Exception as e:
-            print(f"Failed to load embeddings: {e}")
+            print(f"⚠️ Gagal memuat ulang embedding store: {e}")
             return False
     
+    def _build_index(self) -> None:
+        """Matriks embedding ternormalisasi + partisi (learning_path, level)."""
+        self.index = self._make_index(self.lp_combined, self.store, self.embeddings)
+    
+    def _make_index(
+        self, frame: pd.DataFrame, store: Optional[EmbeddingStore], embeddings: Any
+    ) -> Union[EmbeddingIndex, VectorIndex]:
+        paths = frame['learning_path'].tolist()
+        levels = frame['course_level'].tolist()
+        if VECTOR_INDEX_BACKEND != "brute":
+            # index ANN (mis. IVF) untuk katalog besar; butuh salinan float32 di heap
+            vectors = store.dequantize() if store is not None else embeddings
+            return build_index(vectors, paths, levels, kind=VECTOR_INDEX_BACKEND)
+        if store is not None:
+            return store.index(paths, levels)
+        return EmbeddingIndex(embeddings, paths, levels)
+    
+    def _snapshot(self) -> Tuple[Optional[pd.DataFrame], Optional[Union[EmbeddingIndex, VectorIndex]]]:
+        """(lp_combined, index) yang saling cocok, walau swap terjadi di thread lain."""
+        with self._swap_lock:
+            return self.lp_combined, self.index
+    
+    def encode_queries(self, texts: List[str]) -> np.ndarray:
+        """Embedding query (teks sudah di-clean) lewat cache; miss di-encode lewat micro-batcher."""
+        if self.encoder is None:
+            self.encoder = BatchingEncoder(self.model.encode)
+        return query_embedding_cache.encode(MODEL_NAME, texts, self.encoder.encode)
+    
+    def warm_query_cache(self) -> int:
+        """Pre-encode semua kombinasi learning path x level (input paling umum)."""
+        if not SENTENCE_TRANSFORMER_AVAILABLE or self.model is None:
+            return 0
+        texts = []
+        for lp in self.learning_path_mapping.values():
+            texts.append(clean_text(lp))
+            texts.extend(clean_text(f"{lp} {level}") for level in LEVELS)
+        return query_embedding_cache.warm(MODEL_NAME, texts, self.model.encode)
+    
+    def _match_learning_path(self, user_input: str) -> Optional[str]:
+        for lp in self.learning_path_mapping.values():
+            if lp.lower() in user_input.lower():
+                return lp
+        return None
+    
+    def _result_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        result_cols = ['course_name', 'course_level', 'learning_path']
+        if 'summary' in df.columns:
+            result_cols.append('summary')
+        if 'course_price' in df.columns:
+            result_cols.append('course_price')
+        
+        result_df = df[result_cols].copy()
+        
+        # ✅ FIXED: Convert price to numeric dan handle NaN
+        if 'course_price' in result_df.columns:
+            result_df['course_price'] = pd.to_numeric(result_df['course_price'], errors='coerce')
+        
+        # NaN/Infinity dibiarkan; diubah jadi null saat encode (utils.fast_json)
+        return result_df
+    
     def recommend(
         self,
         user_input: str,
@@ -212,61 +387,80 @@ class CourseRecommenderST:
     ) -> pd.DataFrame:
         """
         Rekomendasi course - 100% PERSIS NOTEBOOK!
-        ✅ FIXED: Returns JSON-compliant DataFrame
+        NaN/Infinity tidak dibersihkan di sini; encode dengan utils.fast_json.
         
         Args:
             user_input: Job role user (e.g., "Front-End Web Developer")
             user_level: Level user (Beginner/Intermediate/Advanced)
             top_k: Jumlah rekomendasi
         """
-        if not SENTENCE_TRANSFORMER_AVAILABLE or self.model is None or self.embeddings is None:
+        if self.store is not None:
+            self.reload_if_changed()
+        frame, index = self._snapshot()
+        if not SENTENCE_TRANSFORMER_AVAILABLE or self.model is None or index is None:
             return self._fallback_recommend(user_input, user_level, top_k)
         
         # STEP 1: Prepare input - PERSIS NOTEBOOK
         final_input = f"{user_input} {user_level}" if user_level else user_input
         input_clean = clean_text(final_input)
-        user_emb = self.model.encode([input_clean])
-        
-        # STEP 2: Calculate similarity - PERSIS NOTEBOOK
-        sim_scores = cosine_similarity(user_emb, self.embeddings).flatten()
+        user_emb = self.encode_queries([input_clean])
         
-        df = self.lp_combined.copy()
-        df['sim'] = sim_scores
-        
-        # STEP 3: Filter by learning_path - PERSIS NOTEBOOK
-        matched_lp = None
-        for lp in self.learning_path_mapping.values():
-            if lp.lower() in user_input.lower():
-                matched_lp = lp
-                break
-        
-        if matched_lp:
-            df = df[df['learning_path'] == matched_lp]
-        
-        # STEP 4: Filter by level - PERSIS NOTEBOOK
-        if user_level:
-            df = df[df['course_level'].str.lower() == user_level.lower()]
-        
-        # STEP 5: Sort by similarity dan ambil top-K - PERSIS NOTEBOOK
-        df = df.sort_values(by='sim', ascending=False).head(top_k)
-        
-        # Return dengan kolom yang ada
-        result_cols = ['course_name', 'course_level', 'learning_path']
-        if 'summary' in df.columns:
-            result_cols.append('summary')
-        if 'course_price' in df.columns:
-            result_cols.append('course_price')
-        
-        result_df = df[result_cols].copy()
-        
-        # ✅ FIXED: Convert price to numeric dan handle NaN
-        if 'course_price' in result_df.columns:
-            result_df['course_price'] = pd.to_numeric(result_df['course_price'], errors='coerce')
-        
-        # ✅ FIXED: Clean untuk JSON compliance
-        result_df = clean_dataframe_for_json(result_df)
-        
-        return result_df
+        # STEP 2-5: filter learning_path & level lalu ambil top-K berdasarkan cosine;
+        # hanya partisi yang cocok yang diskor, DataFrame dibentuk untuk top-K saja
+        rows, _ = index.search(
+            user_emb, top_k, learning_path=self._match_learning_path(user_input), level=user_level or None
+        )
+        return self._result_frame(frame.iloc[rows])
+    
+    def _course_records(self, frame: pd.DataFrame) -> List[Dict[str, Any]]:
+        """Output JSON per baris kursus, dibentuk sekali per frame lalu dipakai ulang oleh recommend_many."""
+        cached = self._records
+        if cached is None or cached[0] is not frame:
+            cached = (frame, frame_records(self._result_frame(frame)))
+            self._records = cached
+        return cached[1]
+    
+    def recommend_many(
+        self,
+        queries: List[Tuple[str, Optional[str]]],
+        top_k: int = 10,
+        chunk_size: int = 256,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Rekomendasi untuk banyak (user_input, user_level) sekaligus, hasil sama dengan
+        recommend() per query. Query unik di-encode dalam satu batch, skor dihitung
+        sebagai satu matriks (query x kursus) per chunk, lalu setiap query hanya
+        melihat kolom partisi learning_path/level miliknya.
+        """
+        if self.store is not None:
+            self.reload_if_changed()
+        frame, index = self._snapshot()
+        if not SENTENCE_TRANSFORMER_AVAILABLE or self.model is None or index is None:
+            return [
+                frame_records(self._fallback_recommend(user_input, user_level, top_k))
+                for user_input, user_level in queries
+            ]
+        
+        records = self._course_records(frame)
+        texts = [clean_text(f"{u} {lv}" if lv else u) for u, lv in queries]
+        unique = list(dict.fromkeys(texts))
+        position = {t: i for i, t in enumerate(unique)}
+        embeddings = normalize_rows(self.encode_queries(unique))
+        
+        results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for start in range(0, len(queries), chunk_size):
+            chunk = range(start, min(start + chunk_size, len(queries)))
+            scores = index.score_many(embeddings[[position[texts[i]] for i in chunk]])
+            for j, i in enumerate(chunk):
+                user_input, user_level = queries[i]
+                matched_lp = self._match_learning_path(user_input)
+                if matched_lp is None and not user_level:
+                    rows = top_k_indices(scores[j], top_k)
+                else:
+                    part = index.rows_for(matched_lp, user_level or None)
+                    rows = part[top_k_indices(scores[j][part], top_k)]
+                results[i] = [dict(records[r]) for r in rows.tolist()]
+        return results
     
     def _fallback_recommend(
         self,
@@ -276,7 +470,7 @@ class CourseRecommenderST:
     ) -> pd.DataFrame:
         """
         Fallback tanpa Sentence Transformer.
-        ✅ FIXED: Returns JSON-compliant DataFrame
+        NaN/Infinity tidak dibersihkan di sini; encode dengan utils.fast_json.
         """
         if self.lp_combined is None:
             return pd.DataFrame()
@@ -284,12 +478,7 @@ class CourseRecommenderST:
         df = self.lp_combined.copy()
         
         # Filter by learning path
-        matched_lp = None
-        for lp in self.learning_path_mapping.values():
-            if lp.lower() in user_input.lower():
-                matched_lp = lp
-                break
-        
+        matched_lp = self._match_learning_path(user_input)
         if matched_lp:
             df = df[df['learning_path'] == matched_lp]
         
@@ -306,23 +495,7 @@ class CourseRecommenderST:
         
         df['score'] = df.apply(score_row, axis=1)
         df = df.sort_values(by='score', ascending=False).head(top_k)
-        
-        result_cols = ['course_name', 'course_level', 'learning_path']
-        if 'summary' in df.columns:
-            result_cols.append('summary')
-        if 'course_price' in df.columns:
-            result_cols.append('course_price')
-        
-        result_df = df[result_cols].copy()
-        
-        # ✅ FIXED: Convert price dan clean untuk JSON
-        if 'course_price' in result_df.columns:
-            result_df['course_price'] = pd.to_numeric(result_df['course_price'], errors='coerce')
-        
-        # ✅ FIXED: Clean untuk JSON compliance
-        result_df = clean_dataframe_for_json(result_df)
-        
-        return result_df
+        return self._result_frame(df)
 
 
 # Alias untuk backward compatibility
@@ -0,0 +1,152 @@
+"""
+Index embedding kursus untuk CourseRecommenderST.
+
+Embedding disimpan sebagai satu matriks contiguous yang sudah dinormalisasi L2,
+jadi cosine similarity = dot product. Matriks boleh float32 di heap atau hasil
+kuantisasi float16/int8 (+ scale per baris) di atas np.memmap (embedding_store.py).
+Index baris per (learning_path, level) dihitung sekali saat build; query hanya
+menskor partisi yang cocok dengan filter lalu mengambil top-k dengan argpartition
+(tanpa sort penuh).
+
+Matriks float16/int8 diskor per blok EMBEDDING_SCORE_CHUNK baris: hanya satu blok
+yang dikonversi ke float32 pada satu waktu, jadi memori tambahan per query tetap
+chunk x dim, bukan salinan float32 seluruh matriks.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+PartitionKey = Tuple[Optional[Hashable], Optional[str]]
+
+EMBEDDING_SCORE_CHUNK = int(os.getenv("EMBEDDING_SCORE_CHUNK", "4096"))
+
+
+def level_key(level: Any) -> Optional[str]:
+    """Nilai level untuk key partisi: huruf kecil, selain string jadi None."""
+    return level.lower() if isinstance(level, str) else None
+
+
+def partition_keys(learning_path: Any, level: Any) -> set:
+    """Key partisi yang memuat satu baris. None pada key = filter itu tidak dipakai."""
+    lp = learning_path if isinstance(learning_path, str) else None
+    lv = level_key(level)
+    keys = {(None, None), (None, lv)}
+    if lp is not None:
+        keys.update({(lp, None), (lp, lv)})
+    return keys
+
+
+def normalize_rows(matrix: Any) -> np.ndarray:
+    """Matriks float32 contiguous dengan setiap baris bernorma 1 (baris nol tetap nol)."""
+    if hasattr(matrix, "detach"):  # torch.Tensor dari file .pt lama
+        matrix = matrix.detach().cpu().numpy()
+    matrix = np.array(matrix, dtype=np.float32, copy=True, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return np.ascontiguousarray(matrix)
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Posisi k skor tertinggi, urut menurun (seri: posisi lebih kecil dulu)."""
+    n = scores.shape[0]
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        cand = np.argpartition(-scores, k - 1)[:k]
+    else:
+        cand = np.arange(n)
+    return cand[np.lexsort((cand, -scores[cand]))]
+
+
+class EmbeddingIndex:
+    def __init__(
+        self,
+        embeddings: Any,
+        learning_paths: Iterable[Any],
+        levels: Iterable[Any],
+        scales: Optional[np.ndarray] = None,
+        normalized: bool = False,
+        chunk_rows: int = EMBEDDING_SCORE_CHUNK,
+    ):
+        # normalized=True: matriks (mis. memmap ter-kuantisasi) dipakai apa adanya tanpa disalin
+        self.matrix = embeddings if normalized else normalize_rows(embeddings)
+        self.scales = scales
+        self.chunk_rows = max(1, chunk_rows)
+        learning_paths = list(learning_paths)
+        levels = list(levels)
+        if len(learning_paths) != len(self.matrix) or len(levels) != len(self.matrix):
+            raise ValueError("Jumlah embedding tidak sama dengan jumlah baris kursus")
+
+        # (None, None) = semua baris
+        buckets: Dict[PartitionKey, list] = {}
+        for row, (lp, lv) in enumerate(zip(learning_paths, levels)):
+            for key in partition_keys(lp, lv):
+                buckets.setdefault(key, []).append(row)
+        self.partitions: Dict[PartitionKey, np.ndarray] = {
+            key: np.asarray(rows, dtype=np.int64) for key, rows in buckets.items()
+        }
+        self.partitions.setdefault((None, None), np.arange(len(self.matrix), dtype=np.int64))
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def rows_for(self, learning_path: Optional[str] = None, level: Optional[str] = None) -> np.ndarray:
+        return self.partitions.get((learning_path, level_key(level)), np.empty(0, dtype=np.int64))
+
+    def search(
+        self,
+        query: Any,
+        k: int,
+        learning_path: Optional[str] = None,
+        level: Optional[str] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(index baris, skor cosine) top-k di partisi yang cocok dengan filter."""
+        q = normalize_rows(query)[0]
+        rows = self.rows_for(learning_path, level)
+        if rows.size == len(self):
+            scores = self.score(q)
+            best = top_k_indices(scores, k)
+            return best, scores[best]
+        scores = self.score(q, rows)
+        best = top_k_indices(scores, k)
+        return rows[best], scores[best]
+
+    def _blocks(self, rows: Optional[np.ndarray]) -> Iterable[Tuple[slice, np.ndarray]]:
+        """(posisi output, blok float32) per potongan chunk_rows dari semua baris atau `rows`."""
+        n = len(self) if rows is None else len(rows)
+        if rows is None and self.matrix.dtype == np.float32:
+            # matriks float32 di-matmul langsung, tanpa salinan
+            yield slice(0, n), self.matrix
+            return
+        for start in range(0, n, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n)
+            block = self.matrix[start:stop] if rows is None else self.matrix[rows[start:stop]]
+            yield slice(start, stop), np.asarray(block, dtype=np.float32)
+
+    def score_many(self, queries: np.ndarray) -> np.ndarray:
+        """Matriks skor (jumlah query x semua baris) untuk query yang sudah dinormalisasi."""
+        queries = np.asarray(queries, dtype=np.float32)
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for out, block in self._blocks(None):
+            np.matmul(queries, block.T, out=scores[:, out])
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def score(self, q: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Skor cosine q (sudah dinormalisasi) terhadap semua baris atau `rows`."""
+        q = np.asarray(q, dtype=np.float32)
+        scores = np.empty(len(self) if rows is None else len(rows), dtype=np.float32)
+        for out, block in self._blocks(rows):
+            np.matmul(block, q, out=scores[out])
+        if self.scales is not None:
+            scores *= self.scales if rows is None else self.scales[rows]
+        return scores
@@ -0,0 +1,101 @@
+"""
+Rebuild embedding kursus secara incremental.
+
+Setiap baris diberi hash dari combined_text yang sudah di-clean. Saat rebuild,
+vektor baris yang hash-nya sudah ada di store lama dipakai ulang; hanya teks baru
+atau berubah yang di-encode (per batch). Store baru ditulis ke file sementara lalu
+di-swap atomik (os.replace), jadi worker yang sedang melayani request tetap
+membaca store lama sampai mereka memuat ulang.
+
+CLI: python -m backend.scripts.refresh_embeddings
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Sequence
+
+import numpy as np
+
+from .embedding_index import normalize_rows
+from .embedding_store import EMBEDDING_STORE_DTYPE, HASH_BYTES, EmbeddingStore, corpus_hash, write_store
+
+
+ENCODE_BATCH_SIZE = 64
+
+# satu rebuild per proses; rebuild dari proses lain aman karena swap atomik
+_refresh_lock = threading.Lock()
+
+
+def row_hash(text: str) -> bytes:
+    return hashlib.blake2b(str(text).encode("utf-8"), digest_size=HASH_BYTES).digest()
+
+
+def row_hashes(texts: Sequence[str]) -> np.ndarray:
+    return np.frombuffer(b"".join(row_hash(t) for t in texts), dtype=np.uint8).reshape(len(texts), HASH_BYTES)
+
+
+def _reusable(path: Path, model: str, dtype: str) -> Dict[bytes, np.ndarray]:
+    """hash -> vektor (sudah dinormalisasi) dari store lama dengan model & dtype yang sama."""
+    if not path.exists():
+        return {}
+    try:
+        old = EmbeddingStore(path)
+    except Exception as e:
+        print(f"⚠️ Embedding store lama tidak bisa dibaca, rebuild penuh: {e}")
+        return {}
+    if old.model != model or old.header["dtype"] != dtype or old.row_hashes is None:
+        return {}
+    vectors = old.dequantize()
+    return {bytes(h): vectors[i] for i, h in enumerate(np.asarray(old.row_hashes))}
+
+
+def refresh_store(
+    path: Path | str,
+    texts: Sequence[str],
+    model: str,
+    encode_fn: Callable[[List[str]], Any],
+    dtype: str = EMBEDDING_STORE_DTYPE,
+    batch_size: int = ENCODE_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Bangun ulang store untuk `texts`; hanya baris baru/berubah yang di-encode."""
+    path = Path(path)
+    started = time.perf_counter()
+    with _refresh_lock:
+        hashes = row_hashes(texts)
+        keys = [bytes(h) for h in hashes]
+        reuse = _reusable(path, model, dtype)
+        corpus = corpus_hash(texts)
+        if reuse and len(reuse) == len(set(keys)) and all(k in reuse for k in keys):
+            try:
+                if EmbeddingStore(path).corpus_hash == corpus:
+                    return {"rows": len(texts), "reused": len(texts), "encoded": 0, "removed": 0, "swapped": False,
+                            "seconds": round(time.perf_counter() - started, 3)}
+            except Exception:
+                pass
+
+        # teks duplikat cukup di-encode sekali
+        pending: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in reuse:
+                pending.setdefault(key, text)
+        fresh: Dict[bytes, np.ndarray] = {}
+        items = list(pending.items())
+        for start in range(0, len(items), batch_size):
+            chunk = items[start:start + batch_size]
+            vectors = normalize_rows(encode_fn([t for _, t in chunk]))
+            fresh.update(zip((k for k, _ in chunk), vectors))
+
+        matrix = np.stack([reuse[k] if k in reuse else fresh[k] for k in keys]) if keys else np.empty((0, 0))
+        write_store(path, matrix, model, corpus, dtype, row_hashes=hashes, normalized=True)
+        reused = sum(1 for k in keys if k in reuse)
+        return {
+            "rows": len(texts),
+            "reused": reused,
+            "encoded": len(pending),
+            "removed": len(set(reuse) - set(keys)),
+            "swapped": True,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,200 @@
+"""
+Format file embedding kursus (ter-kuantisasi) yang dibaca dengan np.memmap.
+
+Layout satu file:
+    MAGIC (8 byte) | panjang header (uint32 LE) | header JSON | padding
+    | matriks (rows x dim, int8 / float16 / float32) | padding | scale per baris (float32, khusus int8)
+    | padding | hash isi per baris (16 byte, opsional; dipakai rebuild incremental)
+
+Header berisi versi format, nama model, hash korpus (untuk validasi terhadap data
+kursus saat ini), dtype, shape dan offset. Data dibuka read-only dengan np.memmap
+sehingga semua worker uvicorn berbagi page cache yang sama, dan tidak perlu torch
+untuk deserialisasi. Baris dinormalisasi L2 sebelum disimpan; untuk int8 setiap
+baris punya scale sendiri (nilai asli ~= int8 * scale).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from .embedding_index import EmbeddingIndex, normalize_rows, top_k_indices
+
+
+MAGIC = b"LBEMB\x00\x00\x01"
+FORMAT_VERSION = 1
+ALIGN = 64
+HASH_BYTES = 16
+STORE_DTYPES = ("int8", "float16", "float32")
+EMBEDDING_STORE_DTYPE = os.getenv("EMBEDDING_STORE_DTYPE", "int8")
+
+
+def corpus_hash(texts: Iterable[str]) -> str:
+    """Hash isi korpus (urutan ikut dihitung); berubah jika ada teks kursus yang berubah."""
+    h = hashlib.sha256()
+    n = 0
+    for text in texts:
+        h.update(str(text).encode("utf-8"))
+        h.update(b"\0")
+        n += 1
+    return f"{n}:{h.hexdigest()}"
+
+
+def _align(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def quantize(matrix: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """(data, scales) dari matriks float32 yang sudah dinormalisasi."""
+    if dtype == "float32":
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    if dtype == "float16":
+        return np.ascontiguousarray(matrix, dtype=np.float16), None
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        data = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+        return np.ascontiguousarray(data), scales.astype(np.float32)
+    raise ValueError(f"dtype embedding tidak dikenal: {dtype}")
+
+
+def write_store(
+    path: Path | str,
+    embeddings: Any,
+    model: str,
+    corpus: str,
+    dtype: str = EMBEDDING_STORE_DTYPE,
+    row_hashes: Optional[np.ndarray] = None,
+    normalized: bool = False,
+) -> Path:
+    """
+    Tulis file store secara atomik (tmp + os.replace); pembaca lama tetap memakai file lama.
+    normalized=True melewati normalisasi ulang (baris hasil dequantize dari store lama
+    ter-kuantisasi ulang ke nilai yang sama, jadi tidak bergeser tiap update).
+    """
+    path = Path(path)
+    matrix = np.asarray(embeddings, dtype=np.float32) if normalized else normalize_rows(embeddings)
+    data, scales = quantize(matrix, dtype)
+    if row_hashes is not None:
+        row_hashes = np.ascontiguousarray(row_hashes, dtype=np.uint8).reshape(len(data), HASH_BYTES)
+    rows, dim = data.shape
+    header: Dict[str, Any] = {
+        "version": FORMAT_VERSION,
+        "model": model,
+        "corpus_hash": corpus,
+        "dtype": dtype,
+        "rows": rows,
+        "dim": dim,
+        "normalized": True,
+        "created_at": time.time(),
+    }
+    # offset bergantung pada panjang header itu sendiri: ulangi sampai stabil
+    header.update(matrix_offset=0, scales_offset=None, hashes_offset=None)
+    while True:
+        raw = json.dumps(header, sort_keys=True).encode("utf-8")
+        matrix_offset = _align(len(MAGIC) + 4 + len(raw))
+        end = matrix_offset + data.nbytes
+        scales_offset = _align(end) if scales is not None else None
+        end = scales_offset + scales.nbytes if scales is not None else end
+        hashes_offset = _align(end) if row_hashes is not None else None
+        offsets = (matrix_offset, scales_offset, hashes_offset)
+        if offsets == (header["matrix_offset"], header["scales_offset"], header["hashes_offset"]):
+            break
+        header.update(matrix_offset=matrix_offset, scales_offset=scales_offset, hashes_offset=hashes_offset)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(raw)))
+        f.write(raw)
+        f.write(b"\0" * (header["matrix_offset"] - f.tell()))
+        f.write(data.tobytes())
+        if scales is not None:
+            f.write(b"\0" * (header["scales_offset"] - f.tell()))
+            f.write(scales.tobytes())
+        if row_hashes is not None:
+            f.write(b"\0" * (header["hashes_offset"] - f.tell()))
+            f.write(row_hashes.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def read_header(path: Path | str) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} bukan file embedding store")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Versi embedding store tidak didukung: {header.get('version')}")
+    return header
+
+
+class EmbeddingStore:
+    """Embedding read-only di atas np.memmap (tidak disalin ke heap)."""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.header = read_header(self.path)
+        rows, dim = self.header["rows"], self.header["dim"]
+        self.matrix = np.memmap(
+            self.path, dtype=np.dtype(self.header["dtype"]), mode="r",
+            offset=self.header["matrix_offset"], shape=(rows, dim),
+        )
+        self.scales = None
+        if self.header.get("scales_offset") is not None:
+            self.scales = np.memmap(
+                self.path, dtype=np.float32, mode="r", offset=self.header["scales_offset"], shape=(rows,)
+            )
+        self.row_hashes = None
+        if self.header.get("hashes_offset") is not None:
+            self.row_hashes = np.memmap(
+                self.path, dtype=np.uint8, mode="r", offset=self.header["hashes_offset"], shape=(rows, HASH_BYTES)
+            )
+
+    @property
+    def model(self) -> str:
+        return self.header["model"]
+
+    @property
+    def corpus_hash(self) -> str:
+        return self.header["corpus_hash"]
+
+    def __len__(self) -> int:
+        return self.header["rows"]
+
+    def matches(self, model: str, corpus: str) -> bool:
+        return self.model == model and self.corpus_hash == corpus
+
+    def dequantize(self) -> np.ndarray:
+        out = np.asarray(self.matrix, dtype=np.float32)
+        return out * self.scales[:, None] if self.scales is not None else out
+
+    def index(self, learning_paths: Iterable[Any], levels: Iterable[Any]) -> EmbeddingIndex:
+        """EmbeddingIndex yang menskor langsung dari memmap (tanpa salinan float32)."""
+        return EmbeddingIndex(self.matrix, learning_paths, levels, scales=self.scales, normalized=True)
+
+    def nbytes(self) -> int:
+        return self.matrix.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+
+def recall_at_k(reference: Any, store: EmbeddingStore, queries: Any, k: int = 10) -> float:
+    """Rata-rata irisan top-k store (jalur skor ter-kuantisasi) vs top-k float32 per query."""
+    ref = normalize_rows(reference)
+    index = store.index([None] * len(store), [None] * len(store))
+    hits = 0
+    qs = normalize_rows(queries)
+    for q in qs:
+        exact = set(top_k_indices(ref @ q, k).tolist())
+        got = set(index.search(q, k)[0].tolist())
+        hits += len(exact & got)
+    return hits / (len(qs) * min(k, len(ref))) if len(qs) else 1.0
@@ -0,0 +1,140 @@
+"""
+Micro-batching untuk encoder sentence-transformers.
+
+Request encode dari banyak thread / coroutine dikumpulkan selama paling lama
+ENCODER_MAX_WAIT_MS (atau sampai ENCODER_MAX_BATCH teks), di-encode sebagai satu
+batch oleh satu worker thread, lalu hasilnya dibagikan ke masing-masing pemanggil.
+Teks yang sama dalam satu batch hanya di-encode sekali.
+
+ENCODER_MAX_WAIT_MS=0 berarti tidak menunggu: batch hanya berisi request yang
+sudah antre selama batch sebelumnya diproses (tanpa tambahan latensi untuk 1 client).
+
+Benchmark: python -m backend.scripts.bench_encoder_service
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+ENCODER_MAX_BATCH = int(os.getenv("ENCODER_MAX_BATCH", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "5"))
+
+_Request = Tuple[List[str], Future]
+
+
+class BatchingEncoder:
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], Any],
+        max_batch: int = ENCODER_MAX_BATCH,
+        max_wait_ms: float = ENCODER_MAX_WAIT_MS,
+    ):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "texts": 0, "batches": 0, "batched_texts": 0, "max_batch_seen": 0, "errors": 0}
+        self.encode_seconds = 0.0
+
+    # ---- front-end ----
+    def submit(self, texts: Sequence[str]) -> Future:
+        fut: Future = Future()
+        texts = list(texts)
+        if not texts:
+            fut.set_result(np.empty((0, 0), dtype=np.float32))
+            return fut
+        self._ensure_worker()
+        self._queue.put((texts, fut))
+        return fut
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Versi sync: blok sampai batch yang memuat teks ini selesai di-encode."""
+        return self.submit(texts).result(timeout)
+
+    async def encode_async(self, texts: Sequence[str]) -> np.ndarray:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    # ---- worker ----
+    def _ensure_worker(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="encoder-batcher", daemon=True)
+                self._thread.start()
+
+    def _collect(self, first: _Request) -> Tuple[List[_Request], bool]:
+        batch = [first]
+        size = len(first[0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+            size += len(item[0])
+        return batch, False
+
+    def _run_batch(self, batch: List[_Request]) -> None:
+        unique: Dict[str, int] = {}
+        for texts, _ in batch:
+            for t in texts:
+                unique.setdefault(t, len(unique))
+        started = time.perf_counter()
+        try:
+            vectors = np.asarray(self.encode_fn(list(unique)), dtype=np.float32).reshape(len(unique), -1)
+        except Exception as e:
+            self.counters["errors"] += 1
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        self.encode_seconds += time.perf_counter() - started
+        n_texts = sum(len(texts) for texts, _ in batch)
+        self.counters["requests"] += len(batch)
+        self.counters["texts"] += n_texts
+        self.counters["batches"] += 1
+        self.counters["batched_texts"] += len(unique)
+        self.counters["max_batch_seen"] = max(self.counters["max_batch_seen"], len(unique))
+        for texts, fut in batch:
+            fut.set_result(vectors[[unique[t] for t in texts]])
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stopping = self._collect(first)
+            self._run_batch(batch)
+            if stopping:
+                return
+
+    def stop(self, timeout: float = 5.0) -> None:
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        c = dict(self.counters)
+        return dict(
+            c,
+            max_batch=self.max_batch,
+            max_wait_ms=self.max_wait * 1000,
+            avg_batch=round(c["batched_texts"] / c["batches"], 2) if c["batches"] else None,
+            encode_ms_avg=round(self.encode_seconds / c["batches"] * 1000, 2) if c["batches"] else None,
+        )
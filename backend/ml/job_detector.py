@@ -6,7 +6,6 @@ from __future__ import annotations
 import os
 import re
 from typing import List, Union
-from difflib import get_close_matches
 import pandas as pd
 
 try:
@@ -17,25 +16,78 @@ except ImportError:
     httpx = None
 
 
+from ..llm.response_cache import response_cache
+from .job_role_classifier import JOB_ROLE_CONFIDENCE, get_classifier
+from .keyword_index import get_keyword_index
+
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 API_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
 
 
+def _gemini_text(prompt: str, timeout: float) -> str:
+    with httpx.Client(timeout=timeout) as client:
+        resp = client.post(
+            f"{API_URL}?key={GEMINI_API_KEY}",
+            json={"contents": [{"parts": [{"text": prompt}]}]}
+        )
+        resp.raise_for_status()
+        data = resp.json()
+
+    candidates = data.get("candidates", [])
+    if not candidates:
+        raise Exception("❌ Gemini tidak return candidates!")
+
+    parts = candidates[0].get("content", {}).get("parts", [])
+    if not parts:
+        raise Exception("❌ Gemini tidak return parts!")
+
+    return parts[0].get("text", "")
+
+
+# Berapa kali classifier lokal cukup, dan berapa kali tetap harus ke Gemini
+JOB_ROLE_STATS = {"local": 0, "escalated": 0, "low_confidence_local": 0}
+
+
+def job_role_stats() -> dict:
+    total = JOB_ROLE_STATS["local"] + JOB_ROLE_STATS["escalated"] + JOB_ROLE_STATS["low_confidence_local"]
+    return dict(
+        JOB_ROLE_STATS,
+        escalation_rate=round(JOB_ROLE_STATS["escalated"] / total, 3) if total else 0.0,
+        threshold=JOB_ROLE_CONFIDENCE,
+    )
+
+
 # ===============================
 # DETECT JOB ROLE
 # ===============================
-def detect_job_role(user_input: str, job_role: List[str]) -> str:
+def detect_job_role(user_input: str, job_role: List[str], threshold: float | None = None) -> str:
     """
-    Deteksi job role - PERSIS SEPERTI NOTEBOOK
+    Deteksi job role - classifier lokal dulu, Gemini hanya jika confidence rendah
     
     Args:
         user_input: Deskripsi user
         job_role: List job role dari dataset
+        threshold: Ambang confidence (default JOB_ROLE_CONFIDENCE)
     
     Returns:
         Nama job role yang terdeteksi
     """
+    threshold = JOB_ROLE_CONFIDENCE if threshold is None else threshold
+    clf = get_classifier()
+    local_role, confidence = clf.predict(user_input, allowed=job_role) if clf else (None, 0.0)
+    if local_role and confidence >= threshold:
+        JOB_ROLE_STATS["local"] += 1
+        print(f"✅ Job Role detected (lokal, {confidence:.2f}): {local_role}")
+        return local_role
+
+    if not GEMINI_API_KEY and local_role:
+        # tanpa Gemini, tebakan lokal terbaik tetap lebih baik daripada error
+        JOB_ROLE_STATS["low_confidence_local"] += 1
+        print(f"⚠️ Job Role (lokal, confidence rendah {confidence:.2f}): {local_role}")
+        return local_role
+
     if not GEMINI_API_KEY:
         raise ValueError(
             "❌ GEMINI_API_KEY tidak ditemukan!\n"
@@ -60,24 +112,11 @@ def detect_job_role(user_input: str, job_role: List[str]) -> str:
     "{user_input}"
     """
     
+    JOB_ROLE_STATS["escalated"] += 1
     # FIXED: Timeout diperpanjang dari 30 ke 90 detik
-    with httpx.Client(timeout=90) as client:
-        resp = client.post(
-            f"{API_URL}?key={GEMINI_API_KEY}",
-            json={"contents": [{"parts": [{"text": prompt}]}]}
-        )
-        resp.raise_for_status()
-        data = resp.json()
-    
-    candidates = data.get("candidates", [])
-    if not candidates:
-        raise Exception("❌ Gemini tidak return candidates!")
-    
-    parts = candidates[0].get("content", {}).get("parts", [])
-    if not parts:
-        raise Exception("❌ Gemini tidak return parts!")
-    
-    result = parts[0].get("text", "").strip()
+    result = response_cache.cached_call(
+        "detect_job_role", GEMINI_MODEL, prompt, lambda: _gemini_text(prompt, 90), semantic_text=user_input
+    ).strip()
     
     # Clean
     result = result.replace('"', '').replace("'", "").strip()
@@ -160,39 +199,29 @@ def detect_skills(
     """
     
     # FIXED: Timeout diperpanjang dari 30 ke 120 detik untuk skill detection
-    with httpx.Client(timeout=120) as client:
-        resp = client.post(
-            f"{API_URL}?key={GEMINI_API_KEY}",
-            json={"contents": [{"parts": [{"text": prompt}]}]}
-        )
-        resp.raise_for_status()
-        data = resp.json()
-    
-    candidates = data.get("candidates", [])
-    if not candidates:
-        raise Exception("❌ Gemini tidak return candidates!")
-    
-    parts = candidates[0].get("content", {}).get("parts", [])
-    if not parts:
-        raise Exception("❌ Gemini tidak return parts!")
-    
-    raw_text = parts[0].get("text", "")
+    raw_text = response_cache.cached_call(
+        "detect_skills", GEMINI_MODEL, prompt, lambda: _gemini_text(prompt, 120), semantic_text=user_input
+    )
     print(f"🤖 Gemini raw response: {raw_text}")
     
     raw_items = [s.strip() for s in raw_text.replace("\n", "").split(",") if s.strip()]
     
     # Ambil skill yang valid dari dataset saja (cari di SEMUA keywords, bukan hanya sample)
     filtered = []
+    chosen = set()
     
-    for item in raw_items:
-        match = get_close_matches(item, valid_keywords, n=1, cutoff=0.6)
-        if match and match[0] not in filtered:
-            filtered.append(match[0])
+    for match in get_keyword_index(valid_keywords).match_many(raw_items, cutoff=0.6):
+        if match and match not in chosen:
+            filtered.append(match)
+            chosen.add(match)
     
     # Jika kurang dari top_k, isi dengan skill lain dari dataset
-    if len(filtered) < top_k:
-        remaining = [k for k in valid_keywords if k not in filtered]
-        filtered.extend(remaining[:top_k - len(filtered)])
+    for k in valid_keywords:
+        if len(filtered) >= top_k:
+            break
+        if k not in chosen:
+            filtered.append(k)
+            chosen.add(k)
     
     result = filtered[:top_k]
     print(f"✅ Skills detected: {result}")
@@ -0,0 +1,182 @@
+"""
+Klasifikasi job role (learning path) lokal berbasis TF-IDF + logistic regression.
+
+Model dilatih offline dari Skill.csv dan workbook kursus (LP + Course, Learning
+Path Answer), lalu disimpan sebagai array biasa (vocabulary, idf, bobot). Inferensi
+tidak lewat pipeline sklearn: cukup lookup token + perkalian sparse x dense, jadi
+satu prediksi butuh puluhan mikrodetik.
+
+Latih ulang:
+    python -m backend.scripts.train_job_role_classifier
+"""
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    SKLEARN_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    SKLEARN_AVAILABLE = False
+    joblib = None
+    TfidfVectorizer = None
+    LogisticRegression = None
+
+from ..services.datasets import load_frame
+
+
+MODEL_PATH = Path(__file__).parent / "models" / "job_role_classifier.joblib"
+SKILL_CSV = Path(__file__).parent / "Skill.csv"
+# Di bawah ambang ini deteksi dieskalasi ke Gemini
+JOB_ROLE_CONFIDENCE = float(os.getenv("JOB_ROLE_CONFIDENCE", "0.45"))
+
+VECTORIZER_PARAMS = {"ngram_range": (1, 2), "sublinear_tf": True, "strip_accents": "unicode"}
+MAX_TUTORIALS_PER_COURSE = 80
+
+
+def build_training_set() -> Tuple[List[str], List[str]]:
+    """Satu dokumen per skill, per (learning path, kursus), plus nama learning path itu sendiri."""
+    texts: List[str] = []
+    labels: List[str] = []
+
+    skills = pd.read_csv(SKILL_CSV)
+    for row in skills.itertuples():
+        desc = row.description if isinstance(row.description, str) else ""
+        texts.append(f"{row.skill} {desc}")
+        labels.append(row.learning_path_name)
+
+    answers = load_frame("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
+    course_desc = {
+        r.name: f"{r.summary or ''} {r.technologies or ''}" for r in answers.itertuples() if isinstance(r.name, str)
+    }
+    mapping = load_frame("LP and Course Mapping.xlsx", "LP + Course")
+    for (path, course), group in mapping.groupby(["learning_path_name", "course_name"], observed=True):
+        tutorials = group["tutorial_title"].dropna().astype(str).unique()[:MAX_TUTORIALS_PER_COURSE]
+        texts.append(f"{course} {course_desc.get(course, '')} {' '.join(tutorials)}")
+        labels.append(path)
+
+    for path in sorted(set(labels)):
+        texts.append(path)
+        labels.append(path)
+    return texts, labels
+
+
+class JobRoleClassifier:
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, coef: np.ndarray, intercept: np.ndarray,
+                 classes: List[str], vectorizer_params: Optional[dict] = None):
+        self.vocabulary = vocabulary
+        self.idf = np.asarray(idf, dtype=np.float64)
+        # (n_terms, n_classes) supaya baris term bisa diambil langsung
+        self.coef = np.ascontiguousarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = list(classes)
+        self.vectorizer_params = dict(vectorizer_params or VECTORIZER_PARAMS)
+        self._analyzer = TfidfVectorizer(**self.vectorizer_params).build_analyzer()
+
+    @classmethod
+    def train(cls, texts: Iterable[str], labels: Iterable[str], C: float = 20.0) -> "JobRoleClassifier":
+        vectorizer = TfidfVectorizer(**VECTORIZER_PARAMS)
+        X = vectorizer.fit_transform(list(texts))
+        model = LogisticRegression(C=C, max_iter=3000).fit(X, list(labels))
+        return cls(vectorizer.vocabulary_, vectorizer.idf_, model.coef_.T, model.intercept_, list(model.classes_))
+
+    def save(self, path: Path = MODEL_PATH) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(
+            {
+                "vocabulary": self.vocabulary,
+                "idf": self.idf,
+                "coef": self.coef,
+                "intercept": self.intercept,
+                "classes": self.classes,
+                "vectorizer_params": self.vectorizer_params,
+            },
+            path,
+        )
+        return path
+
+    @classmethod
+    def load(cls, path: Path = MODEL_PATH) -> "JobRoleClassifier":
+        return cls(**joblib.load(path))
+
+    def predict_proba(self, text: str) -> Optional[np.ndarray]:
+        """Probabilitas per kelas (urutan self.classes); None jika tidak ada token yang dikenal."""
+        counts: Dict[int, int] = {}
+        for token in self._analyzer(text or ""):
+            j = self.vocabulary.get(token)
+            if j is not None:
+                counts[j] = counts.get(j, 0) + 1
+        if not counts:
+            return None
+        idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        tf = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        weights = tf * self.idf[idx]
+        weights /= np.linalg.norm(weights)
+        z = weights @ self.coef[idx] + self.intercept
+        z = np.exp(z - z.max())
+        return z / z.sum()
+
+    def predict(self, text: str, allowed: Optional[Iterable[str]] = None) -> Tuple[Optional[str], float]:
+        """
+        (job role, confidence). Jika `allowed` diisi, hanya kelas itu yang dipertimbangkan.
+        Confidence selalu probabilitas mentah atas semua kelas (tidak dinormalisasi ulang
+        ke subset), supaya input yang ambigu tetap di bawah ambang dan dieskalasi.
+        """
+        proba = self.predict_proba(text)
+        if proba is None:
+            return None, 0.0
+        candidates = proba
+        if allowed is not None:
+            allowed = set(allowed)
+            mask = np.array([c in allowed for c in self.classes])
+            if not mask.any():
+                return None, 0.0
+            candidates = np.where(mask, proba, -1.0)
+        best = int(np.argmax(candidates))
+        return self.classes[best], float(proba[best])
+
+
+def train_and_save(path: Path = MODEL_PATH) -> JobRoleClassifier:
+    texts, labels = build_training_set()
+    clf = JobRoleClassifier.train(texts, labels)
+    clf.save(path)
+    return clf
+
+
+_classifier: Optional[JobRoleClassifier] = None
+_classifier_lock = threading.Lock()
+_missing_warned = False
+
+
+def get_classifier() -> Optional[JobRoleClassifier]:
+    """
+    Classifier bersama, dimuat dari MODEL_PATH. Tidak pernah melatih di dalam request:
+    jika file model belum ada, kembalikan None (deteksi jatuh ke Gemini) sampai model
+    dilatih lewat backend.scripts.train_job_role_classifier.
+    """
+    global _classifier, _missing_warned
+    if _classifier is None and SKLEARN_AVAILABLE:
+        with _classifier_lock:
+            if _classifier is None:
+                if not MODEL_PATH.exists():
+                    if not _missing_warned:
+                        _missing_warned = True
+                        print(
+                            f"⚠️ Model job role belum ada di {MODEL_PATH}; "
+                            "jalankan python -m backend.scripts.train_job_role_classifier"
+                        )
+                    return None
+                try:
+                    _classifier = JobRoleClassifier.load(MODEL_PATH)
+                except Exception as e:
+                    print(f"⚠️ Job role classifier tidak tersedia: {e}")
+                    return None
+    return _classifier
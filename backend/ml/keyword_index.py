@@ -0,0 +1,156 @@
+"""
+Index keyword untuk fuzzy matching cepat (dipakai job_detector & simple_nlp).
+
+Tahap pencocokan:
+1. hash map bentuk ternormalisasi (casefold + spasi dirapikan) -> keyword, O(1);
+2. kandidat difilter per panjang: skor ratio >= cutoff mustahil jika panjang terlalu
+   jauh (2*min/(a+b) adalah batas atas), jadi filter ini tidak membuang match;
+3. skor rapidfuzz (C) pada kandidat; batch memakai process.cdist sekaligus.
+
+Skor seri selalu dimenangkan keyword yang muncul lebih dulu di daftar asli, baik
+lewat match, match_many maupun fallback difflib (tanpa rapidfuzz).
+"""
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, bisect_right
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    from rapidfuzz import fuzz, process  # type: ignore
+    RAPIDFUZZ_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    fuzz = None
+    process = None
+    RAPIDFUZZ_AVAILABLE = False
+
+
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_keyword(text: str) -> str:
+    return _WS_RE.sub(" ", str(text)).strip().casefold()
+
+
+class KeywordIndex:
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: List[str] = []
+        self.exact: Dict[str, str] = {}
+        seen = set()
+        for kw in keywords:
+            if kw is None or kw in seen:
+                continue
+            kw = str(kw)
+            norm = normalize_keyword(kw)
+            if not norm:
+                continue
+            seen.add(kw)
+            self.keywords.append(kw)
+            self.exact.setdefault(norm, kw)
+        self.normalized = [normalize_keyword(k) for k in self.keywords]
+        # urutkan per panjang untuk filter kandidat dengan bisect
+        order = sorted(range(len(self.keywords)), key=lambda i: len(self.normalized[i]))
+        self._by_len = order
+        self._lengths = [len(self.normalized[i]) for i in order]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def __contains__(self, keyword: str) -> bool:
+        return normalize_keyword(keyword) in self.exact
+
+    def _candidates(self, length: int, cutoff: float) -> List[int]:
+        """Index keyword yang lolos filter panjang, dalam urutan daftar asli (aturan seri)."""
+        # ratio = 2*M/(a+b) <= 2*min(a,b)/(a+b) -> b dalam [a*c/(2-c), a*(2-c)/c]
+        lo = length * cutoff / (2 - cutoff)
+        hi = length * (2 - cutoff) / cutoff if cutoff > 0 else float("inf")
+        start = bisect_left(self._lengths, lo - 1e-9)
+        end = bisect_right(self._lengths, hi + 1e-9)
+        return sorted(self._by_len[start:end])
+
+    def match(self, phrase: str, cutoff: float = 0.6) -> Optional[str]:
+        """Keyword paling mirip dengan phrase (skor 0..1 >= cutoff), atau None."""
+        norm = normalize_keyword(phrase)
+        if not norm:
+            return None
+        hit = self.exact.get(norm)
+        if hit is not None:
+            return hit
+        cands = self._candidates(len(norm), cutoff)
+        if not cands:
+            return None
+        if RAPIDFUZZ_AVAILABLE:
+            # extractOne mengembalikan skor tertinggi pertama → seri ke index terkecil
+            best = process.extractOne(
+                norm, [self.normalized[i] for i in cands], scorer=fuzz.ratio, score_cutoff=cutoff * 100
+            )
+            return self.keywords[cands[best[2]]] if best else None
+        # difflib: skor sama dengan get_close_matches, tapi seri ke index terkecil juga
+        matcher = SequenceMatcher()
+        matcher.set_seq2(norm)
+        best_i, best_score = None, cutoff
+        for i in cands:
+            matcher.set_seq1(self.normalized[i])
+            if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+                continue
+            score = matcher.ratio()
+            if score > best_score or (best_i is None and score >= best_score):
+                best_i, best_score = i, score
+        return self.keywords[best_i] if best_i is not None else None
+
+    def match_many(self, phrases: Sequence[str], cutoff: float = 0.6) -> List[Optional[str]]:
+        """Batch match: exact hit dulu, sisanya diskor sekaligus dengan cdist."""
+        out: List[Optional[str]] = [None] * len(phrases)
+        pending: List[Tuple[int, str]] = []
+        for i, phrase in enumerate(phrases):
+            norm = normalize_keyword(phrase)
+            if not norm:
+                continue
+            hit = self.exact.get(norm)
+            if hit is not None:
+                out[i] = hit
+            else:
+                pending.append((i, norm))
+        if not pending or not self.keywords:
+            return out
+        if not RAPIDFUZZ_AVAILABLE or len(pending) == 1:
+            for i, norm in pending:
+                out[i] = self.match(norm, cutoff)
+            return out
+        scores = process.cdist(
+            [norm for _, norm in pending], self.normalized, scorer=fuzz.ratio,
+            score_cutoff=cutoff * 100, dtype=np.float32, workers=1,
+        )
+        # argmax mengembalikan kolom pertama saat seri → index terkecil, sama dengan match()
+        best = scores.argmax(axis=1)
+        for (i, _), j, row in zip(pending, best, scores):
+            if row[j] >= cutoff * 100 and row[j] > 0:
+                out[i] = self.keywords[j]
+        return out
+
+    def extract(self, text: str, limit: int = 8, min_score: float = 60.0) -> List[Tuple[str, float]]:
+        """Keyword yang muncul di teks bebas (token_set_ratio), skor 0..100."""
+        if not text or not self.keywords:
+            return []
+        norm = normalize_keyword(text)
+        if RAPIDFUZZ_AVAILABLE:
+            results = process.extract(
+                norm, self.normalized, scorer=fuzz.token_set_ratio, limit=limit, score_cutoff=min_score
+            )
+            return [(self.keywords[r[2]], float(r[1])) for r in results]
+        # fallback: substring match kasar
+        return [(kw, 100.0) for kw, n in zip(self.keywords, self.normalized) if n in norm][:limit]
+
+
+@lru_cache(maxsize=16)
+def _cached_index(keywords: Tuple[str, ...]) -> KeywordIndex:
+    return KeywordIndex(keywords)
+
+
+def get_keyword_index(keywords: Sequence[str]) -> KeywordIndex:
+    """Index bersama untuk satu daftar keyword (dibangun sekali per isi daftar)."""
+    return _cached_index(tuple(keywords))
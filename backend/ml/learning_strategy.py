@@ -12,6 +12,13 @@ import pandas as pd
 # ✅ FIX: Direct import without try-except untuk production
 import google.generativeai as genai
 
+try:
+    from ..llm.response_cache import response_cache
+except ImportError:  # dijalankan langsung sebagai script
+    response_cache = None
+
+GEMINI_STRATEGY_MODEL = "models/gemini-2.5-flash"
+
 
 class LearningStrategyGenerator:
     """Generator untuk strategi belajar berbasis LLM"""
@@ -41,7 +48,7 @@ class LearningStrategyGenerator:
         # Configure Gemini
         try:
             genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel("models/gemini-2.5-flash")
+            self.model = genai.GenerativeModel(GEMINI_STRATEGY_MODEL)
             print("✓ Gemini model initialized")
         except Exception as e:
             print(f"❌ Failed to initialize Gemini: {e}")
@@ -148,8 +155,15 @@ dst.
 """
         
         try:
-            response = self.model.generate_content(prompt)
-            strategy_text = response.text
+            if response_cache is not None:
+                strategy_text = response_cache.cached_call(
+                    "learning_strategy",
+                    GEMINI_STRATEGY_MODEL,
+                    prompt,
+                    lambda: self.model.generate_content(prompt).text,
+                )
+            else:
+                strategy_text = self.model.generate_content(prompt).text
             
             # Remove markdown bold formatting (seperti di notebook)
             strategy_text = strategy_text.replace("**", "")
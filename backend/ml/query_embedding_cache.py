@@ -0,0 +1,188 @@
+"""
+Cache embedding query untuk encoder sentence-transformers.
+
+Input rekomendasi sangat berulang (nama job role + level), jadi embedding query
+disimpan per (model, teks yang sudah di-clean): LRU di memori di depan SQLite di
+disk, sehingga setelah restart pun kombinasi umum tidak lewat transformer lagi.
+Tabel di disk juga LRU (last_used), dibatasi QUERY_EMBED_DISK_MAX baris, karena
+input bebas dari endpoint rekomendasi bisa berupa teks apa saja.
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+QUERY_EMBED_CACHE_PATH = Path(
+    os.getenv("QUERY_EMBED_CACHE_PATH", str(Path(__file__).resolve().parents[1] / "data" / "query_embeddings.db"))
+)
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+# ~3 KB per baris untuk embedding 768 dimensi float32
+QUERY_EMBED_DISK_MAX = int(os.getenv("QUERY_EMBED_DISK_MAX", "20000"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_embeddings (
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    dim INTEGER NOT NULL,
+    embedding BLOB NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (model, text)
+);
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used ON query_embeddings(last_used)"
+
+Encoder = Callable[[List[str]], Any]
+
+
+class QueryEmbeddingCache:
+    def __init__(
+        self,
+        path: Optional[Path | str] = QUERY_EMBED_CACHE_PATH,
+        max_entries: int = QUERY_EMBED_CACHE_SIZE,
+        max_disk_entries: int = QUERY_EMBED_DISK_MAX,
+    ):
+        # path=None: hanya di memori
+        self.path = Path(path) if path is not None else None
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        # jumlah baris di disk saat terakhir dihitung (file dibagi antar worker)
+        self._disk_entries = 0
+        self._mem: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "disk_hits": 0, "misses": 0, "warmed": 0, "encode_calls": 0, "evicted": 0}
+        self.encode_seconds = 0.0
+
+    def _db(self) -> Optional[sqlite3.Connection]:
+        if self.path is None:
+            return None
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(query_embeddings)")}
+            if "last_used" not in columns:
+                # file cache lama tanpa kolom last_used
+                conn.execute("ALTER TABLE query_embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE query_embeddings SET last_used = created_at")
+            conn.execute(_INDEX)
+            conn.commit()
+            self._disk_entries = conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, key: Tuple[str, str], vec: np.ndarray) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _lookup(self, model: str, text: str) -> Optional[np.ndarray]:
+        key = (model, text)
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self.counters["hits"] += 1
+                return vec
+            db = self._db()
+            row = db.execute(
+                "SELECT dim, embedding FROM query_embeddings WHERE model=? AND text=?", key
+            ).fetchone() if db is not None else None
+            if row is None:
+                return None
+            db.execute("UPDATE query_embeddings SET last_used=? WHERE model=? AND text=?", (time.time(), *key))
+            db.commit()
+            vec = np.frombuffer(row[1], dtype=np.float32).reshape(row[0])
+            self._remember(key, vec)
+            self.counters["disk_hits"] += 1
+            return vec
+
+    def _store(self, model: str, texts: Sequence[str], vectors: np.ndarray) -> None:
+        now = time.time()
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                self._remember((model, text), vec)
+            db = self._db()
+            if db is not None:
+                db.executemany(
+                    "INSERT OR REPLACE INTO query_embeddings(model, text, dim, embedding, created_at, last_used) "
+                    "VALUES(?,?,?,?,?,?)",
+                    [(model, t, v.shape[0], v.tobytes(), now, now) for t, v in zip(texts, vectors)],
+                )
+                # dihitung ulang setiap tulis (murah dibanding encode yang baru terjadi),
+                # jadi baris dari worker lain ikut terhitung
+                self._evict_lru(db)
+                db.commit()
+
+    def _evict_lru(self, db: sqlite3.Connection) -> None:
+        """Hapus baris yang paling lama tidak dipakai sampai jumlahnya <= max_disk_entries."""
+        self._disk_entries = db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        drop = self._disk_entries - self.max_disk_entries
+        if drop <= 0:
+            return
+        db.execute(
+            "DELETE FROM query_embeddings WHERE rowid IN "
+            "(SELECT rowid FROM query_embeddings ORDER BY last_used LIMIT ?)",
+            (drop,),
+        )
+        self._disk_entries -= drop
+        self.counters["evicted"] += drop
+
+    def encode(self, model: str, texts: Sequence[str], encoder: Encoder) -> np.ndarray:
+        """Embedding float32 (len(texts), dim); hanya teks yang belum ada yang di-encode (sekali batch)."""
+        out: List[Optional[np.ndarray]] = [self._lookup(model, t) for t in texts]
+        missing = sorted({t for t, v in zip(texts, out) if v is None})
+        if missing:
+            with self._lock:
+                self.counters["misses"] += len(missing)
+                self.counters["encode_calls"] += 1
+            started = time.perf_counter()
+            vectors = np.asarray(encoder(missing), dtype=np.float32).reshape(len(missing), -1)
+            self.encode_seconds += time.perf_counter() - started
+            vectors = [np.ascontiguousarray(v) for v in vectors]
+            self._store(model, missing, vectors)
+            fresh = dict(zip(missing, vectors))
+            out = [v if v is not None else fresh[t] for t, v in zip(texts, out)]
+        return np.stack(out) if out else np.empty((0, 0), dtype=np.float32)
+
+    def warm(self, model: str, texts: Sequence[str], encoder: Encoder) -> int:
+        """Isi cache untuk teks yang sering dipakai; mengembalikan jumlah yang baru di-encode."""
+        before = self.counters["misses"]
+        self.encode(model, list(dict.fromkeys(texts)), encoder)
+        added = self.counters["misses"] - before
+        self.counters["warmed"] += added
+        return added
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self.counters)
+            entries = len(self._mem)
+            disk_entries = self._disk_entries
+        lookups = c["hits"] + c["disk_hits"] + c["misses"]
+        return dict(
+            c,
+            entries=entries,
+            disk_entries=disk_entries,
+            hit_rate=round((c["hits"] + c["disk_hits"]) / lookups, 4) if lookups else None,
+            encode_ms_avg=round(self.encode_seconds / c["encode_calls"] * 1000, 2) if c["encode_calls"] else None,
+        )
+
+
+query_embedding_cache = QueryEmbeddingCache()
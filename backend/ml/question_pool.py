@@ -0,0 +1,275 @@
+"""
+Stok soal assessment hasil pre-generate Gemini.
+
+prepare_assessment mencatat subskill yang soal dataset-nya kurang (demand) lalu
+mengambil soal dari stok di SQLite. Worker background mengisi ulang stok setiap
+subskill yang diminta sampai QUESTION_POOL_TARGET, begitu stoknya turun di bawah
+QUESTION_POOL_REFILL_AT. Soal yang diberikan ke pengguna diambil dari stok (tidak
+dipakai ulang), jadi setiap assessment mendapat soal baru.
+
+Setiap worker uvicorn menjalankan thread worker, tetapi hanya pemegang lease
+"question_pool" di tabel worker_leases yang benar-benar mengisi ulang (dan memanggil
+Gemini). Worker lain hanya mencoba mengambil alih lease tiap siklus, jadi jika
+pemegangnya mati, lease diambil alih setelah QUESTION_POOL_LEASE_TTL.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from ..db import execute, query, transaction
+from ..llm.gemini_client import GEMINI_API_KEY
+
+
+QUESTION_POOL_TARGET = int(os.getenv("QUESTION_POOL_TARGET", "9"))
+QUESTION_POOL_REFILL_AT = int(os.getenv("QUESTION_POOL_REFILL_AT", "3"))
+QUESTION_POOL_BATCH = int(os.getenv("QUESTION_POOL_BATCH", "3"))
+# Jeda antar siklus worker (detik); demand baru membangunkan worker lebih awal
+QUESTION_POOL_INTERVAL = float(os.getenv("QUESTION_POOL_INTERVAL", "60"))
+# Subskill yang gagal di-generate dicoba lagi setelah jeda ini
+QUESTION_POOL_RETRY_AFTER = float(os.getenv("QUESTION_POOL_RETRY_AFTER", "300"))
+# Jika stok habis, prepare_assessment tetap memanggil Gemini langsung (perilaku lama)
+QUESTION_POOL_SYNC_FALLBACK = os.getenv("QUESTION_POOL_SYNC_FALLBACK", "1") != "0"
+# Masa berlaku lease refill (detik); harus lebih lama dari satu panggilan Gemini.
+# Pemegang lease memperbaruinya tiap siklus dan sebelum setiap generate.
+QUESTION_POOL_LEASE_TTL = float(os.getenv("QUESTION_POOL_LEASE_TTL", "180"))
+LEASE_NAME = "question_pool"
+
+_WS_RE = re.compile(r"\s+")
+_OPTION_RE = re.compile(r"^[A-D]\.\s*\S")
+
+Question = Dict[str, Any]
+
+
+def subskill_key(subskill: str) -> str:
+    return _WS_RE.sub(" ", subskill or "").strip().casefold()
+
+
+def validate_question(q: Question) -> bool:
+    """Soal layak disimpan: ada teks, tepat 4 opsi A-D berurutan, jawaban salah satu opsi."""
+    if not isinstance(q, dict) or not str(q.get("question") or "").strip():
+        return False
+    options = q.get("options") or []
+    if len(options) != 4:
+        return False
+    for letter, opt in zip("ABCD", options):
+        if not isinstance(opt, str) or not opt.startswith(letter) or not _OPTION_RE.match(opt):
+            return False
+    return q.get("answer") in ("A", "B", "C", "D")
+
+
+class QuestionPool:
+    def __init__(
+        self,
+        generator: Optional[Callable[[str, int], List[Question]]] = None,
+        target: int = QUESTION_POOL_TARGET,
+        refill_at: int = QUESTION_POOL_REFILL_AT,
+        batch: int = QUESTION_POOL_BATCH,
+        interval: float = QUESTION_POOL_INTERVAL,
+        lease_ttl: float = QUESTION_POOL_LEASE_TTL,
+    ):
+        self._generator = generator
+        self.target = target
+        self.refill_at = refill_at
+        self.batch = batch
+        self.interval = interval
+        self.lease_ttl = lease_ttl
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._failed_at: Dict[str, float] = {}
+        self.counters = {"served": 0, "generated": 0, "rejected": 0, "failures": 0, "cycles": 0, "skipped": 0}
+
+    @property
+    def enabled(self) -> bool:
+        # tanpa API key generator bawaan hanya menghasilkan soal dummy, jangan disimpan
+        return self._generator is not None or bool(GEMINI_API_KEY)
+
+    def _generate(self, subskill: str, n: int) -> List[Question]:
+        if self._generator is None:
+            from .assessment_engine import generate_questions_gemini
+            return generate_questions_gemini(subskill, num_questions=n, use_cache=False)
+        return self._generator(subskill, n)
+
+    # ---- dipakai request ----
+    def record_demand(self, subskill: str) -> None:
+        key = subskill_key(subskill)
+        if not key:
+            return
+        with transaction() as conn:
+            execute(
+                conn,
+                "INSERT INTO question_demand(subskill_key, subskill, requests) VALUES(?,?,1) "
+                "ON CONFLICT(subskill_key) DO UPDATE SET requests=requests+1, last_requested=CURRENT_TIMESTAMP",
+                (key, subskill),
+            )
+        self._wake.set()
+
+    def take(self, subskill: str, n: int) -> List[Question]:
+        """Ambil (dan keluarkan) hingga n soal dari stok subskill."""
+        key = subskill_key(subskill)
+        if n <= 0 or not key:
+            return []
+        with transaction() as conn:
+            rows = query(
+                conn,
+                "SELECT id, question, options, answer FROM generated_questions "
+                "WHERE subskill_key=? ORDER BY RANDOM() LIMIT ?",
+                (key, n),
+            )
+            if rows:
+                ids = [r["id"] for r in rows]
+                execute(conn, f"DELETE FROM generated_questions WHERE id IN ({','.join('?' * len(ids))})", tuple(ids))
+        self.counters["served"] += len(rows)
+        if rows:
+            self._wake.set()
+        return [{"question": r["question"], "options": json.loads(r["options"]), "answer": r["answer"]} for r in rows]
+
+    def inventory(self, subskill: Optional[str] = None) -> Dict[str, int]:
+        with transaction() as conn:
+            if subskill is not None:
+                rows = query(
+                    conn,
+                    "SELECT subskill_key, COUNT(*) AS n FROM generated_questions WHERE subskill_key=? GROUP BY subskill_key",
+                    (subskill_key(subskill),),
+                )
+            else:
+                rows = query(conn, "SELECT subskill_key, COUNT(*) AS n FROM generated_questions GROUP BY subskill_key")
+        return {r["subskill_key"]: r["n"] for r in rows}
+
+    # ---- worker ----
+    def store(self, subskill: str, questions: List[Question]) -> int:
+        key = subskill_key(subskill)
+        valid = [q for q in questions if validate_question(q)]
+        self.counters["rejected"] += len(questions) - len(valid)
+        stored = 0
+        with transaction() as conn:
+            for q in valid:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO generated_questions(subskill_key, subskill, question, options, answer) "
+                    "VALUES(?,?,?,?,?)",
+                    (key, subskill, q["question"].strip(), json.dumps(q["options"], ensure_ascii=False), q["answer"]),
+                )
+                stored += cur.rowcount
+        self.counters["generated"] += stored
+        return stored
+
+    def acquire_lease(self) -> bool:
+        """Ambil atau perpanjang lease refill; False jika dipegang worker lain yang masih hidup."""
+        now = time.time()
+        with transaction() as conn:
+            # satu UPSERT atomik: hanya berhasil jika lease milik sendiri atau sudah kedaluwarsa
+            cur = conn.execute(
+                "INSERT INTO worker_leases(name, owner, expires_at) VALUES(?,?,?) "
+                "ON CONFLICT(name) DO UPDATE SET owner=excluded.owner, expires_at=excluded.expires_at "
+                "WHERE worker_leases.owner=excluded.owner OR worker_leases.expires_at <= ?",
+                (LEASE_NAME, self.owner, now + self.lease_ttl, now),
+            )
+            self.leader = cur.rowcount == 1
+        return self.leader
+
+    def release_lease(self) -> None:
+        with transaction() as conn:
+            execute(conn, "DELETE FROM worker_leases WHERE name=? AND owner=?", (LEASE_NAME, self.owner))
+        self.leader = False
+
+    def needs_refill(self) -> List[Dict[str, Any]]:
+        """Subskill yang diminta dengan stok di bawah ambang, paling sering diminta dulu."""
+        if not self.enabled:
+            return []
+        with transaction() as conn:
+            rows = query(
+                conn,
+                "SELECT d.subskill_key, d.subskill, d.requests, "
+                "(SELECT COUNT(*) FROM generated_questions g WHERE g.subskill_key = d.subskill_key) AS stock "
+                "FROM question_demand d ORDER BY d.requests DESC",
+            )
+        now = time.time()
+        return [
+            {"subskill": r["subskill"], "stock": r["stock"], "requests": r["requests"]}
+            for r in rows
+            if r["stock"] < self.refill_at
+            and now - self._failed_at.get(r["subskill_key"], 0.0) >= QUESTION_POOL_RETRY_AFTER
+        ]
+
+    def refill_once(self) -> int:
+        """Satu siklus isi ulang; mengembalikan jumlah soal baru yang tersimpan."""
+        self.counters["cycles"] += 1
+        total = 0
+        if not self.enabled:
+            return total
+        if not self.acquire_lease():
+            self.counters["skipped"] += 1
+            return total
+        for item in self.needs_refill():
+            if self._stop.is_set():
+                break
+            subskill, stock = item["subskill"], item["stock"]
+            while stock < self.target and not self._stop.is_set():
+                # perpanjang lease sebelum panggilan Gemini; jika hilang, worker lain yang lanjut
+                if not self.acquire_lease():
+                    return total
+                try:
+                    added = self.store(subskill, self._generate(subskill, min(self.batch, self.target - stock)))
+                except Exception as e:
+                    print(f"⚠️ Pre-generate soal gagal untuk {subskill}: {e}")
+                    added = 0
+                if added == 0:
+                    # Gemini gagal / hanya mengulang soal lama: coba lagi nanti
+                    self.counters["failures"] += 1
+                    self._failed_at[subskill_key(subskill)] = time.time()
+                    break
+                stock += added
+                total += added
+        return total
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refill_once()
+            except Exception as e:
+                print(f"⚠️ Question pool worker error: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="question-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+            try:
+                self.release_lease()
+            except Exception as e:
+                print(f"⚠️ Gagal melepas lease question pool: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        inventory = self.inventory()
+        return dict(
+            self.counters,
+            enabled=self.enabled,
+            running=self._thread is not None and self._thread.is_alive(),
+            leader=self.leader,
+            target=self.target,
+            refill_at=self.refill_at,
+            subskills=len(inventory),
+            stock=sum(inventory.values()),
+        )
+
+
+question_pool = QuestionPool()
@@ -3,19 +3,10 @@ from __future__ import annotations
 import re
 from typing import List, Dict, Any, Tuple
 
-try:
-    from rank_bm25 import BM25Okapi  # type: ignore
-except Exception:  # pragma: no cover
-    BM25Okapi = None  # fallback nanti
-
-try:
-    from rapidfuzz import process, fuzz  # type: ignore
-except Exception:  # pragma: no cover
-    process = None
-    fuzz = None
-
 from ..utils import supabase_client as sb
 from ..services.data_loader import load_excel_as_records
+from .bm25_index import CorpusIndex
+from .keyword_index import get_keyword_index
 
 
 DEFAULT_SUBSKILLS = [
@@ -63,36 +54,27 @@ def extract_skills(text: str, candidates: List[str] | None = None, limit: int =
     Mengembalikan (skill, skor 0..100).
     """
     cands = candidates or DEFAULT_SUBSKILLS
-    if process and fuzz:  # gunakan rapidfuzz jika ada
-        results = process.extract(text, cands, scorer=fuzz.token_set_ratio, limit=limit)
-        return [(r[0], float(r[1])) for r in results if r[1] >= 60]
-    # fallback: substring match kasar
-    t = text.lower()
-    out: List[Tuple[str, float]] = []
-    for s in cands:
-        out.append((s, 100.0 if s.lower() in t else 0.0))
-    return [x for x in out if x[1] > 0]
+    return get_keyword_index(cands).extract(text, limit=limit, min_score=60)
 
 
-def recommend_by_query(query: str, limit: int = 10) -> List[Dict[str, Any]]:
-    """Rekomendasi kursus berbasis kemiripan BM25 pada name/description."""
-    rows = load_courses(limit=1000)
-    corpus = []
-    for r in rows:
-        text = " ".join(str(r.get(k, "")) for k in ("name", "title", "course_name", "description"))
-        corpus.append(tokenize(text))
+def _course_text(row: Dict[str, Any]) -> str:
+    return " ".join(str(row.get(k, "")) for k in ("name", "title", "course_name", "description"))
 
-    q_tokens = tokenize(query)
-    if BM25Okapi and corpus and q_tokens:
-        bm25 = BM25Okapi(corpus)
-        scores = bm25.get_scores(q_tokens)
-        ranked = sorted(zip(rows, scores), key=lambda x: x[1], reverse=True)
-        return [r for r, s in ranked[:limit]]
 
-    # fallback: frekuensi sederhana
-    def score(doc: List[str]) -> int:
-        return sum(doc.count(t) for t in set(q_tokens))
+def _course_key(row: Dict[str, Any]):
+    return row.get("id") or row.get("course_id")
+
 
-    ranked = sorted(zip(rows, [score(d) for d in corpus]), key=lambda x: x[1], reverse=True)
-    return [r for r, s in ranked[:limit]]
+# Index dibangun sekali dan hanya diperbarui saat snapshot katalog berganti
+course_index = CorpusIndex(_course_text, tokenize, key_fn=_course_key)
 
+
+def recommend_by_query(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """Rekomendasi kursus berbasis kemiripan BM25 pada name/description."""
+    rows = load_courses(limit=1000)
+    q_tokens = tokenize(query)
+    if not rows:
+        return []
+    if not q_tokens:
+        return rows[:limit]
+    return course_index.search(rows, q_tokens, limit)
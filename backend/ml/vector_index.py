@@ -0,0 +1,341 @@
+"""
+Index vektor untuk retrieval kursus/tutorial dalam skala katalog.
+
+Dua backend dengan antarmuka yang sama (add / search / save / load):
+- "brute": skor semua baris di partisi filter (exact, cocok sampai ribuan baris);
+- "ivf":   inverted file NumPy murni. Vektor dikelompokkan dengan spherical k-means
+           ke `nlist` centroid; query hanya menskor isi `nprobe` list terdekat.
+
+Filter learning_path / level dilakukan sebelum skor (pre-filtering): partisi
+metadata disimpan sebagai daftar id, dan jika partisi cukup kecil IVF langsung
+menskor partisi itu secara exact supaya filter yang sempit tidak kehilangan hasil.
+Vektor dinormalisasi L2, skor = cosine. Penambahan vektor bersifat incremental;
+IVF melatih centroid otomatis begitu jumlah vektor mencapai `train_min`.
+
+Benchmark: python -m backend.scripts.bench_vector_index
+"""
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .embedding_index import PartitionKey, level_key, normalize_rows, partition_keys, top_k_indices
+
+
+VECTOR_INDEX_BACKEND = os.getenv("VECTOR_INDEX_BACKEND", "brute")
+IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))  # 0 = otomatis ~ sqrt(n)
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "8"))
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+
+class VectorIndex(ABC):
+    """Basis bersama: penyimpanan vektor yang bisa tumbuh + partisi metadata."""
+
+    kind = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._vectors = np.empty((0, dim), dtype=np.float32)
+        self._n = 0
+        self.learning_paths: List[Optional[str]] = []
+        self.levels: List[Optional[str]] = []
+        self._partitions: Dict[PartitionKey, List[int]] = {}
+        self._partition_arrays: Dict[PartitionKey, np.ndarray] = {}
+        self._partition_masks: Dict[PartitionKey, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self._vectors[: self._n]
+
+    def add(
+        self,
+        vectors: Any,
+        learning_paths: Optional[Sequence[Any]] = None,
+        levels: Optional[Sequence[Any]] = None,
+    ) -> np.ndarray:
+        """Tambah vektor (beserta metadata); mengembalikan id baris baru."""
+        vecs = normalize_rows(vectors)
+        if vecs.shape[1] != self.dim:
+            raise ValueError(f"Dimensi vektor {vecs.shape[1]} != {self.dim}")
+        m = len(vecs)
+        learning_paths = list(learning_paths) if learning_paths is not None else [None] * m
+        levels = list(levels) if levels is not None else [None] * m
+        if len(learning_paths) != m or len(levels) != m:
+            raise ValueError("Jumlah metadata tidak sama dengan jumlah vektor")
+
+        if self._n + m > len(self._vectors):
+            # kapasitas tumbuh 2x supaya penambahan berulang tetap amortized O(1)
+            grown = np.empty((max(self._n + m, 2 * len(self._vectors), 64), self.dim), dtype=np.float32)
+            grown[: self._n] = self._vectors[: self._n]
+            self._vectors = grown
+        self._vectors[self._n : self._n + m] = vecs
+        ids = np.arange(self._n, self._n + m, dtype=np.int64)
+        self._n += m
+
+        for i, lp, lv in zip(ids.tolist(), learning_paths, levels):
+            lp = lp if isinstance(lp, str) else None
+            self.learning_paths.append(lp)
+            self.levels.append(level_key(lv))
+            for key in partition_keys(lp, lv):
+                self._partitions.setdefault(key, []).append(i)
+                self._partition_arrays.pop(key, None)
+        self._partition_masks.clear()
+        self._on_add(ids, vecs)
+        return ids
+
+    def _on_add(self, ids: np.ndarray, vecs: np.ndarray) -> None:
+        pass
+
+    def rows_for(self, learning_path: Optional[str] = None, level: Optional[str] = None) -> np.ndarray:
+        key = (learning_path, level_key(level))
+        arr = self._partition_arrays.get(key)
+        if arr is None:
+            arr = np.asarray(self._partitions.get(key, []), dtype=np.int64)
+            self._partition_arrays[key] = arr
+        return arr
+
+    def mask_for(self, learning_path: Optional[str] = None, level: Optional[str] = None) -> np.ndarray:
+        """Mask boolean per id untuk filter (dipakai menyaring kandidat IVF)."""
+        key = (learning_path, level_key(level))
+        mask = self._partition_masks.get(key)
+        if mask is None:
+            mask = np.zeros(self._n, dtype=bool)
+            mask[self.rows_for(learning_path, level)] = True
+            self._partition_masks[key] = mask
+        return mask
+
+    def _exact(self, q: np.ndarray, rows: Optional[np.ndarray], k: int) -> SearchResult:
+        if rows is None:
+            scores = self.vectors @ q
+            best = top_k_indices(scores, k)
+            return best, scores[best]
+        scores = self._vectors[rows] @ q
+        best = top_k_indices(scores, k)
+        return rows[best], scores[best]
+
+    @abstractmethod
+    def search(
+        self,
+        query: Any,
+        k: int,
+        learning_path: Optional[str] = None,
+        level: Optional[str] = None,
+    ) -> SearchResult:
+        """(id, skor) top-k untuk satu query, setelah filter learning_path/level."""
+
+    def score_many(self, queries: np.ndarray) -> np.ndarray:
+        """Skor exact (jumlah query x semua vektor), untuk rekomendasi batch."""
+        return queries @ self.vectors.T
+
+    # ---- persistensi ----
+    def _state(self) -> Dict[str, np.ndarray]:
+        return {
+            "kind": np.array(self.kind),
+            "vectors": self.vectors,
+            "learning_paths": np.array([lp or "" for lp in self.learning_paths], dtype=str),
+            "levels": np.array([lv or "" for lv in self.levels], dtype=str),
+        }
+
+    def save(self, path: Path | str) -> Path:
+        """Simpan ke .npz secara atomik (tmp + os.replace)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **self._state())
+        os.replace(tmp, path)
+        return path
+
+
+class BruteForceIndex(VectorIndex):
+    kind = "brute"
+
+    def search(self, query, k, learning_path=None, level=None) -> SearchResult:
+        q = normalize_rows(query)[0]
+        if learning_path is None and level is None:
+            return self._exact(q, None, k)
+        return self._exact(q, self.rows_for(learning_path, level), k)
+
+
+class IVFIndex(VectorIndex):
+    kind = "ivf"
+
+    def __init__(
+        self,
+        dim: int,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        train_min: int = 1024,
+        exact_below: int = 2048,
+        seed: int = 0,
+    ):
+        super().__init__(dim)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_min = train_min
+        # partisi filter sekecil ini diskor exact (lebih murah & tanpa kehilangan recall)
+        self.exact_below = exact_below
+        self.seed = seed
+        self.centroids: Optional[np.ndarray] = None
+        self._assign = np.empty(0, dtype=np.int64)
+        self._lists: List[List[int]] = []
+        self._list_arrays: Dict[int, np.ndarray] = {}
+        self._filtered_lists: Dict[PartitionKey, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, iterations: int = 12, sample: int = 64) -> None:
+        """Spherical k-means pada (sampel) vektor yang ada, lalu bangun ulang inverted list."""
+        n = self._n
+        if n == 0:
+            return
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        rng = np.random.default_rng(self.seed)
+        data = self.vectors
+        if n > nlist * sample:
+            data = data[rng.choice(n, size=nlist * sample, replace=False)]
+        centroids = data[rng.choice(len(data), size=nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            counts = np.bincount(assign, minlength=nlist)
+            order = np.argsort(assign, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+            filled = counts > 0
+            sums = np.empty_like(centroids)
+            sums[filled] = np.add.reduceat(data[order], starts[filled], axis=0)
+            # centroid kosong diisi ulang dengan titik acak
+            sums[~filled] = data[rng.choice(len(data), size=int((~filled).sum()))]
+            centroids = normalize_rows(sums)
+        self._set_centroids(centroids)
+        self._on_add(np.arange(n, dtype=np.int64), self.vectors)
+
+    def _set_centroids(self, centroids: np.ndarray) -> None:
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.nlist = len(centroids)
+        self._assign = np.empty(0, dtype=np.int64)
+        self._lists = [[] for _ in range(self.nlist)]
+        self._list_arrays = {}
+        self._filtered_lists = {}
+
+    def _on_add(self, ids: np.ndarray, vecs: np.ndarray) -> None:
+        if self.centroids is None:
+            if self._n >= self.train_min:
+                self.train()
+            return
+        assign = np.empty(len(vecs), dtype=np.int64)
+        for start in range(0, len(vecs), 4096):
+            block = vecs[start : start + 4096]
+            assign[start : start + len(block)] = np.argmax(block @ self.centroids.T, axis=1)
+        self._assign = np.concatenate([self._assign, assign])
+        self._filtered_lists.clear()
+        for i, c in zip(ids.tolist(), assign.tolist()):
+            self._lists[c].append(i)
+            self._list_arrays.pop(c, None)
+
+    def _list(self, c: int) -> np.ndarray:
+        arr = self._list_arrays.get(c)
+        if arr is None:
+            arr = np.asarray(self._lists[c], dtype=np.int64)
+            self._list_arrays[c] = arr
+        return arr
+
+    def _lists_for(self, learning_path: Optional[str], level: Optional[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Inverted list yang hanya berisi anggota partisi filter: (id terurut per list, offset)."""
+        key = (learning_path, level_key(level))
+        cached = self._filtered_lists.get(key)
+        if cached is None:
+            rows = self.rows_for(learning_path, level)
+            lists = self._assign[rows]
+            order = np.argsort(lists, kind="stable")
+            offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+            np.cumsum(np.bincount(lists, minlength=self.nlist), out=offsets[1:])
+            cached = (rows[order], offsets)
+            self._filtered_lists[key] = cached
+        return cached
+
+    def search(self, query, k, learning_path=None, level=None, nprobe: Optional[int] = None) -> SearchResult:
+        q = normalize_rows(query)[0]
+        filtered = learning_path is not None or level is not None
+        rows = self.rows_for(learning_path, level) if filtered else None
+        if self.centroids is None or (rows is not None and len(rows) <= self.exact_below):
+            return self._exact(q, rows, k)
+
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        centroid_scores = self.centroids @ q
+        if not filtered:
+            probe = top_k_indices(centroid_scores, nprobe)
+            cand = np.concatenate([self._list(int(c)) for c in probe])
+            return self._exact(q, cand, k)
+
+        # pre-filter: probe nprobe list terdekat yang punya anggota partisi filter
+        ids, offsets = self._lists_for(learning_path, level)
+        nonempty = np.flatnonzero(offsets[1:] > offsets[:-1])
+        probe = nonempty[top_k_indices(centroid_scores[nonempty], nprobe)]
+        cand = np.concatenate([ids[offsets[c] : offsets[c + 1]] for c in probe])
+        return self._exact(q, cand, k)
+
+    def _state(self) -> Dict[str, np.ndarray]:
+        state = super()._state()
+        state.update(
+            nlist=np.array(self.nlist),
+            nprobe=np.array(self.nprobe),
+            train_min=np.array(self.train_min),
+            exact_below=np.array(self.exact_below),
+        )
+        if self.centroids is not None:
+            state.update(centroids=self.centroids)
+        return state
+
+
+BACKENDS = {"brute": BruteForceIndex, "ivf": IVFIndex}
+
+
+def create_index(dim: int, kind: str = VECTOR_INDEX_BACKEND, **kwargs) -> VectorIndex:
+    if kind not in BACKENDS:
+        raise ValueError(f"Backend vector index tidak dikenal: {kind}")
+    return BACKENDS[kind](dim, **kwargs)
+
+
+def build_index(
+    vectors: Any,
+    learning_paths: Optional[Sequence[Any]] = None,
+    levels: Optional[Sequence[Any]] = None,
+    kind: str = VECTOR_INDEX_BACKEND,
+    **kwargs,
+) -> VectorIndex:
+    """Index baru dari seluruh vektor sekaligus (IVF dilatih sekali setelah semua masuk)."""
+    vecs = normalize_rows(vectors)
+    index = create_index(vecs.shape[1], kind, **kwargs)
+    index.add(vecs, learning_paths, levels)
+    return index
+
+
+def load_index(path: Path | str) -> VectorIndex:
+    with np.load(path, allow_pickle=False) as data:
+        kind = str(data["kind"])
+        vectors = data["vectors"]
+        lps = [lp or None for lp in data["learning_paths"].tolist()]
+        levels = [lv or None for lv in data["levels"].tolist()]
+        if kind == "ivf":
+            index = IVFIndex(
+                vectors.shape[1], nlist=int(data["nlist"]), nprobe=int(data["nprobe"]),
+                train_min=int(data["train_min"]), exact_below=int(data["exact_below"]),
+            )
+            if "centroids" in data:
+                # pakai centroid tersimpan; add() hanya menempatkan vektor ke list-nya
+                index._set_centroids(data["centroids"])
+        else:
+            index = create_index(vectors.shape[1], kind)
+    index.add(vectors, lps, levels)
+    return index
@@ -5,7 +5,7 @@ from pydantic import BaseModel, Field
 from typing import List
 
 from ..auth import user_from_auth
-from ..db import get_conn, execute, query
+from ..db import transaction, execute, query
 
 
 router = APIRouter(prefix="/assessment", tags=["assessment"])
@@ -35,32 +35,30 @@ class SubmitReq(BaseModel):
 def submit(req: SubmitReq, email: str = Depends(user_from_auth)):
     if not req.items:
         raise HTTPException(400, "items kosong")
-    conn = get_conn()
-    for it in req.items:
-        level = to_level(it.score)
-        execute(
-            conn,
-            "INSERT INTO subskill_scores(email,role,subskill,score,level) VALUES(?,?,?,?,?)",
-            (email, req.role, it.subskill, int(it.score), level),
-        )
-    conn.close()
+    with transaction() as conn:
+        for it in req.items:
+            level = to_level(it.score)
+            execute(
+                conn,
+                "INSERT INTO subskill_scores(email,role,subskill,score,level) VALUES(?,?,?,?,?)",
+                (email, req.role, it.subskill, int(it.score), level),
+            )
     return {"status": "ok", "count": len(req.items)}
 
 
 @router.get("/last")
 def last(email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    rows = query(
-        conn,
-        """
-        SELECT role, subskill, score, level, created_at
-        FROM subskill_scores
-        WHERE email=?
-        ORDER BY id DESC
-        LIMIT 200
-        """,
-        (email,),
-    )
-    conn.close()
+    with transaction() as conn:
+        rows = query(
+            conn,
+            """
+            SELECT role, subskill, score, level, created_at
+            FROM subskill_scores
+            WHERE email=?
+            ORDER BY id DESC
+            LIMIT 200
+            """,
+            (email,),
+        )
     return [dict(r) for r in rows]
 
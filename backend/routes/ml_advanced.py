@@ -5,21 +5,24 @@ File: backend/routes/ml_advanced.py
 """
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Depends
+import threading
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any, Optional
 
 from ..auth import user_from_auth
-from ..db import get_conn, execute, query
-from ..services.data_loader import load_excel_as_records
+from ..db import get_conn, transaction, execute, query
+from ..services.datasets import load_frame
 from ..ml.job_detector import detect_job_role, detect_skills
-from ..ml.assessment_engine import prepare_assessment, calculate_level
-from ..ml.course_recommender import CourseRecommender
+from ..ml.assessment_engine import prepare_assessment, calculate_level, load_question_bank
+from ..ml.course_recommender import CourseRecommender, load_course_frames
 from ..ml.student_progress import HybridLearningRecommender
 from ..ml.roadmap_generator import RoadmapGenerator
 from ..ml.learning_strategy import LearningStrategyGenerator
 from ..ml.personal_learning import SkillPredictor
 from ..ml.roadmap_progress import RoadmapProgressPredictor
+from ..utils.fast_json import FastJSONResponse, frame_records
 
 import pandas as pd
 
@@ -40,12 +43,10 @@ class JobDetectionReq(BaseModel):
 def api_detect_job_and_skills(req: JobDetectionReq):
     """Deteksi job role dan skills dari deskripsi user."""
     try:
-        lp_data = load_excel_as_records("LP and Course Mapping.xlsx", "Learning Path")
-        lp_df = pd.DataFrame(lp_data)
+        lp_df = load_frame("LP and Course Mapping.xlsx", "Learning Path")
         job_roles = lp_df['learning_path_name'].dropna().unique().tolist()
         
-        skill_data = load_excel_as_records("Resource Data Learning Buddy.xlsx", "Skill Keywords")
-        skill_df = pd.DataFrame(skill_data)
+        skill_df = load_frame("Resource Data Learning Buddy.xlsx", "Skill Keywords")
         valid_keywords = skill_df['keyword'].dropna().tolist()
     except Exception as e:
         raise HTTPException(500, f"Failed to load datasets: {e}")
@@ -75,13 +76,11 @@ class AssessmentReq(BaseModel):
 def api_generate_assessment(req: AssessmentReq):
     """Generate assessment untuk subskill yang dipilih."""
     try:
-        tech_qs_df = pd.DataFrame(
-            load_excel_as_records("Resource Data Learning Buddy.xlsx", "Current Tech Questions")
-        )
+        question_bank = load_question_bank()
     except Exception as e:
         raise HTTPException(500, f"Failed to load tech questions: {e}")
     
-    assessment = prepare_assessment(req.subskills, tech_qs_df, total_questions=req.total_questions)
+    assessment = prepare_assessment(req.subskills, question_bank, total_questions=req.total_questions)
     
     return {
         "assessment": assessment,
@@ -145,17 +144,16 @@ def api_submit_assessment(req: SubmitAssessmentReq, email: str = Depends(user_fr
     aggregate_level = level_count.most_common(1)[0][0] if aggregate_scores else "Beginner"
     
     # Save to database
-    conn = get_conn()
-    for subskill, res in results.items():
-        try:
-            execute(
-                conn,
-                "INSERT INTO subskill_scores(email,role,subskill,score,level) VALUES(?,?,?,?,?)",
-                (email, "Unknown", subskill, res["score"], res["level"])
-            )
-        except Exception as e:
-            print(f"Failed to save {subskill}: {e}")
-    conn.close()
+    with transaction() as conn:
+        for subskill, res in results.items():
+            try:
+                execute(
+                    conn,
+                    "INSERT INTO subskill_scores(email,role,subskill,score,level) VALUES(?,?,?,?,?)",
+                    (email, "Unknown", subskill, res["score"], res["level"])
+                )
+            except Exception as e:
+                print(f"Failed to save {subskill}: {e}")
     
     return {
         "status": "ok",
@@ -174,6 +172,16 @@ class CourseRecommendReq(BaseModel):
     top_k: int = Field(default=10, ge=1, le=50)
 
 
+class CourseQuery(BaseModel):
+    user_input: str
+    user_level: Optional[str] = None
+
+
+class CourseRecommendBatchReq(BaseModel):
+    queries: List[CourseQuery] = Field(..., min_length=1, max_length=5000)
+    top_k: int = Field(default=10, ge=1, le=50)
+
+
 _course_recommender = None
 
 
@@ -183,17 +191,11 @@ def get_course_recommender() -> CourseRecommender:
         _course_recommender = CourseRecommender()
         
         try:
-            lp_answer_df = pd.DataFrame(
-                load_excel_as_records("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
-            )
-            course_df = pd.DataFrame(
-                load_excel_as_records("LP and Course Mapping.xlsx", "Course")
-            )
-            
-            _course_recommender.prepare_courses(lp_answer_df, course_df)
+            _course_recommender.prepare_courses(*load_course_frames())
             
-            if not _course_recommender.load_embeddings():
-                _course_recommender.build_embeddings(save=True)
+            if not _course_recommender.load_embeddings() and _course_recommender.model is not None:
+                _course_recommender.refresh_embeddings()
+            _course_recommender.warm_query_cache()
         
         except Exception as e:
             print(f"Failed to initialize CourseRecommender: {e}")
@@ -201,7 +203,7 @@ def get_course_recommender() -> CourseRecommender:
     return _course_recommender
 
 
-@router.post("/recommend_courses_st")
+@router.post("/recommend_courses_st", response_class=FastJSONResponse)
 def api_recommend_courses_st(req: CourseRecommendReq):
     """Rekomendasi course dengan Sentence Transformer."""
     recommender = get_course_recommender()
@@ -213,13 +215,72 @@ def api_recommend_courses_st(req: CourseRecommendReq):
             top_k=req.top_k
         )
         
-        return {
-            "courses": results.to_dict('records')
-        }
+        # DataFrame langsung di-encode per kolom (NaN/Infinity -> null)
+        return FastJSONResponse({"courses": results})
     except Exception as e:
         raise HTTPException(500, f"Recommendation failed: {e}")
 
 
+@router.post("/recommend_courses_st/batch", response_class=FastJSONResponse)
+def api_recommend_courses_st_batch(req: CourseRecommendBatchReq, email: str = Depends(user_from_auth)):
+    """
+    Rekomendasi course untuk banyak query sekaligus (satu encode + satu matriks skor).
+    Butuh login: hingga 5000 query per panggilan, setiap miss cache memicu encode.
+    """
+    recommender = get_course_recommender()
+    
+    try:
+        results = recommender.recommend_many(
+            [(q.user_input, q.user_level) for q in req.queries],
+            top_k=req.top_k,
+        )
+        return FastJSONResponse({"results": [{"courses": courses} for courses in results]})
+    except Exception as e:
+        raise HTTPException(500, f"Recommendation failed: {e}")
+
+
+_embedding_refresh: Dict[str, Any] = {"last": None, "error": None}
+# Dipegang selama refresh berjalan; hanya satu refresh per proses walau POST datang bersamaan
+_embedding_refresh_lock = threading.Lock()
+
+
+def _embedding_refresh_state() -> Dict[str, Any]:
+    return {"running": _embedding_refresh_lock.locked(), **_embedding_refresh}
+
+
+def _run_embedding_refresh() -> None:
+    # lock diambil di task (bukan di handler), jadi tidak tertahan jika task tidak pernah jalan
+    if not _embedding_refresh_lock.acquire(blocking=False):
+        return
+    try:
+        # data kursus dibaca ulang dari Excel, jadi baris yang diubah ikut di-encode
+        _embedding_refresh["last"] = get_course_recommender().refresh_embeddings(reload_data=True)
+        _embedding_refresh["error"] = None
+    except Exception as e:
+        _embedding_refresh["error"] = str(e)
+    finally:
+        _embedding_refresh_lock.release()
+
+
+@router.post("/embeddings/refresh", status_code=202)
+def api_refresh_embeddings(background: BackgroundTasks, email: str = Depends(user_from_auth)):
+    """
+    Baca ulang data kursus dari Excel lalu rebuild embedding secara incremental di
+    background. Request rekomendasi tetap dilayani dari data + store lama sampai
+    keduanya di-swap bersama. Worker lain melihat file store berganti pada request
+    berikutnya, membaca ulang data kursus, dan memakai store baru jika korpusnya cocok.
+    """
+    if _embedding_refresh_lock.locked():
+        return {"status": "running", **_embedding_refresh_state()}
+    background.add_task(_run_embedding_refresh)
+    return {"status": "started", **_embedding_refresh_state()}
+
+
+@router.get("/embeddings/refresh")
+def api_refresh_embeddings_status(email: str = Depends(user_from_auth)):
+    return _embedding_refresh_state()
+
+
 # ==========================================
 # 5. PROGRESS TRACKING BY EMAIL
 # ==========================================
@@ -236,18 +297,10 @@ def get_hybrid_recommender() -> HybridLearningRecommender:
         
         try:
             print("📂 Loading datasets for progress tracking...")
-            lp_answer = pd.DataFrame(
-                load_excel_as_records("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
-            )
-            course = pd.DataFrame(
-                load_excel_as_records("LP and Course Mapping.xlsx", "Course")
-            )
-            stud_progress = pd.DataFrame(
-                load_excel_as_records("Resource Data Learning Buddy.xlsx", "Student Progress")
-            )
-            tutorials = pd.DataFrame(
-                load_excel_as_records("LP and Course Mapping.xlsx", "Tutorials")
-            )
+            lp_answer = load_frame("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
+            course = load_frame("LP and Course Mapping.xlsx", "Course")
+            stud_progress = load_frame("Resource Data Learning Buddy.xlsx", "Student Progress")
+            tutorials = load_frame("LP and Course Mapping.xlsx", "Tutorials")
             
             print("🔄 Preparing data...")
             course_features, stud_metrics, course_data = _hybrid_recommender.prepare_data(
@@ -279,7 +332,7 @@ class ProgressEmailReq(BaseModel):
     email: str
 
 
-@router.post("/progress_by_email")
+@router.post("/progress_by_email", response_class=FastJSONResponse)
 def api_progress_by_email(req: ProgressEmailReq):
     """Get student progress by email - 100% SESUAI NOTEBOOK OUTPUT"""
     recommender = get_hybrid_recommender()
@@ -295,7 +348,7 @@ def api_progress_by_email(req: ProgressEmailReq):
         req.email, stud_metrics, course_features, course_data
     )
     
-    return {
+    return FastJSONResponse({
         "student_name": strategy['student_name'],
         "email": strategy['email'],
         "current_course": strategy['current_course'],
@@ -308,7 +361,7 @@ def api_progress_by_email(req: ProgressEmailReq):
         "next_steps": strategy['adaptive_roadmap']['next_steps'],
         "estimated_completion": strategy['adaptive_roadmap']['estimated_completion'],
         "insights": strategy['adaptive_roadmap']['insights']
-    }
+    })
 
 
 @router.get("/all_students_progress")
@@ -383,7 +436,7 @@ class RoadmapQueryReq(BaseModel):
     top_n: int = Field(default=5, ge=1, le=10)
 
 
-@router.post("/predict_next_skills")
+@router.post("/predict_next_skills", response_class=FastJSONResponse)
 def api_predict_next_skills(req: RoadmapQueryReq):
     """
     Predict next skills - sesuai notebook
@@ -400,10 +453,10 @@ def api_predict_next_skills(req: RoadmapQueryReq):
                 "message": "No recommendations found"
             }
         
-        return {
+        return FastJSONResponse({
             "query": req.query,
-            "recommendations": result.to_dict('records')
-        }
+            "recommendations": result
+        })
     
     except Exception as e:
         raise HTTPException(500, f"Prediction failed: {e}")
@@ -558,7 +611,7 @@ class BatchUserProgressReq(BaseModel):
     users: List[UserProgressReq]
 
 
-@router.post("/predict_skills_from_file")
+@router.post("/predict_skills_from_file", response_class=FastJSONResponse)
 def api_predict_skills_from_file():
     """
     Predict skills dari file Excel - 100% SESUAI NOTEBOOK
@@ -569,17 +622,17 @@ def api_predict_skills_from_file():
     try:
         user_skill_predictions = predictor.predict_from_excel()
         
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "total_users": len(user_skill_predictions),
-            "predictions": user_skill_predictions.to_dict('records')
-        }
+            "predictions": frame_records(user_skill_predictions)
+        })
     
     except Exception as e:
         raise HTTPException(500, f"Prediction failed: {e}")
 
 
-@router.post("/predict_skills_single")
+@router.post("/predict_skills_single", response_class=FastJSONResponse)
 def api_predict_skills_single(req: UserProgressReq):
     """
     Predict skills untuk 1 user
@@ -604,20 +657,20 @@ def api_predict_skills_single(req: UserProgressReq):
         }])
         
         user_skill_predictions = predictor.predict_user_progress(df_user)
-        result = user_skill_predictions.to_dict('records')[0]
+        result = frame_records(user_skill_predictions.head(1))[0]
         
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "name": result["name"],
             "email": result["email"],
             "predicted_skills": result["predicted_skills"]
-        }
+        })
     
     except Exception as e:
         raise HTTPException(500, f"Prediction failed: {e}")
 
 
-@router.post("/predict_skills_batch")
+@router.post("/predict_skills_batch", response_class=FastJSONResponse)
 def api_predict_skills_batch(req: BatchUserProgressReq):
     """
     Predict skills untuk multiple users
@@ -653,11 +706,11 @@ def api_predict_skills_batch(req: BatchUserProgressReq):
         
         user_skill_predictions = predictor.predict_user_progress(df_user)
         
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "total_users": len(user_skill_predictions),
-            "predictions": user_skill_predictions.to_dict('records')
-        }
+            "predictions": frame_records(user_skill_predictions)
+        })
     
     except Exception as e:
         raise HTTPException(500, f"Prediction failed: {e}")
@@ -684,7 +737,7 @@ def api_available_skills():
 # 9. PERSONAL LEARNING ASSISTANT FOR LOGGED USER (NEW!)
 # ==========================================
 
-@router.post("/predict_my_skills")
+@router.post("/predict_my_skills", response_class=FastJSONResponse)
 def api_predict_my_skills(email: str = Depends(user_from_auth)):
     """
     Predict skills untuk user yang sedang login - SIMPLE VERSION
@@ -739,20 +792,20 @@ def api_predict_my_skills(email: str = Depends(user_from_auth)):
         }])
         
         user_skill_predictions = predictor.predict_user_progress(df_user)
-        result = user_skill_predictions.to_dict('records')[0]
+        result = frame_records(user_skill_predictions.head(1))[0]
         
         # Parse predicted skills
         predicted_skills_str = result.get("predicted_skills", "")
         predicted_skills = [s.strip() for s in predicted_skills_str.split(",") if s.strip()]
         
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "email": email,
             "learning_path": learning_path,
             "current_course": course_name,
             "predicted_skills": predicted_skills,
             "total_skills": len(predicted_skills)
-        }
+        })
     
     except Exception as e:
         import traceback
@@ -761,7 +814,7 @@ def api_predict_my_skills(email: str = Depends(user_from_auth)):
         raise HTTPException(500, f"Prediction failed: {e}")
 
 
-@router.post("/my_learning_recommendation")
+@router.post("/my_learning_recommendation", response_class=FastJSONResponse)
 def api_my_learning_recommendation(email: str = Depends(user_from_auth)):
     """
     Get personal learning recommendation - SIMPLE VERSION (SkillPredictor only)
@@ -841,7 +894,7 @@ def api_my_learning_recommendation(email: str = Depends(user_from_auth)):
         print(f"   Course: {course_name}")
         
         user_skill_predictions = predictor.predict_user_progress(df_user)
-        result = user_skill_predictions.to_dict('records')[0]
+        result = frame_records(user_skill_predictions.head(1))[0]
         
         # Parse current skills
         predicted_skills_str = result.get("predicted_skills", "")
@@ -861,7 +914,7 @@ def api_my_learning_recommendation(email: str = Depends(user_from_auth)):
                     "minutes": int(p.get("minutes", 0)) if p.get("minutes") else 0
                 })
         
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "name": user_name,
             "email": email,
@@ -875,7 +928,7 @@ def api_my_learning_recommendation(email: str = Depends(user_from_auth)):
             "current_skills": current_skills,
             "progress_summary": progress_summary,
             "total_current_skills": len(current_skills)
-        }
+        })
     
     except Exception as e:
         import traceback
@@ -1001,15 +1054,9 @@ def get_weekly_tracker() -> SimpleLearningTracker:
         
         try:
             print("📂 Loading datasets for weekly study plan...")
-            lp_answer = pd.DataFrame(
-                load_excel_as_records("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
-            )
-            course = pd.DataFrame(
-                load_excel_as_records("LP and Course Mapping.xlsx", "Course")
-            )
-            stud_progress = pd.DataFrame(
-                load_excel_as_records("Resource Data Learning Buddy.xlsx", "Student Progress")
-            )
+            lp_answer = load_frame("Resource Data Learning Buddy.xlsx", "Learning Path Answer")
+            course = load_frame("LP and Course Mapping.xlsx", "Course")
+            stud_progress = load_frame("Resource Data Learning Buddy.xlsx", "Student Progress")
             
             print("📊 Preparing data...")
             stud_metrics, course_data = _weekly_tracker.prepare_data(lp_answer, course, stud_progress)
@@ -1255,7 +1302,7 @@ class QueryStrategyReq(BaseModel):
     query: str  # User query: "sehabis HTML, CSS apa lagi yang harus dipelajari?"
 
 
-@router.post("/generate_strategy_from_query")
+@router.post("/generate_strategy_from_query", response_class=FastJSONResponse)
 def api_generate_strategy_from_query(
     req: QueryStrategyReq, 
     email: str = Depends(user_from_auth)
@@ -1355,15 +1402,15 @@ def api_generate_strategy_from_query(
         print(f"   ✅ Strategy generated ({len(strategy)} chars)")
         
         # ✅ RETURN SUCCESS
-        return {
+        return FastJSONResponse({
             "status": "ok",
             "query": req.query,
             "detected_skills": detected_skills if detected_skills else ["Skills dari query Anda"],
             "learning_path": learning_path,
             "next_skills": next_skills,
-            "next_skills_details": next_skills_df.to_dict('records'),
+            "next_skills_details": frame_records(next_skills_df),
             "strategy": strategy
-        }
+        })
     
     except Exception as e:
         import traceback
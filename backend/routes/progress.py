@@ -6,7 +6,7 @@ from typing import Optional, List
 from datetime import datetime, timedelta
 
 from ..auth import user_from_auth
-from ..db import get_conn, execute, query
+from ..db import transaction, execute, query
 
 
 router = APIRouter(prefix="/progress", tags=["progress"])
@@ -36,45 +36,42 @@ def upsert_progress(req: ProgressReq, email: str = Depends(user_from_auth)):
     status = _map_action_to_status(req.action)
     minutes = int(req.minutes or 0)
     course_id = req.course_id or f"manual::{(req.course_name or '').strip() or 'course'}"
-    conn = get_conn()
-    # jika baris progress sudah ada untuk (email,course_id) → update, else insert
-    rows = query(conn, "SELECT id, minutes FROM progress WHERE email=? AND course_id=?", (email, course_id))
-    if rows:
-        pid = rows[0]["id"]
-        total_minutes = (rows[0]["minutes"] or 0) + minutes
-        execute(conn, "UPDATE progress SET status=?, minutes=?, updated_at=CURRENT_TIMESTAMP WHERE id=?", (status, total_minutes, pid))
-    else:
-        execute(
-            conn,
-            "INSERT INTO progress(email,course_id,course_name,subskill,status,minutes) VALUES(?,?,?,?,?,?)",
-            (email, course_id, req.course_name, req.subskill, status, minutes),
-        )
-    conn.close()
+    with transaction() as conn:
+        # jika baris progress sudah ada untuk (email,course_id) → update, else insert
+        rows = query(conn, "SELECT id, minutes FROM progress WHERE email=? AND course_id=?", (email, course_id))
+        if rows:
+            pid = rows[0]["id"]
+            total_minutes = (rows[0]["minutes"] or 0) + minutes
+            execute(conn, "UPDATE progress SET status=?, minutes=?, updated_at=CURRENT_TIMESTAMP WHERE id=?", (status, total_minutes, pid))
+        else:
+            execute(
+                conn,
+                "INSERT INTO progress(email,course_id,course_name,subskill,status,minutes) VALUES(?,?,?,?,?,?)",
+                (email, course_id, req.course_name, req.subskill, status, minutes),
+            )
     return {"status": "ok"}
 
 
 @router.get("/by_course")
 def by_course(email: str = Depends(user_from_auth)):
-    conn = get_conn()
-    rows = query(conn, "SELECT course_id, course_name, subskill, status, minutes, updated_at FROM progress WHERE email=? ORDER BY updated_at DESC", (email,))
-    conn.close()
+    with transaction() as conn:
+        rows = query(conn, "SELECT course_id, course_name, subskill, status, minutes, updated_at FROM progress WHERE email=? ORDER BY updated_at DESC", (email,))
     return [dict(r) for r in rows]
 
 
 def _summary_rows(email: str, days: int):
-    conn = get_conn()
-    rows = query(
-        conn,
-        """
-        SELECT subskill, status, COUNT(*) AS cnt, SUM(minutes) AS mins
-        FROM progress
-        WHERE email=? AND updated_at >= datetime('now', ?)
-        GROUP BY subskill, status
-        ORDER BY subskill
-        """,
-        (email, f'-{int(days)} days'),
-    )
-    conn.close()
+    with transaction() as conn:
+        rows = query(
+            conn,
+            """
+            SELECT subskill, status, COUNT(*) AS cnt, SUM(minutes) AS mins
+            FROM progress
+            WHERE email=? AND updated_at >= datetime('now', ?)
+            GROUP BY subskill, status
+            ORDER BY subskill
+            """,
+            (email, f'-{int(days)} days'),
+        )
     return rows
 
 
@@ -1,11 +1,12 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, HTTPException, Query, Header
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
 
 from ..utils import supabase_client as sb
 from ..auth import get_email_from_token
-from ..db import get_conn, query
+from ..db import transaction, query
 from ..services.data_loader import load_excel_as_records
 
 
@@ -24,9 +25,9 @@ def _match_level(course: dict, level: Optional[str]) -> bool:
     return False
 
 
-def _fetch_courses(limit: int = 300):
+async def _fetch_courses(limit: int = 300):
     try:
-        return sb.get_courses({"select": "*", "limit": limit})
+        return await sb.get_courses_async({"select": "*", "limit": limit})
     except Exception:
         return []
 
@@ -57,49 +58,56 @@ def _auth_email(authorization: Optional[str] = Header(None)) -> Optional[str]:
 
 
 @router.get("/learning_paths")
-def learning_paths():
+async def learning_paths():
     try:
-        return sb.get_learning_paths({"select": "*", "limit": 100})
+        return await sb.get_learning_paths_async({"select": "*", "limit": 100})
     except Exception as e:
         raise HTTPException(502, f"Gagal mengambil learning paths: {e}")
 
 
 @router.get("/courses")
-def courses(lp: Optional[str] = Query(default=None), q: Optional[str] = Query(default=None), level: Optional[str] = Query(default=None)):
-    courses = _fetch_courses()
+async def courses(lp: Optional[str] = Query(default=None), q: Optional[str] = Query(default=None), level: Optional[str] = Query(default=None)):
+    courses = await _fetch_courses()
     keywords = [q] if q else []
     filtered = _filter_courses(courses, lp_hint=lp, level=level, keywords=keywords)
     return filtered[:100]
 
 
 @router.get("/course_levels")
-def course_levels():
+async def course_levels():
     try:
-        return sb.get_course_levels({"select": "*"})
+        return await sb.get_course_levels_async({"select": "*"})
     except Exception as e:
         raise HTTPException(502, f"Gagal mengambil course levels: {e}")
 
 
 @router.get("/tutorials")
-def tutorials():
+async def tutorials():
     try:
-        return sb.get_tutorials({"select": "*", "limit": 100})
+        return await sb.get_tutorials_async({"select": "*", "limit": 100})
     except Exception as e:
         raise HTTPException(502, f"Gagal mengambil tutorials: {e}")
 
 
-@router.get("/by_onboarding")
-def by_onboarding(authorization: Optional[str] = Header(None)):
+def _latest_onboarding(authorization: Optional[str]):
     email = _auth_email(authorization)
-    role = None
-    experience = None
-    if email:
-        conn = get_conn()
+    if not email:
+        return None, None
+    with transaction() as conn:
         rows = query(conn, "SELECT role,experience FROM onboarding WHERE email=? ORDER BY id DESC LIMIT 1", (email,))
-        conn.close()
-        if rows:
-            role = rows[0]["role"]
-            experience = rows[0]["experience"]
+    if not rows:
+        return None, None
+    return rows[0]["role"], rows[0]["experience"]
+
+
+def _excel_courses_for_lp(lp_hint: Optional[str]):
+    rows = load_excel_as_records("LP and Course Mapping.xlsx")
+    return [r for r in rows if not lp_hint or _contains(r.get("learning_path"), lp_hint)]
+
+
+@router.get("/by_onboarding")
+async def by_onboarding(authorization: Optional[str] = Header(None)):
+    role, experience = await run_in_threadpool(_latest_onboarding, authorization)
 
     lp_hint = None
     if role:
@@ -113,34 +121,47 @@ def by_onboarding(authorization: Optional[str] = Header(None)):
         elif "data" in r:
             lp_hint = "Data"
 
-    courses = _fetch_courses()
+    courses = await _fetch_courses()
     filtered = _filter_courses(courses, lp_hint=lp_hint, level=experience)
     if not filtered:
         try:
-            rows = load_excel_as_records("LP and Course Mapping.xlsx")
-            filtered = [r for r in rows if not lp_hint or _contains(r.get("learning_path"), lp_hint)]
+            # baca Excel + scan string di threadpool, bukan di event loop
+            filtered = await run_in_threadpool(_excel_courses_for_lp, lp_hint)
         except Exception:
             filtered = []
     return {"role": role, "experience": experience, "courses": filtered[:10]}
 
 
+def _latest_scores(email: str):
+    with transaction() as conn:
+        scores = query(
+            conn,
+            "SELECT role, subskill, score, level FROM subskill_scores WHERE email=? ORDER BY id DESC LIMIT 200",
+            (email,),
+        )
+    return [dict(r) for r in scores]
+
+
+def _excel_roadmap(targets):
+    rows = load_excel_as_records("LP and Course Mapping.xlsx")
+    recs = []
+    for it in targets:
+        sub = it["subskill"].lower()
+        matched = [r for r in rows if any(sub in str(v).lower() for v in r.values())]
+        recs.append({"subskill": it["subskill"], "level": it["level"], "courses": matched[:5]})
+    return recs
+
+
 @router.get("/roadmap")
-def roadmap(authorization: Optional[str] = Header(None)):
+async def roadmap(authorization: Optional[str] = Header(None)):
     """Bangun roadmap dari skor sub-skill terakhir user.
     Heuristik: ambil 5 sub-skill dengan skor terendah → rekomendasikan kursus yang cocok.
     """
-    email = _auth_email(authorization)
+    email = await run_in_threadpool(_auth_email, authorization)
     if not email:
         raise HTTPException(401, "Butuh token autentikasi")
 
-    conn = get_conn()
-    scores = query(
-        conn,
-        "SELECT role, subskill, score, level FROM subskill_scores WHERE email=? ORDER BY id DESC LIMIT 200",
-        (email,),
-    )
-    conn.close()
-    items = [dict(r) for r in scores]
+    items = await run_in_threadpool(_latest_scores, email)
     if not items:
         raise HTTPException(404, "Belum ada asesmen sub-skill")
 
@@ -149,7 +170,7 @@ def roadmap(authorization: Optional[str] = Header(None)):
     targets = items[:5]
 
     recs = []
-    all_courses = _fetch_courses()
+    all_courses = await _fetch_courses()
     if all_courses:
         for it in targets:
             sub = it["subskill"]
@@ -163,11 +184,7 @@ def roadmap(authorization: Optional[str] = Header(None)):
 
     # Fallback: coba mapping dari Excel lokal
     try:
-        rows = load_excel_as_records("LP and Course Mapping.xlsx")
-        for it in targets:
-            sub = it["subskill"].lower()
-            matched = [r for r in rows if any(sub in str(v).lower() for v in r.values())]
-            recs.append({"subskill": it["subskill"], "level": it["level"], "courses": matched[:5]})
+        recs.extend(await run_in_threadpool(_excel_roadmap, targets))
         return {"targets": targets, "recommendations": recs, "source": "excel"}
     except Exception as e:
         raise HTTPException(502, f"Tidak bisa membangun roadmap: {e}")
@@ -0,0 +1,73 @@
+"""
+Benchmark throughput encode query: encode langsung per request vs BatchingEncoder
+pada 1/8/32 client bersamaan.
+
+Jalankan dari root repo:
+    python -m backend.scripts.bench_encoder_service --requests 256
+Tanpa sentence-transformers (atau dengan --fake) dipakai encoder sintetis dengan
+overhead tetap per panggilan + biaya per teks, meniru forward pass transformer.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from backend.ml.course_recommender import MODEL_NAME, SENTENCE_TRANSFORMER_AVAILABLE, SentenceTransformer
+from backend.ml.encoder_service import BatchingEncoder
+
+
+def _fake_encoder(call_ms: float, per_text_ms: float, dim: int = 768):
+    # forward pass memakai semua core CPU: panggilan bersamaan tetap antre
+    busy = threading.Lock()
+
+    def encode(texts, **kwargs):
+        with busy:
+            time.sleep((call_ms + per_text_ms * len(texts)) / 1000)
+        return np.ones((len(texts), dim), dtype=np.float32)
+    return encode
+
+
+def _run(encode_one, clients: int, texts):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(encode_one, texts))
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan encode langsung vs micro-batching")
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--fake", action="store_true", help="Pakai encoder sintetis walau model tersedia")
+    parser.add_argument("--call-ms", type=float, default=15.0, help="Encoder sintetis: overhead per panggilan")
+    parser.add_argument("--per-text-ms", type=float, default=1.0, help="Encoder sintetis: biaya per teks")
+    args = parser.parse_args()
+
+    if SENTENCE_TRANSFORMER_AVAILABLE and not args.fake:
+        encode_fn = SentenceTransformer(MODEL_NAME).encode
+        label = MODEL_NAME
+    else:
+        encode_fn = _fake_encoder(args.call_ms, args.per_text_ms)
+        label = f"sintetis ({args.call_ms}ms/panggilan + {args.per_text_ms}ms/teks)"
+    # teks unik supaya dedup batch tidak ikut menguntungkan
+    texts = [f"query nomor {i} back end developer python" for i in range(args.requests)]
+    print(f"encoder: {label}, {args.requests} request")
+
+    for clients in args.clients:
+        direct = _run(lambda t: encode_fn([t]), clients, texts)
+        batcher = BatchingEncoder(encode_fn, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+        batched = _run(lambda t: batcher.encode([t]), clients, texts)
+        stats = batcher.stats()
+        batcher.stop()
+        print(
+            f"{clients:3d} client  langsung {direct:8.1f} req/s  batch {batched:8.1f} req/s  "
+            f"x{batched / direct:.2f}  (rata-rata batch {stats['avg_batch']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
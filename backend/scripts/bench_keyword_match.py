@@ -0,0 +1,65 @@
+"""
+Benchmark pencocokan skill: difflib.get_close_matches (jalur lama detect_skills)
+vs KeywordIndex.match / match_many.
+
+Jalankan dari root repo:
+    python -m backend.scripts.bench_keyword_match --phrases 200
+"""
+import argparse
+import random
+import time
+from difflib import get_close_matches
+
+from backend.ml.keyword_index import KeywordIndex
+from backend.services.datasets import load_frame
+
+
+def _typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4:
+        return word.lower()
+    i = rng.randrange(1, len(word) - 1)
+    op = rng.choice(["drop", "swap", "case"])
+    if op == "drop":
+        return word[:i] + word[i + 1:]
+    if op == "swap":
+        return word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word.lower()
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandingkan difflib vs KeywordIndex untuk Skill Keywords")
+    parser.add_argument("--phrases", type=int, default=200, help="Jumlah frasa uji (keyword + typo + acak)")
+    parser.add_argument("--cutoff", type=float, default=0.6)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    keywords = load_frame("Resource Data Learning Buddy.xlsx", "Skill Keywords")["keyword"].dropna().astype(str).tolist()
+    rng = random.Random(args.seed)
+    sample = rng.sample(keywords, min(args.phrases, len(keywords)))
+    phrases = [_typo(k, rng) if i % 3 else k for i, k in enumerate(sample)]
+    phrases += ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(8)) for _ in range(args.phrases // 10)]
+
+    index, build_s = _timed(lambda: KeywordIndex(keywords))
+    old, old_s = _timed(lambda: [(get_close_matches(p, keywords, n=1, cutoff=args.cutoff) or [None])[0] for p in phrases])
+    single, single_s = _timed(lambda: [index.match(p, args.cutoff) for p in phrases])
+    batch, batch_s = _timed(lambda: index.match_many(phrases, args.cutoff))
+
+    n = len(phrases)
+    same = sum(1 for a, b in zip(old, single) if a == b)
+    same_ci = sum(1 for a, b in zip(old, single) if (a or "").casefold() == (b or "").casefold())
+    print(f"{len(keywords)} keyword, {n} frasa, index dibangun {build_s * 1000:.1f}ms")
+    print(f"difflib      {old_s * 1000:9.1f}ms  ({old_s / n * 1000:.3f}ms/frasa)")
+    print(f"match        {single_s * 1000:9.1f}ms  ({single_s / n * 1000:.3f}ms/frasa)  x{old_s / single_s:.0f}")
+    print(f"match_many   {batch_s * 1000:9.1f}ms  ({batch_s / n * 1000:.3f}ms/frasa)  x{old_s / batch_s:.0f}")
+    print(f"sama dengan difflib: {same}/{n} (abaikan huruf besar/kecil: {same_ci}/{n})")
+    assert single == batch, "match dan match_many harus konsisten"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark latensi /auth/login di bawah beban campuran (login + request chat ringan).
+
+Jalankan dari root repo:
+    python -m backend.scripts.bench_login --logins 200 --login-clients 16 --chat-clients 16
+
+Gunakan HASH_WORKERS / HASH_MAX_QUEUE untuk membandingkan konfigurasi executor hashing.
+"""
+from pathlib import Path
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+
+
+def _pct(samples, p):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))
+    return ordered[idx] * 1000
+
+
+def _report(name, samples):
+    print(
+        f"{name:<12} n={len(samples):<5} "
+        f"p50={_pct(samples, 50):7.1f}ms p95={_pct(samples, 95):7.1f}ms p99={_pct(samples, 99):7.1f}ms "
+        f"mean={statistics.fmean(samples) * 1000 if samples else 0:7.1f}ms"
+    )
+
+
+async def run(args):
+    import httpx
+    from backend import db
+
+    # DB sementara supaya benchmark tidak mengotori data/app.db
+    db.configure_pool(Path(tempfile.mkdtemp()) / "bench.db")
+    from backend.main import app
+    from backend.auth import password_hasher
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        r = await client.post("/auth/register", json={"name": "Bench", "email": "bench@example.com", "password": "secret123"})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+
+        login_lat, chat_lat = [], []
+        remaining = {"logins": args.logins}
+        done = asyncio.Event()
+
+        async def login_worker():
+            while remaining["logins"] > 0:
+                remaining["logins"] -= 1
+                t0 = time.perf_counter()
+                resp = await client.post("/auth/login", json={"email": "bench@example.com", "password": "secret123"})
+                if resp.status_code == 200:
+                    login_lat.append(time.perf_counter() - t0)
+
+        async def chat_worker():
+            while not done.is_set():
+                t0 = time.perf_counter()
+                await client.get("/conversations", headers=headers)
+                chat_lat.append(time.perf_counter() - t0)
+
+        chats = [asyncio.create_task(chat_worker()) for _ in range(args.chat_clients)]
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.login_clients)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await asyncio.gather(*chats)
+
+    print(f"Durasi: {elapsed:.2f}s, login/s: {len(login_lat) / elapsed:.1f}")
+    _report("login", login_lat)
+    _report("chat", chat_lat)
+    print("hasher:", password_hasher.stats())
+    password_hasher.shutdown()
+    db.close_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login p99 dengan beban campuran")
+    parser.add_argument("--logins", type=int, default=200, help="Total request login")
+    parser.add_argument("--login-clients", type=int, default=16, help="Jumlah klien login paralel")
+    parser.add_argument("--chat-clients", type=int, default=16, help="Jumlah klien non-login paralel")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
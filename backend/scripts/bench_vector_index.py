@@ -0,0 +1,79 @@
+"""
+Benchmark vector index: recall@k dan QPS backend brute force vs IVF pada data
+sintetis berkelompok (meniru embedding tutorial/modul per learning path).
+
+Jalankan dari root repo:
+    python -m backend.scripts.bench_vector_index --n 50000 --dim 384
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.ml.vector_index import build_index
+
+PATHS = [f"Learning Path {i}" for i in range(13)]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+
+def _dataset(n: int, dim: int, queries: int, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(64, n // 200), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n)
+    vectors = centers[labels] + 0.7 * rng.normal(size=(n, dim)).astype(np.float32)
+    paths = [PATHS[c % len(PATHS)] for c in labels]
+    levels = [LEVELS[i % 3] for i in range(n)]
+    q = centers[rng.integers(0, len(centers), size=queries)] + 0.9 * rng.normal(size=(queries, dim)).astype(np.float32)
+    return vectors, paths, levels, q
+
+
+def _run(index, queries, k, filters, **kwargs):
+    started = time.perf_counter()
+    out = [index.search(q, k, *f, **kwargs)[0] for q, f in zip(queries, filters)]
+    return out, len(queries) / (time.perf_counter() - started)
+
+
+def _recall(exact, approx, k):
+    return float(np.mean([len(set(a.tolist()) & set(e.tolist())) / max(1, min(k, len(e))) for e, a in zip(exact, approx)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall & QPS brute force vs IVF")
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    vectors, paths, levels, queries = _dataset(args.n, args.dim, args.queries, args.seed)
+    rng = np.random.default_rng(args.seed)
+    scenarios = {
+        "tanpa filter": [(None, None)] * len(queries),
+        "learning_path": [(PATHS[i], None) for i in rng.integers(0, len(PATHS), size=len(queries))],
+        "learning_path+level": [
+            (PATHS[i], LEVELS[j]) for i, j in zip(rng.integers(0, len(PATHS), size=len(queries)), rng.integers(0, 3, size=len(queries)))
+        ],
+    }
+
+    started = time.perf_counter()
+    brute = build_index(vectors, paths, levels, kind="brute")
+    print(f"brute dibangun {time.perf_counter() - started:.2f}s")
+    started = time.perf_counter()
+    ivf = build_index(vectors, paths, levels, kind="ivf")
+    print(f"ivf   dibangun {time.perf_counter() - started:.2f}s (nlist={ivf.nlist}), {args.n} x {args.dim}")
+
+    for name, filters in scenarios.items():
+        exact, qps = _run(brute, queries, args.k, filters)
+        print(f"\n[{name}] brute  recall@{args.k}=1.000  {qps:8.0f} QPS")
+        for nprobe in args.nprobe:
+            approx, qps_ivf = _run(ivf, queries, args.k, filters, nprobe=nprobe)
+            print(
+                f"[{name}] ivf nprobe={nprobe:<3d} recall@{args.k}={_recall(exact, approx, args.k):.3f}  "
+                f"{qps_ivf:8.0f} QPS  x{qps_ivf / qps:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Bangun embedding store kursus (int8 / float16 / float32, dibaca via np.memmap)
+dan cek recall@k terhadap skor float32.
+
+Jalankan dari root repo:
+    python -m backend.scripts.build_embedding_store --dtype int8
+Sumber embedding: file .pt lama jika ada (--from-pt), selain itu encode ulang
+dengan sentence-transformers.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from backend.ml.course_recommender import (
+    EMBEDDING_STORE_PATH, EMBEDDINGS_PATH, LEVELS, MODEL_NAME, CourseRecommenderST, clean_text, torch,
+)
+from backend.ml.embedding_store import STORE_DTYPES, EmbeddingStore, recall_at_k, write_store
+from backend.services.datasets import load_frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun embedding store kursus + cek recall@k")
+    parser.add_argument("--dtype", choices=STORE_DTYPES, default="int8")
+    parser.add_argument("--from-pt", action="store_true", help="Konversi course_embeddings.pt lama")
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rec = CourseRecommenderST()
+    rec.prepare_courses(
+        load_frame("Resource Data Learning Buddy.xlsx", "Learning Path Answer"),
+        load_frame("LP and Course Mapping.xlsx", "Course"),
+    )
+    started = time.perf_counter()
+    if args.from_pt:
+        if torch is None:
+            raise SystemExit("torch diperlukan untuk membaca file .pt lama")
+        reference = np.asarray(torch.load(EMBEDDINGS_PATH, weights_only=True), dtype=np.float32)
+    elif rec.model is not None:
+        reference = np.asarray(rec.build_embeddings(save=False), dtype=np.float32)
+    else:
+        raise SystemExit("sentence-transformers tidak tersedia dan --from-pt tidak dipakai")
+
+    write_store(EMBEDDING_STORE_PATH, reference, MODEL_NAME, rec._corpus_hash(), args.dtype)
+    store = EmbeddingStore(EMBEDDING_STORE_PATH)
+    print(
+        f"{len(store)} x {store.header['dim']} {args.dtype} -> {EMBEDDING_STORE_PATH} "
+        f"({store.nbytes() / 1e6:.2f} MB vs float32 {reference.nbytes / 1e6:.2f} MB, "
+        f"{time.perf_counter() - started:.1f}s)"
+    )
+
+    # query realistis: nama learning path (+ level); tanpa model pakai baris korpus itu sendiri
+    if rec.model is not None:
+        texts = [clean_text(f"{lp} {lv}") for lp in rec.learning_path_mapping.values() for lv in LEVELS]
+        queries = rec.model.encode(texts)
+    else:
+        rng = np.random.default_rng(0)
+        queries = reference[rng.choice(len(reference), size=min(200, len(reference)), replace=False)]
+    print(f"recall@{args.k} vs float32: {recall_at_k(reference, store, queries, args.k):.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+from pathlib import Path
+import argparse
+import time
+from backend.services.data_loader import CACHE_DIR, _excel_path, build_excel_cache
+
+
+DEFAULT_WORKBOOKS = [
+    "LP and Course Mapping.xlsx",
+    "Resource Data Learning Buddy.xlsx",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bangun cache kolumnar untuk workbook Excel (jalankan saat build/deploy)")
+    parser.add_argument("files", nargs="*", default=DEFAULT_WORKBOOKS, help="Nama file Excel relatif ke root repo")
+    args = parser.parse_args()
+
+    for filename in args.files:
+        path = _excel_path(filename)
+        if not path.exists():
+            print(f"Lewati (tidak ada): {path}")
+            continue
+        started = time.perf_counter()
+        meta = build_excel_cache(path)
+        cached = sum(1 for v in meta["sheets"].values() if v)
+        print(f"{filename}: {cached}/{len(meta['sheets'])} sheet di-cache ({time.perf_counter() - started:.2f}s)")
+
+    print(f"Cache: {Path(CACHE_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
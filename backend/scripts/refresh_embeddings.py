@@ -0,0 +1,29 @@
+"""
+Baca ulang data kursus dari Excel, rebuild incremental embedding kursus (hanya
+baris baru/berubah yang di-encode), lalu swap store secara atomik. Worker API yang
+sedang jalan melihat store baru pada request berikutnya: jika korpusnya berbeda,
+worker membaca ulang data kursus dari Excel dan memakai data + store baru bersama.
+
+Jalankan dari root repo:
+    python -m backend.scripts.refresh_embeddings
+"""
+import argparse
+import json
+
+from backend.ml.course_recommender import CourseRecommenderST
+from backend.ml.embedding_pipeline import ENCODE_BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild incremental embedding kursus")
+    parser.add_argument("--batch-size", type=int, default=ENCODE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    rec = CourseRecommenderST()
+    if rec.model is None:
+        raise SystemExit("sentence-transformers tidak tersedia")
+    print(json.dumps(rec.refresh_embeddings(batch_size=args.batch_size, reload_data=True)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+import argparse
+import time
+from pathlib import Path
+
+from backend.ml.job_role_classifier import MODEL_PATH, JobRoleClassifier, build_training_set
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latih classifier job role lokal (jalankan saat build/deploy)")
+    parser.add_argument("--output", type=Path, default=MODEL_PATH, help="Lokasi file model")
+    parser.add_argument("--C", type=float, default=20.0, help="Regularisasi logistic regression")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    texts, labels = build_training_set()
+    clf = JobRoleClassifier.train(texts, labels, C=args.C)
+    clf.save(args.output)
+    print(
+        f"{len(texts)} dokumen, {len(clf.classes)} job role, {len(clf.vocabulary)} term "
+        f"({time.perf_counter() - started:.2f}s) -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,31 @@
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 from pathlib import Path
-from functools import lru_cache
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
+import numpy as np
 from openpyxl import load_workbook
 
 
 ROOT = Path(__file__).resolve().parents[2]
 BACKEND_DIR = Path(__file__).resolve().parents[1]
 DATA_DIR = BACKEND_DIR / "data"
+# Cache kolumnar hasil konversi sheet Excel (lihat build_excel_cache)
+CACHE_DIR = Path(os.getenv("EXCEL_CACHE_DIR", str(DATA_DIR / "excel_cache")))
+CACHE_VERSION = 1
 
 DATA_DIR.mkdir(exist_ok=True)
 
+_EPOCH = datetime(1970, 1, 1)
+
 
 def _excel_path(filename: str) -> Path:
     # Mencari file Excel di root repo
@@ -25,8 +38,7 @@ def _excel_path(filename: str) -> Path:
     return p
 
 
-def _sheet_to_records(ws) -> List[Dict[str, Any]]:
-    rows = list(ws.iter_rows(values_only=True))
+def _rows_to_records(rows: List[tuple]) -> List[Dict[str, Any]]:
     if not rows:
         return []
     headers = [str(h).strip() if h is not None else "" for h in rows[0]]
@@ -40,31 +52,484 @@ def _sheet_to_records(ws) -> List[Dict[str, Any]]:
     return out
 
 
-@lru_cache(maxsize=16)
-def load_excel_as_records(filename: str, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+def _sheet_to_records(ws) -> List[Dict[str, Any]]:
+    return _rows_to_records(list(ws.iter_rows(values_only=True)))
+
+
+# -------- Cache kolumnar --------
+# Setiap sheet disimpan sebagai satu file .npy per kolom (bisa di-mmap) + manifest JSON.
+# String di-dictionary-encode (kode int32 + daftar kategori), angka/datetime disimpan
+# sebagai array numerik dengan mask untuk sel kosong.
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "sheet"
+
+
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _cache_prefix(path: Path) -> str:
+    # nama file sama bisa ada di root dan backend/data, bedakan dengan hash path
+    digest = hashlib.sha1(str(path.resolve()).encode("utf-8")).hexdigest()[:8]
+    return f"{_slug(path.stem)}-{digest}"
+
+
+def _workbook_manifest_path(path: Path) -> Path:
+    return CACHE_DIR / f"{_cache_prefix(path)}.workbook.json"
+
+
+def _write_atomic(target: Path, writer) -> None:
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    writer(tmp)
+    os.replace(tmp, target)
+
+
+def _write_json(target: Path, data: Dict[str, Any]) -> None:
+    _write_atomic(target, lambda p: p.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8"))
+
+
+def _save_npy(target: Path, arr: np.ndarray) -> None:
+    def writer(p: Path) -> None:
+        with p.open("wb") as f:
+            np.save(f, arr, allow_pickle=False)
+
+    _write_atomic(target, writer)
+
+
+def _column_values(rows: List[tuple], i: int) -> List[Any]:
+    return [r[i] if i < len(r) else None for r in rows]
+
+
+def _encode_column(values: List[Any], file_stem: str) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+    present = [v for v in values if v is not None]
+    types = {type(v) for v in present}
+    mask = np.array([v is not None for v in values], dtype=bool)
+    arrays: Dict[str, np.ndarray] = {}
+    meta: Dict[str, Any] = {}
+    has_null = not bool(mask.all())
+
+    if not types:
+        return {"kind": "null"}, {}
+    if types <= {str}:
+        categories: Dict[str, int] = {}
+        codes = np.array([-1 if v is None else categories.setdefault(v, len(categories)) for v in values], dtype=np.int32)
+        meta = {"kind": "str", "categories": list(categories)}
+        arrays["codes"] = codes
+    elif types <= {bool}:
+        meta = {"kind": "bool"}
+        arrays["values"] = np.array([bool(v) for v in values], dtype=bool)
+    elif types <= {int}:
+        meta = {"kind": "int"}
+        arrays["values"] = np.array([0 if v is None else v for v in values], dtype=np.int64)
+    elif types <= {int, float}:
+        meta = {"kind": "float"}
+        arrays["values"] = np.array([0.0 if v is None else float(v) for v in values], dtype=np.float64)
+        # tipe int di kolom campuran dipertahankan lewat array is_int
+        if int in types:
+            arrays["is_int"] = np.array([type(v) is int for v in values], dtype=bool)
+    elif types <= {datetime}:
+        meta = {"kind": "datetime"}
+        arrays["values"] = np.array(
+            [0 if v is None else (v - _EPOCH) // timedelta(microseconds=1) for v in values], dtype=np.int64
+        )
+    elif types <= {str, int, float, bool}:
+        # tipe campuran sederhana: simpan apa adanya di manifest
+        return {"kind": "json", "values": values}, {}
+    else:
+        raise _Uncacheable(f"Tipe kolom tidak didukung: {sorted(t.__name__ for t in types)}")
+
+    if has_null and meta["kind"] != "str":
+        arrays["mask"] = mask
+    meta["files"] = {name: f"{file_stem}.{name}.npy" for name in arrays}
+    return meta, arrays
+
+
+def _decode_column(meta: Dict[str, Any], n_rows: int) -> List[Any]:
+    kind = meta["kind"]
+    if kind == "null":
+        return [None] * n_rows
+    if kind == "json":
+        return meta["values"]
+    arrays = load_column_arrays(meta)
+    if kind == "str":
+        categories = meta["categories"]
+        return [None if c < 0 else categories[c] for c in arrays["codes"].tolist()]
+    if kind == "datetime":
+        out = [_EPOCH + timedelta(microseconds=v) for v in arrays["values"].tolist()]
+    elif kind == "float" and "is_int" in arrays:
+        out = [int(v) if is_int else v for v, is_int in zip(arrays["values"].tolist(), arrays["is_int"].tolist())]
+    else:
+        out = arrays["values"].tolist()
+    if "mask" in arrays:
+        out = [v if ok else None for v, ok in zip(out, arrays["mask"].tolist())]
+    return out
+
+
+def _build_sheet_cache(rows: List[tuple], sheet_name: str, prefix: str, sha256: str) -> str:
+    headers = [str(h).strip() if h is not None else "" for h in rows[0]] if rows else []
+    body = rows[1:]
+    file_stem = f"{prefix}.{_slug(sheet_name)}.{sha256[:12]}"
+    columns = []
+    for i in range(len(headers)):
+        meta, arrays = _encode_column(_column_values(body, i), f"{file_stem}.c{i}")
+        for name, arr in arrays.items():
+            _save_npy(CACHE_DIR / meta["files"][name], arr)
+        columns.append(meta)
+    manifest_name = f"{file_stem}.sheet.json"
+    _write_json(
+        CACHE_DIR / manifest_name,
+        {"version": CACHE_VERSION, "sha256": sha256, "sheet": sheet_name, "headers": headers, "rows": len(body), "columns": columns},
+    )
+    return manifest_name
+
+
+def _remove_stale_files(prefix: str, keep: set) -> None:
+    for p in CACHE_DIR.glob(f"{prefix}.*"):
+        if p.name not in keep and not p.name.endswith(".workbook.json") and not p.name.endswith(".tmp"):
+            try:
+                p.unlink()
+            except OSError:
+                pass
+
+
+def build_excel_cache(path: Path) -> Dict[str, Any]:
+    """Parse workbook sekali dengan openpyxl lalu tulis cache kolumnar untuk semua sheet-nya."""
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    st = path.stat()
+    sha256 = _file_sha256(path)
+    prefix = _cache_prefix(path)
+    wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+    sheets: Dict[str, Optional[str]] = {}
+    keep = set()
+    try:
+        for name in wb.sheetnames:
+            rows = list(wb[name].iter_rows(values_only=True))
+            try:
+                manifest_name = _build_sheet_cache(rows, name, prefix, sha256)
+            except _Uncacheable:
+                # sheet ini tetap dibaca lewat openpyxl
+                sheets[name] = None
+                continue
+            sheets[name] = manifest_name
+            keep.add(manifest_name)
+            manifest = json.loads((CACHE_DIR / manifest_name).read_text(encoding="utf-8"))
+            for col in manifest["columns"]:
+                keep.update(col.get("files", {}).values())
+    finally:
+        wb.close()
+    workbook = {
+        "version": CACHE_VERSION,
+        "source": str(path),
+        "mtime_ns": st.st_mtime_ns,
+        "size": st.st_size,
+        "sha256": sha256,
+        "sheetnames": list(sheets),
+        "sheets": sheets,
+    }
+    _write_json(_workbook_manifest_path(path), workbook)
+    _remove_stale_files(prefix, keep)
+    return workbook
+
+
+def _fresh_workbook_manifest(path: Path) -> Optional[Dict[str, Any]]:
+    mpath = _workbook_manifest_path(path)
+    try:
+        meta = json.loads(mpath.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    st = path.stat()
+    if meta.get("mtime_ns") == st.st_mtime_ns and meta.get("size") == st.st_size:
+        return meta
+    if meta.get("size") != st.st_size:
+        return None
+    # mtime berubah tapi isinya bisa saja sama (misal file di-copy ulang)
+    if _file_sha256(path) != meta.get("sha256"):
+        return None
+    meta["mtime_ns"] = st.st_mtime_ns
+    _write_json(mpath, meta)
+    return meta
+
+
+def _workbook_cache(path: Path) -> Optional[Dict[str, Any]]:
+    meta = _fresh_workbook_manifest(path)
+    if meta is not None:
+        return meta
+    try:
+        return build_excel_cache(path)
+    except OSError:
+        # direktori cache tidak bisa ditulis → pakai openpyxl langsung
+        return None
+
+
+def _load_sheet_manifest(workbook: Dict[str, Any], sheet_name: str) -> Optional[Dict[str, Any]]:
+    manifest_name = workbook["sheets"].get(sheet_name)
+    if not manifest_name:
+        return None
+    try:
+        manifest = json.loads((CACHE_DIR / manifest_name).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if manifest.get("sha256") != workbook["sha256"]:
+        return None
+    return manifest
+
+
+def load_column_arrays(meta: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Buka array .npy milik satu kolom cache (read-only, memory-mapped)."""
+    return {name: np.load(CACHE_DIR / fname, mmap_mode="r", allow_pickle=False) for name, fname in meta.get("files", {}).items()}
+
+
+def _load_cached_sheet(workbook: Dict[str, Any], sheet_name: str) -> Optional[List[Dict[str, Any]]]:
+    manifest = _load_sheet_manifest(workbook, sheet_name)
+    if manifest is None:
+        return None
+    try:
+        n_rows = manifest["rows"]
+        headers = manifest["headers"]
+        columns = [_decode_column(meta, n_rows) for meta in manifest["columns"]]
+    except (OSError, ValueError, KeyError):
+        return None
+    keys = [h or f"col_{i}" for i, h in enumerate(headers)]
+    return [dict(zip(keys, values)) for values in zip(*columns)]
+
+
+# -------- Registry workbook --------
+# Setiap file dibuka sekali, daftar sheet diindeks, dan sheet baru di-materialize saat
+# pertama kali diminta. Sheet yang sudah dimuat berbagi satu anggaran memori (LRU).
+
+SHEET_CACHE_BUDGET = int(float(os.getenv("EXCEL_SHEET_BUDGET_MB", "256")) * 1024 * 1024)
+
+
+def _estimate_bytes(records: List[Dict[str, Any]]) -> int:
+    if not records:
+        return sys.getsizeof(records)
+    # cukup sampel ~200 baris, sheet besar tidak perlu dihitung satu per satu
+    sample = records[:: max(1, len(records) // 200)]
+    per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r.values()) for r in sample) / len(sample)
+    return int(per_row * len(records)) + sys.getsizeof(records)
+
+
+class _WorkbookHandle:
+    """Workbook yang dibuka sekali: manifest cache kolumnar + openpyxl read-only bila perlu."""
+
+    def __init__(self, path: Path):
+        st = path.stat()
+        self.path = path
+        self.key = (st.st_mtime_ns, st.st_size)
+        self.manifest = _workbook_cache(path)
+        self._wb = None
+        # workbook openpyxl read-only tidak aman dibaca dari beberapa thread sekaligus
+        self._wb_lock = threading.Lock()
+        if self.manifest is not None:
+            self.sheetnames = list(self.manifest["sheetnames"])
+        else:
+            with self._wb_lock:
+                self.sheetnames = list(self._openpyxl().sheetnames)
+
+    def is_current(self) -> bool:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return False
+        return (st.st_mtime_ns, st.st_size) == self.key
+
+    def _openpyxl(self):
+        if self._wb is None:
+            self._wb = load_workbook(filename=str(self.path), read_only=True, data_only=True)
+        return self._wb
+
+    def read_sheet(self, sheet_name: str) -> List[Dict[str, Any]]:
+        if self.manifest is not None:
+            records = _load_cached_sheet(self.manifest, sheet_name)
+            if records is not None:
+                return records
+        with self._wb_lock:
+            return _sheet_to_records(self._openpyxl()[sheet_name])
+
+    def sheet_manifest(self, sheet_name: str) -> Optional[Dict[str, Any]]:
+        """Manifest kolumnar sheet, atau None jika sheet hanya bisa dibaca lewat openpyxl."""
+        if self.manifest is None:
+            return None
+        return _load_sheet_manifest(self.manifest, sheet_name)
+
+    def close(self) -> None:
+        with self._wb_lock:
+            if self._wb is not None:
+                self._wb.close()
+                self._wb = None
+
+
+class WorkbookRegistry:
+    def __init__(self, budget_bytes: int = SHEET_CACHE_BUDGET):
+        self.budget_bytes = budget_bytes
+        # _lock hanya melindungi dict; parsing/IO berjalan di luar lock (lihat _load_once)
+        self._lock = threading.RLock()
+        self._workbooks: Dict[Path, _WorkbookHandle] = {}
+        self._entries: "OrderedDict[Tuple[Any, ...], Tuple[Any, int]]" = OrderedDict()
+        self._loading: Dict[Tuple[Any, ...], threading.Event] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.workbook_opens = 0
+
+    def _load_once(self, flight_key: Tuple[Any, ...], lookup, load, store):
+        """
+        Single-flight per key: lookup() dicek di bawah lock, load() berjalan di luar lock
+        dan hanya di satu thread; thread lain dengan key sama menunggu lalu cek ulang.
+        Key lain tidak ikut tertahan selama load() berjalan.
+        """
+        while True:
+            with self._lock:
+                found = lookup()
+                if found is not None:
+                    return found
+                pending = self._loading.get(flight_key)
+                if pending is None:
+                    pending = self._loading[flight_key] = threading.Event()
+                    break
+            pending.wait()
+        try:
+            value = load()
+            with self._lock:
+                store(value)
+            return value
+        finally:
+            with self._lock:
+                self._loading.pop(flight_key, None)
+            pending.set()
+
+    def workbook(self, path: Path) -> _WorkbookHandle:
+        def lookup():
+            handle = self._workbooks.get(path)
+            if handle is not None and handle.is_current():
+                return handle
+            if handle is not None:
+                # file berubah: buang handle lama beserta semua sheet-nya
+                self._drop_workbook(path)
+            return None
+
+        def store(handle):
+            self._workbooks[path] = handle
+            self.workbook_opens += 1
+
+        return self._load_once((path,), lookup, lambda: _WorkbookHandle(path), store)
+
+    def sheetnames(self, path: Path) -> List[str]:
+        return list(self.workbook(path).sheetnames)
+
+    def get_or_load(self, path: Path, key: Tuple[Any, ...], loader, sizer=_estimate_bytes):
+        """Ambil objek turunan workbook dari cache; loader(handle) dipanggil hanya saat miss."""
+        handle = self.workbook(path)
+        full_key = (path,) + key
+
+        def lookup():
+            entry = self._entries.get(full_key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return entry
+
+        def load():
+            value = loader(handle)
+            return value, int(sizer(value))
+
+        def store(entry):
+            self.misses += 1
+            # workbook diganti (file berubah) selama load: hasil lama tidak disimpan
+            if self._workbooks.get(path) is not handle:
+                return
+            self._entries[full_key] = entry
+            self._bytes += entry[1]
+            self._evict(keep=full_key)
+
+        return self._load_once(full_key, lookup, load, store)[0]
+
+    def sheet(self, path: Path, sheet_name: str) -> List[Dict[str, Any]]:
+        return self.get_or_load(path, ("records", sheet_name), lambda h: h.read_sheet(sheet_name))
+
+    def _evict(self, keep) -> None:
+        while self._bytes > self.budget_bytes and len(self._entries) > 1:
+            key, (_, size) = next(iter(self._entries.items()))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
+            self._bytes -= size
+            self.evictions += 1
+
+    def _drop_workbook(self, path: Path) -> None:
+        handle = self._workbooks.pop(path, None)
+        if handle is not None:
+            handle.close()
+        for key in [k for k in self._entries if k[0] == path]:
+            self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in list(self._workbooks):
+                self._drop_workbook(path)
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workbooks": len(self._workbooks),
+                "workbook_opens": self.workbook_opens,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "budget_bytes": self.budget_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+workbook_registry = WorkbookRegistry()
+
+
+def resolve_excel(filename: str) -> Path:
     path = _excel_path(filename)
     if not path.exists():
         raise FileNotFoundError(f"File tidak ditemukan: {path}")
+    return path
 
-    wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+
+def list_sheets(filename: str) -> List[str]:
+    return workbook_registry.sheetnames(resolve_excel(filename))
+
+
+def load_excel_as_records(filename: str, sheet_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    path = resolve_excel(filename)
+    sheetnames = workbook_registry.sheetnames(path)
     if sheet_name is None:
-        ws = wb[wb.sheetnames[0]]
-        return _sheet_to_records(ws)
+        return workbook_registry.sheet(path, sheetnames[0])
     else:
-        if sheet_name in wb.sheetnames:
-            ws = wb[sheet_name]
-            return _sheet_to_records(ws)
+        if sheet_name in sheetnames:
+            return workbook_registry.sheet(path, sheet_name)
         # jika nama sheet tidak ada, gabungkan semua
         records: List[Dict[str, Any]] = []
-        for name in wb.sheetnames:
-            records.extend(_sheet_to_records(wb[name]))
+        for name in sheetnames:
+            records.extend(workbook_registry.sheet(path, name))
         return records
 
 
 def export_excel_to_json(filename: str, out_json: Path, sheet_name: Optional[str] = None) -> Path:
     records = load_excel_as_records(filename, sheet_name)
     out_json.parent.mkdir(parents=True, exist_ok=True)
-    import json
 
     with out_json.open("w", encoding="utf-8") as f:
         json.dump(records, f, ensure_ascii=False, indent=2)
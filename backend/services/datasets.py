@@ -0,0 +1,105 @@
+"""
+Akses dataset Excel sebagai DataFrame kolumnar yang dipakai bersama.
+
+DataFrame dibangun langsung dari array cache kolumnar (tanpa list of dict) dan
+disimpan di workbook_registry, jadi semua consumer mendapat objek yang sama.
+Perlakukan hasilnya sebagai read-only: panggil .copy() sebelum memodifikasi.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .data_loader import load_column_arrays, load_excel_as_records, resolve_excel, workbook_registry
+
+
+# Kolom string berulang yang disimpan sebagai category. Hanya kolom yang dipakai
+# untuk filter/grouping; kolom yang di-fillna/digabung sebagai teks tetap object.
+CATEGORICAL_COLUMNS = frozenset({
+    "learning_path",
+    "learning_path_name",
+    "course_level",
+    "tech_category",
+    "difficulty",
+})
+
+
+def _readonly(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+def _column_to_array(name: str, meta: Dict[str, Any], n_rows: int):
+    kind = meta["kind"]
+    if kind == "null":
+        return _readonly(np.full(n_rows, None, dtype=object))
+    if kind == "json":
+        return pd.Series(meta["values"]).to_numpy()
+    arrays = load_column_arrays(meta)
+    mask = arrays.get("mask")
+    if kind == "str":
+        codes = np.asarray(arrays["codes"])
+        if name in CATEGORICAL_COLUMNS:
+            return pd.Categorical.from_codes(codes, categories=pd.Index(meta["categories"], dtype=object))
+        # kode -1 (sel kosong) jatuh ke elemen terakhir = None
+        lookup = np.array(list(meta["categories"]) + [None], dtype=object)
+        return _readonly(lookup[codes])
+    values = arrays["values"]
+    if kind == "datetime":
+        out = np.asarray(values).astype("datetime64[us]").astype("datetime64[ns]")
+        if mask is not None:
+            out[~mask] = np.datetime64("NaT")
+        return _readonly(out)
+    if kind == "bool" and mask is not None:
+        out = np.asarray(values).astype(object)
+        out[~mask] = None
+        return _readonly(out)
+    if mask is not None:
+        # sama seperti pd.DataFrame(records): angka dengan sel kosong menjadi float + NaN
+        return _readonly(np.where(mask, values, np.nan))
+    return values
+
+
+def _records_frame(records) -> pd.DataFrame:
+    """DataFrame dari list of dict (jalur openpyxl) dengan dtype sama seperti jalur cache."""
+    df = pd.DataFrame(records)
+    for col in CATEGORICAL_COLUMNS.intersection(df.columns):
+        values = df[col]
+        present = values.dropna()
+        # hanya kolom string murni, sama dengan kind "str" di cache kolumnar
+        if present.map(type).eq(str).all():
+            # urutan kategori = urutan kemunculan pertama, seperti dictionary-encoding cache
+            df[col] = pd.Categorical(values, categories=pd.Index(pd.unique(present), dtype=object))
+    return df
+
+
+def _build_frame(handle, sheet_name: str) -> pd.DataFrame:
+    manifest = handle.sheet_manifest(sheet_name)
+    if manifest is None:
+        return _records_frame(handle.read_sheet(sheet_name))
+    n_rows = manifest["rows"]
+    data: Dict[str, Any] = {}
+    for i, (header, meta) in enumerate(zip(manifest["headers"], manifest["columns"])):
+        key = header or f"col_{i}"
+        # header duplikat: nilai kolom terakhir yang menang, sama seperti versi records
+        data[key] = _column_to_array(key, meta, n_rows)
+    return pd.DataFrame(data, index=pd.RangeIndex(n_rows), copy=False)
+
+
+def _frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=False).sum())
+
+
+def load_frame(filename: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """DataFrame bersama untuk satu sheet. Sheet tidak dikenal → gabungan semua sheet."""
+    path = resolve_excel(filename)
+    sheetnames = workbook_registry.sheetnames(path)
+    if sheet_name is None:
+        sheet_name = sheetnames[0]
+    if sheet_name not in sheetnames:
+        return workbook_registry.get_or_load(
+            path, ("frame", sheet_name), lambda _h: _records_frame(load_excel_as_records(filename, sheet_name)), _frame_bytes
+        )
+    return workbook_registry.get_or_load(path, ("frame", sheet_name), lambda h: _build_frame(h, sheet_name), _frame_bytes)
@@ -0,0 +1,107 @@
+"""
+Test QuestionBank (assessment_engine): hasil pencarian subskill sama dengan filter
+lama `question_desc.str.contains(subskill, case=False, na=False)`, memo LRU terbatas,
+dan bank untuk DataFrame dikunci isi, bukan identitas objek.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_assessment_engine.py
+"""
+from __future__ import annotations
+
+import re
+
+import pandas as pd
+import pytest
+
+from backend.ml import assessment_engine
+from backend.ml.assessment_engine import QuestionBank, TECH_QUESTIONS_FILE, TECH_QUESTIONS_SHEET
+from backend.services.data_loader import _excel_path
+
+
+QUESTIONS = [
+    "Apa fungsi utama dari file AndroidManifest.xml?",
+    "Apa yang dimaksud dengan Intent di Android?",
+    None,
+    "Jelaskan perbedaan LIST dan tuple di Python",
+    "Bagaimana cara membuat virtual environment Python?",
+    "Apa itu C++ template?",
+    "SQL JOIN mana yang mengembalikan semua baris tabel kiri?",
+    "",
+    "Apa kegunaan docker compose?",
+]
+
+SUBSKILLS = [
+    "android", "Android", "python", "PYTHON", "intent", "sql", "join", "docker compose",
+    "xml", "apa", "py", "a", "", "kotlin", "c++", "file android", "tabel kiri?",
+]
+
+
+def _frame(questions=QUESTIONS) -> pd.DataFrame:
+    return pd.DataFrame({
+        "question_desc": questions,
+        "option_1": ["satu"] * len(questions),
+        "option_2": ["dua"] * len(questions),
+        "option_3": ["tiga"] * len(questions),
+        "option_4": ["empat"] * len(questions),
+        "correct_answer": ["dua"] * len(questions),
+    })
+
+
+def _legacy_ids(df: pd.DataFrame, subskill: str, regex: bool):
+    mask = df["question_desc"].str.contains(subskill, case=False, na=False, regex=regex)
+    return tuple(int(i) for i in mask.to_numpy().nonzero()[0])
+
+
+@pytest.mark.parametrize("subskill", SUBSKILLS)
+def test_ids_match_legacy_str_contains(subskill):
+    df = _frame()
+    bank = QuestionBank(df)
+    # pencarian sekarang literal; untuk subskill tanpa metakarakter regex hasilnya identik
+    assert bank.ids_for(subskill) == _legacy_ids(df, subskill, regex=False)
+    if re.escape(subskill) == subskill:
+        assert bank.ids_for(subskill) == _legacy_ids(df, subskill, regex=True)
+
+
+def test_ids_match_legacy_on_tech_questions_dataset():
+    path = _excel_path(TECH_QUESTIONS_FILE)
+    if not path.exists():
+        pytest.skip("dataset Excel tidak tersedia")
+    df = pd.read_excel(path, sheet_name=TECH_QUESTIONS_SHEET)
+    bank = QuestionBank(df)
+    subskills = ["Activity", "Intent", "python", "SQL", "docker", "kubernetes", "API", "class", "react", "swift"]
+    subskills += list(df["tech_category"].dropna().unique())
+    for subskill in subskills:
+        assert bank.ids_for(subskill) == _legacy_ids(df, subskill, regex=False), subskill
+
+
+def test_sample_returns_copies_with_answer_letter():
+    bank = QuestionBank(_frame())
+    questions = bank.sample("python", 5)
+    assert [q["question"] for q in questions] == [QUESTIONS[3], QUESTIONS[4]]
+    assert questions[0]["options"] == ["A. satu", "B. dua", "C. tiga", "D. empat"]
+    assert questions[0]["answer"] == "B"
+    questions[0]["options"].append("E. lima")
+    assert len(bank.sample("python", 5)[0]["options"]) == 4
+    assert bank.sample("kotlin", 3) is None
+
+
+def test_memo_is_bounded_lru():
+    bank = QuestionBank(_frame(), memo_size=2)
+    bank.ids_for("android")
+    bank.ids_for("python")
+    bank.ids_for("android")  # android jadi paling baru dipakai
+    bank.ids_for("sql")
+    assert list(bank._memo) == ["android", "sql"]
+    assert bank.ids_for("python") == _legacy_ids(_frame(), "python", regex=False)
+
+
+def test_bank_for_is_keyed_by_content(monkeypatch):
+    monkeypatch.setattr(assessment_engine, "_frame_banks", type(assessment_engine._frame_banks)())
+    first = assessment_engine._bank_for(_frame())
+    # objek berbeda dengan isi sama -> bank yang sama
+    assert assessment_engine._bank_for(_frame()) is first
+    changed = _frame(QUESTIONS[:-1] + ["Apa kegunaan kubernetes?"])
+    other = assessment_engine._bank_for(changed)
+    assert other is not first
+    assert other.ids_for("kubernetes") == (8,)
+    assert assessment_engine._bank_for(first) is first
@@ -0,0 +1,107 @@
+"""
+Test cache token di auth.py: hit, kedaluwarsa, eviction LRU, pencabutan token
+(termasuk dari worker lain lewat revocation_gen) dan purge_expired_tokens.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_auth_cache.py
+"""
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from backend import auth, db
+from backend.auth import TokenCache
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    db.configure_pool(tmp_path / "auth.db", size=2)
+    db.init_db()
+    monkeypatch.setattr(auth, "token_cache", TokenCache(maxsize=16, ttl=60, check_interval=0))
+    yield
+    db.close_pool()
+
+
+def _delete_row_only(token: str) -> None:
+    with db.transaction() as conn:
+        db.execute(conn, "DELETE FROM tokens WHERE token=?", (token,))
+
+
+def _revoke_from_other_worker(token: str) -> None:
+    # yang dilakukan revoke_token di proses lain: cache proses ini tidak disentuh
+    with db.transaction() as conn:
+        db.execute(conn, "DELETE FROM tokens WHERE token=?", (token,))
+        db.execute(conn, "UPDATE auth_state SET revocation_gen = revocation_gen + 1 WHERE id=1")
+
+
+def test_cache_hit_skips_db(fresh_db):
+    token = auth.issue_token("a@x.id")
+    _delete_row_only(token)  # tanpa revocation_gen: hanya cache yang bisa menjawab
+    assert auth.get_email_from_token(token) == "a@x.id"
+    assert auth.token_cache.stats()["hits"] == 1
+
+
+def test_cache_entry_expires(monkeypatch):
+    cache = TokenCache(maxsize=4, ttl=10)
+    now = time.time()
+    cache.put("t", "a@x.id")
+    assert cache.get("t") == "a@x.id"
+    monkeypatch.setattr(auth.time, "time", lambda: now + 11)
+    assert cache.get("t") is None
+    # masa berlaku token lebih pendek dari TTL cache
+    cache.put("u", "b@x.id", expires_at=now + 5)
+    assert cache.get("u") is None
+
+
+def test_cache_lru_eviction():
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.put("a", "a@x.id")
+    cache.put("b", "b@x.id")
+    cache.get("a")
+    cache.put("c", "c@x.id")
+    assert cache.get("b") is None
+    assert cache.get("a") == "a@x.id" and cache.get("c") == "c@x.id"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_revoke_token_same_worker(fresh_db):
+    token = auth.issue_token("a@x.id")
+    assert auth.get_email_from_token(token) == "a@x.id"
+    auth.revoke_token(token)
+    assert auth.get_email_from_token(token) is None
+
+
+def test_revoke_from_other_worker_is_seen(fresh_db):
+    token = auth.issue_token("a@x.id")
+    other = auth.issue_token("b@x.id")
+    assert auth.get_email_from_token(token) == "a@x.id"
+    _revoke_from_other_worker(token)
+    assert auth.get_email_from_token(token) is None
+    assert auth.get_email_from_token(other) == "b@x.id"
+
+
+def test_stale_lookup_not_cached_after_revoke(fresh_db):
+    token = auth.issue_token("a@x.id")
+    auth.token_cache.clear()
+    with db.transaction() as conn:
+        stale_generation = auth._revocation_generation(conn)
+    auth.revoke_user_tokens("a@x.id")
+    # hasil lookup yang dimulai sebelum revoke selesai belakangan
+    auth.token_cache.put(token, "a@x.id", generation=stale_generation)
+    assert auth.token_cache.get(token) is None
+    assert auth.get_email_from_token(token) is None
+
+
+def test_purge_expired_tokens(fresh_db):
+    live = auth.issue_token("a@x.id")
+    with db.transaction() as conn:
+        db.execute(
+            conn,
+            "INSERT INTO tokens(token,email,expires_at) VALUES(?,?,datetime('now','-1 hour'))",
+            ("old", "a@x.id"),
+        )
+    assert auth.get_email_from_token("old") is None
+    assert auth.purge_expired_tokens() == 1
+    assert auth.get_email_from_token(live) == "a@x.id"
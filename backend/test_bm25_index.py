@@ -0,0 +1,72 @@
+"""
+Test paritas skor BM25Index dengan rank_bm25.BM25Okapi (k1=1.5, b=0.75, epsilon=0.25).
+
+rank-bm25 tidak lagi jadi dependency, jadi skor acuan di bawah dihitung sekali
+dengan rank_bm25 0.2.2 (BM25Okapi(corpus).get_scores(query)) lalu ditulis di sini.
+Korpus sengaja memuat term dengan IDF negatif ("python") supaya floor epsilon ikut teruji.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_bm25_index.py
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend.ml.bm25_index import BM25Index
+
+
+CORPUS = [
+    "python dasar untuk pemula",
+    "belajar python machine learning",
+    "machine learning terapan dengan python dan tensorflow",
+    "dasar pemrograman web dengan javascript",
+    "python",
+    "analisis data dengan python pandas dan numpy untuk pemula",
+]
+
+GOLDEN = [
+    (["python"], [0.232299555, 0.232299555, 0.179146267, 0.0, 0.3303009298, 0.1554357317]),
+    (["machine", "learning"], [0.0, 1.291838824, 0.9962485846, 0.0, 0.0, 0.0]),
+    (["python", "python", "pemula"], [1.1105185221, 0.4645991101, 0.3582925341, 0.0, 0.6606018597, 0.7430675405]),
+    (["dasar", "web", "javascript"], [0.645919412, 0.0, 0.0, 3.1863526332, 0.0, 0.0]),
+    (["tidak", "ada"], [0.0] * 6),
+]
+
+
+def _index(corpus):
+    index = BM25Index()
+    for i, text in enumerate(corpus):
+        index.add(i, text.split())
+    return index
+
+
+def _scores(index, query, n):
+    got = dict(index.search(query, k=n))
+    return [got.get(i, 0.0) for i in range(n)]
+
+
+@pytest.mark.parametrize("query,expected", GOLDEN, ids=[" ".join(q) for q, _ in GOLDEN])
+def test_scores_match_bm25okapi(query, expected):
+    assert _scores(_index(CORPUS), query, len(CORPUS)) == pytest.approx(expected, abs=1e-9)
+
+
+def test_scores_match_after_incremental_update():
+    index = _index(CORPUS)
+    # hapus dokumen 4, tambah dokumen baru → harus sama dengan BM25Okapi atas korpus baru
+    index.remove(4)
+    index.add(6, "deep learning lanjutan".split())
+    ids = [0, 1, 2, 3, 5, 6]
+    expected = {
+        ("python", "pemula"): [0.9150066995, 0.2527118658, 0.1966306024, 0.0, 0.6201954717, 0.0],
+        ("deep", "learning"): [0.0, 0.0, 0.0, 0.0, 0.0, 1.6177842604],
+    }
+    for query, scores in expected.items():
+        got = dict(index.search(list(query), k=10))
+        assert [got.get(i, 0.0) for i in ids] == pytest.approx(scores, abs=1e-9)
+
+
+def test_top_k_order_and_tiebreak():
+    index = _index(CORPUS)
+    top = index.search(["python"], k=3, tiebreak=lambda doc_id: -doc_id)
+    # dokumen 0 dan 1 seri; tiebreak -doc_id mendahulukan id lebih kecil
+    assert [doc_id for doc_id, _ in top] == [4, 0, 1]
@@ -0,0 +1,180 @@
+"""
+Test cache katalog Supabase (TTL, stale-while-revalidate, single-flight, snapshot)
+terhadap HTTP server lokal pengganti Supabase.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_catalog_cache.py
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.utils import supabase_client as sb
+
+
+class _FakeSupabase(BaseHTTPRequestHandler):
+    hits = 0
+    delay = 0.0
+    version = 1
+    fail = False
+
+    def do_GET(self):
+        cls = type(self)
+        cls.hits += 1
+        if cls.delay:
+            time.sleep(cls.delay)
+        if cls.fail:
+            self.send_response(503)
+            self.end_headers()
+            return
+        body = json.dumps([{"id": 1, "course_name": f"Kelas v{cls.version}"}]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    _FakeSupabase.hits, _FakeSupabase.delay, _FakeSupabase.version, _FakeSupabase.fail = 0, 0.0, 1, False
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FakeSupabase)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    monkeypatch.setattr(sb, "SUPABASE_URL", f"http://127.0.0.1:{httpd.server_address[1]}/rest/v1")
+    yield _FakeSupabase
+    httpd.shutdown()
+    httpd.server_close()
+    asyncio.run(sb.shutdown())
+
+
+def _run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await sb.shutdown()
+
+    return asyncio.run(wrapper())
+
+
+def test_fresh_entry_served_from_memory(server, tmp_path):
+    cache = sb.CatalogCache(ttls={"courses": 60}, snapshot_dir=tmp_path)
+    assert cache.get("courses")[0]["course_name"] == "Kelas v1"
+    server.version = 2
+    assert cache.get("courses")[0]["course_name"] == "Kelas v1"
+    assert server.hits == 1
+    assert cache.stats()["tables"]["courses"]["hits"] == 1
+
+
+def test_stale_entry_served_while_revalidating(server, tmp_path):
+    cache = sb.CatalogCache(ttls={"courses": 0.05}, snapshot_dir=tmp_path)
+
+    async def scenario():
+        await cache.get_async("courses")
+        await asyncio.sleep(0.1)
+        server.version = 2
+        stale = await cache.get_async("courses")
+        await asyncio.gather(*list(cache._background))
+        return stale, await cache.get_async("courses")
+
+    stale, fresh = _run(scenario())
+    assert stale[0]["course_name"] == "Kelas v1"
+    assert fresh[0]["course_name"] == "Kelas v2"
+    assert server.hits == 2
+
+
+def test_concurrent_misses_share_one_request(server):
+    server.delay = 0.2
+    cache = sb.CatalogCache(snapshot_dir=None)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_async("courses", {"limit": 300}) for _ in range(20)))
+
+    results = _run(scenario())
+    assert server.hits == 1
+    assert all(r == results[0] for r in results)
+
+    # jalur sync juga single-flight antar thread
+    cache.invalidate()
+    threads = [threading.Thread(target=cache.get, args=("courses", {"limit": 300})) for _ in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.hits == 2
+
+
+def test_snapshot_serves_cold_worker_when_upstream_down(server, tmp_path):
+    sb.CatalogCache(snapshot_dir=tmp_path).get("courses")
+    server.fail = True
+    cold = sb.CatalogCache(snapshot_dir=tmp_path)
+    assert cold.get("courses")[0]["course_name"] == "Kelas v1"
+    assert cold.stats()["tables"]["courses"]["stale_hits"] == 1
+
+
+def test_expired_entry_falls_back_when_fetch_fails(server, tmp_path):
+    cache = sb.CatalogCache(ttls={"courses": 0}, max_stale=0, snapshot_dir=None)
+    cache.get("courses")
+    server.fail = True
+    assert cache.get("courses")[0]["course_name"] == "Kelas v1"
+    assert cache.stats()["tables"]["courses"]["errors"] == 1
+
+
+def test_async_snapshot_io_runs_off_loop(server, tmp_path):
+    cache = sb.CatalogCache(snapshot_dir=tmp_path)
+    threads = []
+    write = cache._write_snapshot
+    cache._write_snapshot = lambda key, entry: threads.append(threading.get_ident()) or write(key, entry)
+
+    async def scenario():
+        data = await cache.get_async("courses")
+        await asyncio.gather(*list(cache._background))
+        return data, threading.get_ident()
+
+    data, loop_thread = _run(scenario())
+    assert data[0]["course_name"] == "Kelas v1"
+    assert threads and loop_thread not in threads
+    assert list(tmp_path.glob("courses-*.json"))
+
+
+def test_sync_stale_hits_share_one_refresh_worker(server, tmp_path):
+    cache = sb.CatalogCache(ttls={"courses": 0.05}, snapshot_dir=None)
+    cache.get("courses")
+    time.sleep(0.1)
+    server.delay = 0.2
+    server.version = 2
+    before = threading.active_count()
+    for _ in range(20):
+        assert cache.get("courses")[0]["course_name"] == "Kelas v1"
+    assert threading.active_count() <= before + 1
+    cache._refresher.shutdown(wait=True)
+    assert server.hits == 2
+    assert cache.get("courses")[0]["course_name"] == "Kelas v2"
+    cache.shutdown()
+
+
+def test_failed_refresh_counted_once_across_stale_hits(server):
+    cache = sb.CatalogCache(ttls={"courses": 0.05}, snapshot_dir=None)
+
+    async def scenario():
+        await cache.get_async("courses")
+        await asyncio.sleep(0.1)
+        server.fail, server.delay = True, 0.2
+        stale = [await cache.get_async("courses") for _ in range(5)]
+        await asyncio.gather(*list(cache._background), return_exceptions=True)
+        return stale
+
+    stale = _run(scenario())
+    assert all(s[0]["course_name"] == "Kelas v1" for s in stale)
+    assert server.hits == 2
+    assert cache.stats()["tables"]["courses"]["errors"] == 1
+    assert not cache._background
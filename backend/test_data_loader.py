@@ -0,0 +1,157 @@
+"""
+Test services/data_loader.py: cache kolumnar sheet Excel (roundtrip tipe,
+invalidasi manifest, sheet yang tidak bisa di-cache).
+
+Jalankan dari root repo:
+    python -m pytest backend/test_data_loader.py
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from backend.services import data_loader
+from backend.services.data_loader import WorkbookRegistry, _WorkbookHandle, build_excel_cache
+
+
+ROWS = [
+    ("name", "level", "price", "score", "active", "created", None),
+    ("Intro Python", "Beginner", 100, 1.5, True, datetime(2024, 1, 2, 3, 4, 5), "x"),
+    ("Data Science", None, 250.5, None, False, None, 7),
+    ("Intro Python", "Advanced", None, 3, None, datetime(2023, 12, 31), None),
+]
+
+
+def _write_xlsx(path, sheets):
+    wb = Workbook()
+    wb.remove(wb.active)
+    for name, rows in sheets.items():
+        ws = wb.create_sheet(name)
+        for row in rows:
+            ws.append(list(row))
+    wb.save(path)
+    return path
+
+
+def _openpyxl_records(path, sheet):
+    wb = load_workbook(filename=str(path), read_only=True, data_only=True)
+    try:
+        return data_loader._sheet_to_records(wb[sheet])
+    finally:
+        wb.close()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "CACHE_DIR", tmp_path / "cache")
+    return tmp_path / "cache"
+
+
+def test_cached_sheet_matches_openpyxl(tmp_path):
+    path = _write_xlsx(tmp_path / "book.xlsx", {"Main": ROWS, "Other": [("a",), (1,)]})
+    workbook = build_excel_cache(path)
+    assert workbook["sheetnames"] == ["Main", "Other"]
+    for sheet in workbook["sheetnames"]:
+        cached = data_loader._load_cached_sheet(workbook, sheet)
+        assert cached == _openpyxl_records(path, sheet)
+    main = data_loader._load_cached_sheet(workbook, "Main")
+    assert type(main[0]["price"]) is int and type(main[1]["price"]) is float
+    assert main[1]["level"] is None and main[0]["col_6"] == "x"
+
+
+def test_manifest_reused_until_file_changes(tmp_path, monkeypatch):
+    path = _write_xlsx(tmp_path / "book.xlsx", {"Main": ROWS})
+    first = data_loader._workbook_cache(path)
+
+    builds = []
+    real_build = data_loader.build_excel_cache
+    monkeypatch.setattr(data_loader, "build_excel_cache", lambda p: builds.append(p) or real_build(p))
+
+    # mtime berubah tapi isi sama: manifest tetap dipakai (cek sha256)
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert data_loader._workbook_cache(path)["sha256"] == first["sha256"]
+    assert builds == []
+
+    _write_xlsx(path, {"Main": ROWS[:2]})
+    rebuilt = data_loader._workbook_cache(path)
+    assert builds == [path]
+    assert rebuilt["sha256"] != first["sha256"]
+    assert len(data_loader._load_cached_sheet(rebuilt, "Main")) == 1
+    # file sheet versi lama dibersihkan
+    assert not list(data_loader.CACHE_DIR.glob(f"*{first['sha256'][:12]}*"))
+
+
+def test_uncacheable_sheet_falls_back_to_openpyxl(tmp_path):
+    rows = [("name", "when"), ("a", datetime(2024, 1, 1)), ("b", "besok")]
+    path = _write_xlsx(tmp_path / "mixed.xlsx", {"Mixed": rows})
+    handle = _WorkbookHandle(path)
+    try:
+        assert handle.manifest["sheets"]["Mixed"] is None
+        assert handle.sheet_manifest("Mixed") is None
+        assert handle.read_sheet("Mixed") == _openpyxl_records(path, "Mixed")
+    finally:
+        handle.close()
+
+
+def test_registry_lru_budget(tmp_path):
+    path = _write_xlsx(tmp_path / "book.xlsx", {"Main": ROWS})
+    registry = WorkbookRegistry(budget_bytes=250)
+    for key in ("a", "b", "c"):
+        registry.get_or_load(path, (key,), lambda h, k=key: k, sizer=lambda v: 100)
+    registry.get_or_load(path, ("b",), lambda h: pytest.fail("harus hit"), sizer=lambda v: 100)
+    stats = registry.stats()
+    assert stats["entries"] == 2 and stats["bytes"] == 200 and stats["evictions"] == 1
+    # "a" paling lama tidak dipakai → dibuang, "b" dan "c" tetap
+    loads = []
+    registry.get_or_load(path, ("a",), lambda h: loads.append("a") or "a", sizer=lambda v: 100)
+    assert loads == ["a"]
+    assert registry.get_or_load(path, ("b",), lambda h: pytest.fail("harus hit")) == "b"
+
+
+def test_registry_single_flight_and_no_global_block(tmp_path):
+    path = _write_xlsx(tmp_path / "book.xlsx", {"Main": ROWS})
+    registry = WorkbookRegistry()
+    registry.workbook(path)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow_loader(_h):
+        calls.append("slow")
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get_or_load(path, ("slow",), slow_loader, lambda v: 1)))
+        for _ in range(4)
+    ]
+    for t in threads:
+        t.start()
+    assert started.wait(5)
+    # sheet lain tetap bisa dimuat selama loader lambat berjalan
+    t0 = time.monotonic()
+    assert registry.get_or_load(path, ("fast",), lambda h: "fast", lambda v: 1) == "fast"
+    assert time.monotonic() - t0 < 1
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert calls == ["slow"] and results == ["slow"] * 4
+
+
+def test_registry_retries_after_loader_error(tmp_path):
+    path = _write_xlsx(tmp_path / "book.xlsx", {"Main": ROWS})
+    registry = WorkbookRegistry()
+
+    def broken(_h):
+        raise ValueError("rusak")
+
+    with pytest.raises(ValueError):
+        registry.get_or_load(path, ("x",), broken)
+    assert registry.get_or_load(path, ("x",), lambda h: "ok", lambda v: 1) == "ok"
@@ -0,0 +1,58 @@
+"""
+Test services/datasets.py: load_frame memberi dtype yang sama (termasuk kolom
+category) baik dari cache kolumnar maupun dari fallback openpyxl.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_datasets.py
+"""
+from __future__ import annotations
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+from backend.services import data_loader, datasets
+
+
+ROWS = [
+    ("course_name", "learning_path", "course_level", "course_price"),
+    ("Intro Python", "Machine Learning", "Beginner", 100),
+    ("React Dasar", "Front-End Web", None, None),
+    ("Deep Learning", "Machine Learning", "Advanced", 250.5),
+]
+
+
+@pytest.fixture
+def workbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(data_loader, "workbook_registry", data_loader.WorkbookRegistry())
+    monkeypatch.setattr(datasets, "workbook_registry", data_loader.workbook_registry)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Courses"
+    for row in ROWS:
+        ws.append(list(row))
+    path = tmp_path / "courses.xlsx"
+    wb.save(path)
+    return path
+
+
+def _check(df: pd.DataFrame) -> None:
+    assert isinstance(df["learning_path"].dtype, pd.CategoricalDtype)
+    assert list(df["learning_path"].cat.categories) == ["Machine Learning", "Front-End Web"]
+    assert isinstance(df["course_level"].dtype, pd.CategoricalDtype)
+    assert df["course_level"].isna().tolist() == [False, True, False]
+
+
+def test_categoricals_on_cache_path(workbook):
+    _check(datasets.load_frame(str(workbook), "Courses"))
+
+
+def test_categoricals_on_openpyxl_fallback(workbook, monkeypatch):
+    cached = datasets._build_frame(data_loader._WorkbookHandle(workbook), "Courses")
+    monkeypatch.setattr(data_loader, "_workbook_cache", lambda path: None)
+    df = datasets.load_frame(str(workbook), "Courses")
+    _check(df)
+    for col in ("learning_path", "course_level"):
+        assert df[col].dtype == cached[col].dtype
+    pd.testing.assert_frame_equal(df, cached, check_dtype=False)
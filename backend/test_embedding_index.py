@@ -0,0 +1,155 @@
+"""
+Test EmbeddingIndex: hasil top-k per partisi harus sama dengan jalur lama
+(cosine_similarity ke semua baris, filter DataFrame, sort_values).
+
+Jalankan dari root repo:
+    python -m pytest backend/test_embedding_index.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml import course_recommender as cr
+from backend.ml.embedding_index import EmbeddingIndex, top_k_indices
+from backend.ml.query_embedding_cache import QueryEmbeddingCache
+
+PATHS = ["AI Engineer", "Data Scientist", "React Developer", None]
+LEVELS = ["Beginner", "Intermediate", "Advanced", None]
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(3)
+    n = 240
+    emb = rng.normal(size=(n, 16)).astype(np.float64)
+    emb[5] = 0.0  # baris tanpa informasi tidak boleh bikin NaN
+    frame = pd.DataFrame({
+        "course_name": [f"Kursus {i}" for i in range(n)],
+        "learning_path": pd.Categorical([PATHS[i % 4] for i in range(n)]),
+        "course_level": pd.Categorical([LEVELS[(i // 4) % 4] for i in range(n)]),
+        "combined_text": [f"kursus {i}" for i in range(n)],
+    })
+    return emb, frame
+
+
+def _old_top_k(emb, frame, q, k, lp, level):
+    a = emb / np.maximum(np.linalg.norm(emb, axis=1, keepdims=True), 1e-12)
+    df = frame.copy()
+    df["sim"] = a @ (q / np.linalg.norm(q))
+    if lp:
+        df = df[df["learning_path"] == lp]
+    if level:
+        df = df[df["course_level"].str.lower() == level.lower()]
+    return df.sort_values(by="sim", ascending=False, kind="stable").head(k).index.tolist()
+
+
+@pytest.mark.parametrize("lp", ["AI Engineer", "React Developer", None])
+@pytest.mark.parametrize("level", ["beginner", "Advanced", None])
+def test_search_matches_dataframe_path(corpus, lp, level):
+    emb, frame = corpus
+    index = EmbeddingIndex(emb, frame["learning_path"].tolist(), frame["course_level"].tolist())
+    assert index.matrix.dtype == np.float32 and index.matrix.flags["C_CONTIGUOUS"]
+    q = np.random.default_rng(11).normal(size=16)
+    for k in (1, 5, 500):
+        rows, scores = index.search(q, k, learning_path=lp, level=level)
+        assert rows.tolist() == _old_top_k(emb, frame, q, k, lp, level)
+        assert np.all(np.diff(scores) <= 1e-6)
+
+
+def test_top_k_ties_keep_row_order():
+    scores = np.array([0.5, 0.9, 0.5, 0.9, 0.1], dtype=np.float32)
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 0]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_unknown_partition_is_empty(corpus):
+    emb, frame = corpus
+    index = EmbeddingIndex(emb, frame["learning_path"].tolist(), frame["course_level"].tolist())
+    rows, scores = index.search(np.ones(16), 5, learning_path="iOS Developer")
+    assert rows.size == 0 and scores.size == 0
+
+
+def test_recommend_uses_index(corpus, monkeypatch):
+    emb, frame = corpus
+
+    class FakeModel:
+        def encode(self, texts, **kwargs):
+            return emb[[7]]
+
+    monkeypatch.setattr(cr, "SENTENCE_TRANSFORMER_AVAILABLE", True)
+    monkeypatch.setattr(cr, "query_embedding_cache", QueryEmbeddingCache(path=None))
+    rec = cr.CourseRecommenderST()
+    rec.model = FakeModel()
+    rec.lp_combined = frame
+    rec.embeddings = emb
+    rec._build_index()
+    out = rec.recommend("saya ingin jadi AI Engineer", "Beginner", top_k=3)
+    assert set(out["learning_path"]) == {"AI Engineer"}
+    assert set(out["course_level"]) == {"Beginner"}
+    assert out.index.tolist() == _old_top_k(emb, frame, emb[7], 3, "AI Engineer", "Beginner")
+
+
+def test_recommend_many_matches_recommend(corpus, monkeypatch):
+    emb, frame = corpus
+    frame = frame.assign(summary=[f"ringkasan {i}" for i in range(len(frame))])
+    texts = {}
+
+    class FakeModel:
+        def __init__(self):
+            self.calls = 0
+
+        def encode(self, batch, **kwargs):
+            self.calls += 1
+            return np.stack([emb[texts.setdefault(t, len(texts) * 7 % len(emb))] for t in batch])
+
+    monkeypatch.setattr(cr, "SENTENCE_TRANSFORMER_AVAILABLE", True)
+    monkeypatch.setattr(cr, "query_embedding_cache", QueryEmbeddingCache(path=None))
+    rec = cr.CourseRecommenderST()
+    rec.model = FakeModel()
+    rec.lp_combined = frame
+    rec.embeddings = emb
+    rec._build_index()
+    queries = [
+        ("AI Engineer", "Beginner"), ("Data Scientist", None), ("React Developer", "advanced"),
+        ("sesuatu yang lain", None), ("AI Engineer", "Beginner"), ("sesuatu yang lain", "Intermediate"),
+        ("Data Scientist", ""),
+    ]
+    batch = rec.recommend_many(queries, top_k=4)
+    assert rec.model.calls == 1
+    for (user_input, level), got in zip(queries, batch):
+        assert got == rec.recommend(user_input, level, top_k=4).to_dict("records")
+    assert len(batch[1]) == 4
+
+
+def _peak_bytes(fn):
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("dtype", ["int8", "float16"])
+def test_quantized_scoring_is_chunked(dtype):
+    from backend.ml.embedding_store import quantize
+    rng = np.random.default_rng(7)
+    n, dim, chunk = 20000, 128, 512
+    data, scales = quantize(EmbeddingIndex(rng.normal(size=(n, dim)), [None] * n, [None] * n).matrix, dtype)
+    index = EmbeddingIndex(data, [None] * n, [None] * n, scales=scales, normalized=True, chunk_rows=chunk)
+    queries = EmbeddingIndex(rng.normal(size=(3, dim)), [None] * 3, [None] * 3).matrix
+    rows = np.arange(0, n, 2)
+
+    full = data.astype(np.float32) * (scales[:, None] if scales is not None else 1.0)
+    np.testing.assert_allclose(index.score(queries[0]), full @ queries[0], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(index.score(queries[0], rows), full[rows] @ queries[0], rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(index.score_many(queries), queries @ full.T, rtol=1e-5, atol=1e-6)
+
+    # salinan float32 penuh = n * dim * 4 byte (~10 MB); per blok hanya chunk * dim * 4 (~256 KB)
+    full_copy = n * dim * 4
+    assert _peak_bytes(lambda: index.score(queries[0])) < full_copy / 8
+    assert _peak_bytes(lambda: index.score(queries[0], rows)) < full_copy / 8
+    assert _peak_bytes(lambda: index.score_many(queries)) < full_copy / 8
@@ -0,0 +1,140 @@
+"""
+Test rebuild embedding incremental (ml/embedding_pipeline.py) dengan encoder palsu.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_embedding_pipeline.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backend.ml import course_recommender as cr
+from backend.ml.embedding_pipeline import refresh_store
+from backend.ml.embedding_store import EmbeddingStore
+from backend.ml.query_embedding_cache import QueryEmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        rng = [np.random.default_rng(abs(hash(t)) % 2**32) for t in texts]
+        return np.stack([r.normal(size=24) for r in rng])
+
+
+def test_only_changed_rows_are_encoded(tmp_path):
+    path = tmp_path / "c.emb"
+    enc = CountingEncoder()
+    texts = [f"kursus {i}" for i in range(50)]
+    first = refresh_store(path, texts, "m", enc.encode, "int8", batch_size=16)
+    assert first["encoded"] == 50 and first["reused"] == 0 and len(enc.encoded) == 50
+    before = {t: np.array(EmbeddingStore(path).matrix[i]) for i, t in enumerate(texts)}
+
+    again = refresh_store(path, texts, "m", enc.encode, "int8")
+    assert again["encoded"] == 0 and not again["swapped"]
+
+    changed = texts[1:] + ["kursus baru"]
+    changed[10] = "kursus 11 versi baru"
+    enc.encoded.clear()
+    result = refresh_store(path, changed, "m", enc.encode, "int8")
+    assert sorted(enc.encoded) == ["kursus 11 versi baru", "kursus baru"]
+    assert result["reused"] == 48 and result["removed"] == 2
+
+    store = EmbeddingStore(path)
+    assert len(store) == 50
+    # vektor yang dipakai ulang tidak bergeser walau di-dequantize & di-kuantisasi ulang
+    for i, t in enumerate(changed):
+        if t in before:
+            assert np.array_equal(np.array(store.matrix[i]), before[t])
+
+
+def test_model_or_dtype_change_forces_full_rebuild(tmp_path):
+    path = tmp_path / "c.emb"
+    enc = CountingEncoder()
+    texts = ["a", "b", "c"]
+    refresh_store(path, texts, "m", enc.encode, "int8")
+    assert refresh_store(path, texts, "m2", enc.encode, "int8")["encoded"] == 3
+    assert refresh_store(path, texts, "m2", enc.encode, "float16")["encoded"] == 3
+
+
+def _course_frame(names, levels):
+    return pd.DataFrame({
+        "course_name": names,
+        "learning_path": pd.Categorical(["AI Engineer"] * len(names)),
+        "course_level": pd.Categorical(levels),
+        "combined_text": [n.lower() for n in names],
+    })
+
+
+@pytest.fixture
+def recommenders(tmp_path, monkeypatch):
+    """Worker API dan job refresh yang membaca "Excel" yang sama (data["frame"])."""
+    monkeypatch.setattr(cr, "EMBEDDING_STORE_PATH", tmp_path / "c.emb")
+    monkeypatch.setattr(cr, "SENTENCE_TRANSFORMER_AVAILABLE", True)
+    monkeypatch.setattr(cr, "query_embedding_cache", QueryEmbeddingCache(path=None))
+    data = {"frame": _course_frame([f"Kursus {i}" for i in range(12)], ["Beginner", "Advanced"] * 6)}
+
+    def make():
+        rec = cr.CourseRecommenderST()
+        rec.model = CountingEncoder()
+        rec.frame_loader = lambda: data["frame"]
+        rec.lp_combined = data["frame"]
+        return rec
+
+    return data, make(), make()
+
+
+def test_recommender_picks_up_swapped_store(recommenders, tmp_path):
+    _, api_worker, job = recommenders
+    api_worker.refresh_embeddings()
+    old_index = api_worker.index
+    assert api_worker.reload_if_changed() is False
+
+    # job lain menulis ulang store (isi sama) -> worker memuat file baru
+    job.refresh_embeddings()
+    (tmp_path / "c.emb").touch()
+    assert api_worker.reload_if_changed() is True
+    assert api_worker.index is not old_index
+    out = api_worker.recommend("AI Engineer", "Beginner", top_k=3)
+    assert len(out) == 3 and set(out["course_level"]) == {"Beginner"}
+
+
+def test_refresh_reloads_changed_rows_in_every_worker(recommenders):
+    data, api_worker, job = recommenders
+    api_worker.refresh_embeddings()
+    assert api_worker.recommend_many([("AI Engineer", "Intermediate")], top_k=5) == [[]]
+
+    # sheet diubah: satu kursus diganti nama, dua kursus Intermediate ditambah
+    names = [f"Kursus {i}" for i in range(12)]
+    names[0] = "Kursus Nol Revisi"
+    data["frame"] = _course_frame(names + ["Kursus Baru A", "Kursus Baru B"],
+                                  ["Beginner", "Advanced"] * 6 + ["Intermediate"] * 2)
+    job.model.encoded.clear()
+    result = job.refresh_embeddings(reload_data=True)
+    assert result["swapped"] and result["rows"] == 14
+    assert sorted(job.model.encoded) == ["kursus baru a", "kursus baru b", "kursus nol revisi"]
+    assert len(job.lp_combined) == 14 and len(job.index) == 14
+
+    # worker API tidak me-refresh sendiri: melihat store baru, membaca ulang data, swap bersama
+    out = api_worker.recommend("AI Engineer", "Intermediate", top_k=5)
+    assert sorted(out["course_name"]) == ["Kursus Baru A", "Kursus Baru B"]
+    assert api_worker.lp_combined is data["frame"] and len(api_worker.index) == 14
+    batch = api_worker.recommend_many([("AI Engineer", "Intermediate"), ("AI Engineer", "Beginner")], top_k=20)
+    assert sorted(r["course_name"] for r in batch[0]) == ["Kursus Baru A", "Kursus Baru B"]
+    assert "Kursus Nol Revisi" in {r["course_name"] for r in batch[1]}
+    assert "Kursus 0" not in {r["course_name"] for r in batch[1]}
+
+
+def test_store_for_other_data_is_not_used(recommenders):
+    data, api_worker, job = recommenders
+    api_worker.refresh_embeddings()
+    old_frame, old_index = api_worker.lp_combined, api_worker.index
+    # store ditulis untuk data yang belum terlihat oleh worker ini
+    job.lp_combined = _course_frame(["Lain 1", "Lain 2"], ["Beginner", "Beginner"])
+    job.refresh_embeddings()
+    assert api_worker.reload_if_changed() is False
+    assert api_worker.lp_combined is old_frame and api_worker.index is old_index
@@ -0,0 +1,92 @@
+"""
+Test endpoint /ml-advanced/embeddings/refresh: hanya satu refresh berjalan per
+proses walau dipicu bersamaan, dan status GET butuh autentikasi yang sama.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_embedding_refresh_route.py
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.auth import user_from_auth
+from backend.routes import ml_advanced
+
+
+class _SlowRecommender:
+    def __init__(self):
+        self.calls = 0
+        self.kwargs = None
+        self.release = threading.Event()
+
+    def refresh_embeddings(self, **kwargs):
+        self.calls += 1
+        self.kwargs = kwargs
+        self.release.wait(5)
+        return {"rows": 3, "encoded": 1}
+
+
+@pytest.fixture
+def recommender(monkeypatch):
+    rec = _SlowRecommender()
+    monkeypatch.setattr(ml_advanced, "get_course_recommender", lambda: rec)
+    monkeypatch.setattr(ml_advanced, "_embedding_refresh", {"last": None, "error": None})
+    monkeypatch.setattr(ml_advanced, "_embedding_refresh_lock", threading.Lock())
+    yield rec
+    rec.release.set()
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ml_advanced.router)
+    return app, TestClient(app)
+
+
+def test_concurrent_refreshes_run_once(recommender):
+    threads = [threading.Thread(target=ml_advanced._run_embedding_refresh) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for _ in range(100):
+        if recommender.calls:
+            break
+        time.sleep(0.01)
+    assert ml_advanced._embedding_refresh_state()["running"]
+    recommender.release.set()
+    for t in threads:
+        t.join()
+    assert recommender.calls == 1
+    # data kursus dibaca ulang dari Excel, bukan frame yang dimuat saat start
+    assert recommender.kwargs == {"reload_data": True}
+    assert ml_advanced._embedding_refresh_state() == {
+        "running": False, "last": {"rows": 3, "encoded": 1}, "error": None,
+    }
+
+
+def test_status_requires_auth(recommender, client):
+    app, http = client
+    assert http.get("/ml-advanced/embeddings/refresh").status_code == 401
+    assert http.post("/ml-advanced/embeddings/refresh").status_code == 401
+    app.dependency_overrides[user_from_auth] = lambda: "a@example.com"
+    assert http.get("/ml-advanced/embeddings/refresh").json()["running"] is False
+
+
+def test_post_reports_running_while_refresh_holds_lock(recommender, client):
+    app, http = client
+    app.dependency_overrides[user_from_auth] = lambda: "a@example.com"
+    worker = threading.Thread(target=ml_advanced._run_embedding_refresh)
+    worker.start()
+    for _ in range(100):
+        if recommender.calls:
+            break
+        time.sleep(0.01)
+    resp = http.post("/ml-advanced/embeddings/refresh")
+    assert resp.status_code == 202 and resp.json()["status"] == "running"
+    recommender.release.set()
+    worker.join()
+    assert recommender.calls == 1
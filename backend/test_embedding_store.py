@@ -0,0 +1,65 @@
+"""
+Test embedding store (ml/embedding_store.py): format file, memmap, dan recall@k
+hasil kuantisasi terhadap float32.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_embedding_store.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.ml.embedding_index import EmbeddingIndex
+from backend.ml.embedding_store import EmbeddingStore, corpus_hash, read_header, recall_at_k, write_store
+
+
+@pytest.fixture
+def clustered():
+    # embedding kursus cenderung mengelompok per learning path
+    rng = np.random.default_rng(5)
+    centers = rng.normal(size=(13, 96))
+    labels = rng.integers(0, 13, size=600)
+    emb = centers[labels] + 0.6 * rng.normal(size=(600, 96))
+    queries = centers[rng.integers(0, 13, size=60)] + 0.8 * rng.normal(size=(60, 96))
+    return emb.astype(np.float32), queries
+
+
+@pytest.mark.parametrize("dtype,min_recall", [("float32", 1.0), ("float16", 0.99), ("int8", 0.95)])
+def test_roundtrip_and_recall(tmp_path, clustered, dtype, min_recall):
+    emb, queries = clustered
+    path = write_store(tmp_path / "c.emb", emb, "model-x", corpus_hash(["a", "b"]), dtype)
+    store = EmbeddingStore(path)
+    assert isinstance(store.matrix, np.memmap) and store.matrix.dtype == np.dtype(dtype)
+    assert store.matrix.shape == emb.shape
+    assert (store.scales is not None) == (dtype == "int8")
+    assert store.matches("model-x", corpus_hash(["a", "b"]))
+    assert not store.matches("model-x", corpus_hash(["a", "c"]))
+    assert recall_at_k(emb, store, queries, k=10) >= min_recall
+    # skor ter-kuantisasi mendekati cosine asli
+    ref = EmbeddingIndex(emb, [None] * len(emb), [None] * len(emb))
+    quant = store.index([None] * len(emb), [None] * len(emb))
+    q = queries[0] / np.linalg.norm(queries[0])
+    assert np.abs(ref.score(q) - quant.score(q)).max() < 0.02
+
+
+def test_header_and_atomic_replace(tmp_path, clustered):
+    emb, _ = clustered
+    path = tmp_path / "c.emb"
+    write_store(path, emb[:10], "m", "h1", "int8")
+    old = EmbeddingStore(path)
+    before = np.array(old.matrix)
+    write_store(path, emb[10:30], "m", "h2", "float16")
+    header = read_header(path)
+    assert header["rows"] == 20 and header["dtype"] == "float16" and header["corpus_hash"] == "h2"
+    assert header["matrix_offset"] % 64 == 0
+    # pembaca lama tetap melihat file lama (inode lama)
+    assert np.array_equal(np.array(old.matrix), before)
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_rejects_foreign_file(tmp_path):
+    bad = tmp_path / "x.emb"
+    bad.write_bytes(b"bukan embedding")
+    with pytest.raises(ValueError):
+        EmbeddingStore(bad)
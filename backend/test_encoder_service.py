@@ -0,0 +1,86 @@
+"""
+Test micro-batching encoder (ml/encoder_service.py) dengan encoder palsu.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_encoder_service.py
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.ml.encoder_service import BatchingEncoder
+
+
+class SlowEncoder:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def encode(self, texts, **kwargs):
+        with self.lock:
+            self.batches.append(list(texts))
+            time.sleep(self.delay)
+        return np.array([[float(len(t)), float(sum(map(ord, t)))] for t in texts])
+
+
+def _expected(text):
+    return np.array([len(text), sum(map(ord, text))], dtype=np.float32)
+
+
+def test_concurrent_requests_share_batches():
+    enc = SlowEncoder()
+    batcher = BatchingEncoder(enc.encode, max_batch=16, max_wait_ms=20)
+    texts = [f"query {i}" for i in range(32)]
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(lambda t: batcher.encode([t]), texts))
+    batcher.stop()
+    for text, vec in zip(texts, results):
+        assert vec.shape == (1, 2) and vec.dtype == np.float32
+        assert np.array_equal(vec[0], _expected(text))
+    assert len(enc.batches) < len(texts)
+    assert max(len(b) for b in enc.batches) <= 16
+    stats = batcher.stats()
+    assert stats["requests"] == 32 and stats["batches"] == len(enc.batches)
+
+
+def test_duplicates_encoded_once_and_order_kept():
+    enc = SlowEncoder(delay=0)
+    batcher = BatchingEncoder(enc.encode, max_batch=8, max_wait_ms=0)
+    out = batcher.encode(["b", "a", "b"])
+    batcher.stop()
+    assert enc.batches == [["b", "a"]]
+    assert [row.tolist() for row in out] == [_expected(t).tolist() for t in ["b", "a", "b"]]
+
+
+def test_errors_reach_every_caller():
+    def broken(texts):
+        raise RuntimeError("model rusak")
+
+    batcher = BatchingEncoder(broken, max_wait_ms=0)
+    with pytest.raises(RuntimeError, match="model rusak"):
+        batcher.encode(["x"])
+    # worker tetap hidup setelah error
+    with pytest.raises(RuntimeError):
+        batcher.encode(["y"])
+    batcher.stop()
+    assert batcher.stats()["errors"] == 2
+
+
+def test_async_front_end():
+    enc = SlowEncoder()
+    batcher = BatchingEncoder(enc.encode, max_batch=32, max_wait_ms=20)
+
+    async def main():
+        return await asyncio.gather(*(batcher.encode_async([f"q{i}"]) for i in range(10)))
+
+    results = asyncio.run(main())
+    batcher.stop()
+    assert [r[0].tolist() for r in results] == [_expected(f"q{i}").tolist() for i in range(10)]
+    assert len(enc.batches) == 1
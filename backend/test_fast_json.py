@@ -0,0 +1,54 @@
+"""
+Test encoder JSON response (utils/fast_json.py): NaN/Infinity -> null dan DataFrame
+di-encode sama seperti to_dict('records').
+
+Jalankan dari root repo:
+    python -m pytest backend/test_fast_json.py
+"""
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from backend.utils import fast_json
+from backend.utils.fast_json import FastJSONResponse, dumps, frame_records
+
+
+def _frame():
+    return pd.DataFrame({
+        "course_name": ["A", "B", None],
+        "course_level": pd.Categorical(["Beginner", "Advanced", "Beginner"]),
+        "course_price": [100.0, np.nan, np.inf],
+        "rank": np.array([1, 2, 3], dtype=np.int64),
+        "free": [True, False, True],
+    })
+
+
+def test_frame_records_matches_to_dict():
+    df = _frame().iloc[:2]
+    df = df.assign(course_price=[100.0, 50.5])
+    assert frame_records(df) == df.to_dict("records")
+
+
+def test_nan_and_inf_become_null():
+    out = json.loads(dumps({"courses": _frame(), "score": np.float32("nan"), "v": np.array([1.5, -np.inf])}))
+    assert [c["course_price"] for c in out["courses"]] == [100.0, None, None]
+    assert out["courses"][2]["course_name"] is None
+    assert out["courses"][1]["course_level"] == "Advanced"
+    assert out["courses"][0]["rank"] == 1 and out["courses"][0]["free"] is True
+    assert out["score"] is None and out["v"] == [1.5, None]
+
+
+def test_stdlib_fallback_matches(monkeypatch):
+    content = {"courses": _frame(), "n": np.int64(3), "x": float("nan")}
+    expected = json.loads(dumps(content))
+    monkeypatch.setattr(fast_json, "ORJSON_AVAILABLE", False)
+    assert json.loads(dumps(content)) == expected
+
+
+def test_response_is_pre_encoded():
+    response = FastJSONResponse({"courses": _frame()})
+    assert response.media_type == "application/json"
+    assert json.loads(response.body)["courses"][1]["course_price"] is None
@@ -0,0 +1,273 @@
+"""
+Test client Gemini async terhadap server Gemini tiruan lokal.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_gemini_client.py
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.llm import gemini_client as gc
+from backend.llm.response_cache import ResponseCache
+
+
+class _FakeGemini(BaseHTTPRequestHandler):
+    delay = 0.0
+    fail_after = None  # putuskan stream setelah n potongan
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        cls = type(self)
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            text = payload["contents"][0]["parts"][-1]["text"]
+            if "streamGenerateContent" in self.path:
+                self._stream(text)
+                return
+            time.sleep(cls.delay)
+            body = json.dumps({"candidates": [{"content": {"parts": [{"text": f"balasan: {text}"}]}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def _stream(self, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        if type(self).fail_after is not None:
+            # body dijanjikan lebih panjang dari yang dikirim -> klien melihat koneksi putus
+            self.send_header("Content-Length", "1000000")
+        self.end_headers()
+        for i, word in enumerate(["balasan:", *text.split()]):
+            if i == type(self).fail_after:
+                self.close_connection = True
+                return
+            chunk = {"candidates": [{"content": {"parts": [{"text": word if i == 0 else f" {word}"}]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\r\n\r\n".encode())
+            self.wfile.flush()
+            time.sleep(type(self).delay)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    _FakeGemini.delay, _FakeGemini.active, _FakeGemini.peak = 0.0, 0, 0
+    _FakeGemini.fail_after = None
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _FakeGemini)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_address[1]}/v1beta/models/fake"
+    monkeypatch.setattr(gc, "API_URL", f"{base}:generateContent")
+    monkeypatch.setattr(gc, "STREAM_URL", f"{base}:streamGenerateContent")
+    monkeypatch.setattr(gc, "GEMINI_API_KEY", "test-key")
+    monkeypatch.setattr(gc, "response_cache", ResponseCache(tmp_path / "llm_cache.db"))
+    yield _FakeGemini
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _run(coro):
+    async def wrapper():
+        try:
+            return await coro
+        finally:
+            await gc.shutdown()
+
+    return asyncio.run(wrapper())
+
+
+def test_returns_model_text(server):
+    assert _run(gc.generate_message_async(["halo"])) == "balasan: halo"
+
+
+def test_event_loop_not_blocked(server):
+    server.delay = 0.3
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.ensure_future(ticker())
+        reply = await gc.generate_message_async(["lambat"])
+        t.cancel()
+        return reply, ticks
+
+    reply, ticks = _run(scenario())
+    assert reply == "balasan: lambat"
+    assert ticks >= 10
+
+
+def test_deadline_returns_fallback(server):
+    server.delay = 1.0
+    started = time.perf_counter()
+    reply = _run(gc.generate_message_async(["lambat"], deadline=0.2))
+    assert time.perf_counter() - started < 0.8
+    assert "tidak tersedia" in reply
+    assert gc.stats()["in_flight"] == 0
+
+
+def test_concurrency_is_bounded(server, monkeypatch):
+    server.delay = 0.1
+    monkeypatch.setattr(gc, "GEMINI_MAX_CONCURRENCY", 2)
+
+    async def scenario():
+        return await asyncio.gather(*(gc.generate_message_async([f"q{i}"]) for i in range(6)))
+
+    replies = _run(scenario())
+    assert replies == [f"balasan: q{i}" for i in range(6)]
+    assert server.peak <= 2
+
+
+def test_cancellation_propagates(server):
+    server.delay = 1.0
+
+    async def scenario():
+        task = asyncio.ensure_future(gc.generate_message_async(["batal"]))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    _run(scenario())
+    stats = gc.stats()
+    assert stats["cancelled"] >= 1
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_stream_yields_chunks_and_records_ttfb(server):
+    server.delay = 0.05
+
+    async def scenario():
+        return [piece async for piece in gc.stream_message_async(["satu dua tiga"])]
+
+    pieces = _run(scenario())
+    assert pieces == ["balasan:", " satu", " dua", " tiga"]
+    assert gc.stats()["stream_ttfb"]["count"] >= 1
+
+
+def test_stream_deadline_before_first_chunk(server):
+    server.delay = 0.5
+
+    async def scenario():
+        return [piece async for piece in gc.stream_message_async(["a b c"], deadline=0.01)]
+
+    pieces = _run(scenario())
+    assert len(pieces) == 1 and "tidak tersedia" in pieces[0]
+
+
+def test_stream_failure_after_first_chunk_raises(server):
+    server.fail_after = 1
+
+    async def scenario():
+        pieces = []
+        with pytest.raises(gc.StreamInterrupted):
+            async for piece in gc.stream_message_async(["satu dua tiga"], call_site="bot_reply"):
+                pieces.append(piece)
+        return pieces
+
+    errors_before = gc.stats()["errors"]
+    assert _run(scenario()) == ["balasan:"]
+    assert gc.stats()["errors"] == errors_before + 1
+    # jawaban terpotong tidak boleh masuk cache
+    assert gc.response_cache.get("bot_reply", gc.GEMINI_MODEL, "satu dua tiga") is None
+
+
+def _stream_chat(tmp_path, text):
+    """(nama event, data event, pesan tersimpan) dari satu POST ke endpoint stream."""
+    import httpx
+    from backend import db
+
+    db.configure_pool(tmp_path / "chat.db", size=2)
+    db.init_db()
+    from backend.main import app
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            r = await client.post("/auth/register", json={"name": "A", "email": "sse@example.com", "password": "secret123"})
+            headers = {"Authorization": f"Bearer {r.json()['token']}"}
+            cid = (await client.post("/conversations", json={}, headers=headers)).json()["id"]
+            async with client.stream(
+                "POST", f"/conversations/{cid}/messages/stream", json={"text": text}, headers=headers
+            ) as resp:
+                assert resp.headers["content-type"].startswith("text/event-stream")
+                lines = [line async for line in resp.aiter_lines()]
+            msgs = (await client.get(f"/conversations/{cid}/messages", headers=headers)).json()
+            return lines, msgs
+
+    try:
+        lines, msgs = _run(scenario())
+    finally:
+        db.close_pool()
+    events = [line for line in lines if line.startswith("event:")]
+    data = [json.loads(line[len("data: "):]) for line in lines if line.startswith("data:")]
+    return events, data, msgs
+
+
+def test_stream_endpoint_persists_final_message(server, tmp_path):
+    events, _, msgs = _stream_chat(tmp_path, "halo semua")
+    # server tiruan menggemakan bagian prompt terakhir kata per kata
+    assert msgs[-1]["text"] == "balasan: Pertanyaan terbaru: halo semua"
+    assert events.count("event: chunk") == 5 and events[-1] == "event: done"
+    assert [m["role"] for m in msgs] == ["user", "bot"]
+
+
+def test_stream_endpoint_does_not_persist_truncated_reply(server, tmp_path):
+    server.fail_after = 1
+    events, data, msgs = _stream_chat(tmp_path, "halo semua")
+    assert events == ["event: chunk", "event: error"]
+    assert data[-1]["partial"] == "balasan:"
+    # hanya pesan user yang tersimpan; jawaban terpotong tidak ditampilkan sebagai jawaban utuh
+    assert [m["role"] for m in msgs] == ["user"]
+
+
+def test_stream_cache_hit_not_counted_as_ttfb(server):
+    async def scenario():
+        first = [p async for p in gc.stream_message_async(["satu dua"], call_site="bot_reply")]
+        before = (len(gc._async_state.ttfb), gc.stats()["stream_cache_hits"])
+        second = [p async for p in gc.stream_message_async(["satu dua"], call_site="bot_reply")]
+        return first, second, before
+
+    first, second, (ttfb_before, hits_before) = _run(scenario())
+    assert second == ["".join(first)]
+    assert len(gc._async_state.ttfb) == ttfb_before
+    assert gc.stats()["stream_cache_hits"] == hits_before + 1
+
+
+def test_client_from_previous_loop_is_closed(server):
+    # loop pertama berakhir tanpa shutdown(): client-nya tertinggal di _async_state
+    assert asyncio.run(gc.generate_message_async(["satu"])) == "balasan: satu"
+    old_client = gc._async_state.client
+    assert old_client is not None and not old_client.is_closed
+
+    async def scenario():
+        reply = await gc.generate_message_async(["dua"])
+        await asyncio.gather(*list(gc._async_state.closing))
+        return reply
+
+    assert _run(scenario()) == "balasan: dua"
+    assert old_client.is_closed
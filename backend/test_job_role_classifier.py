@@ -0,0 +1,85 @@
+"""
+Test classifier job role lokal (ml/job_role_classifier.py) dan eskalasi ke Gemini
+di detect_job_role.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_job_role_classifier.py
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend.ml import job_detector, job_role_classifier
+from backend.ml.job_role_classifier import JobRoleClassifier
+
+
+ROLES = ["AI Engineer", "Front-End Web Developer", "Back-End Developer"]
+
+
+@pytest.fixture(scope="module")
+def clf():
+    texts = [
+        "machine learning deep learning tensorflow model neural network",
+        "python data science model training pytorch",
+        "html css javascript react tampilan web responsif",
+        "react vue frontend ui komponen browser",
+        "api server database backend rest express",
+        "node js sql database server golang",
+    ]
+    labels = ["AI Engineer", "AI Engineer", "Front-End Web Developer", "Front-End Web Developer",
+              "Back-End Developer", "Back-End Developer"]
+    return JobRoleClassifier.train(texts, labels)
+
+
+@pytest.fixture
+def detector(monkeypatch, clf):
+    monkeypatch.setattr(job_detector, "get_classifier", lambda: clf)
+    monkeypatch.setattr(job_detector, "GEMINI_API_KEY", "test-key")
+    calls = []
+
+    def fake_cached_call(call_site, model, prompt, fn, semantic_text=None, ttl=None):
+        calls.append(semantic_text)
+        return "Back-End Developer"
+
+    monkeypatch.setattr(job_detector.response_cache, "cached_call", fake_cached_call)
+    return calls
+
+
+def test_confident_prediction(clf):
+    role, confidence = clf.predict("saya ingin membuat model deep learning dengan tensorflow")
+    assert role == "AI Engineer" and confidence > 0.5
+
+
+def test_allowed_subset_keeps_raw_probability(clf):
+    text = "membuat api dan database server"
+    proba = dict(zip(clf.classes, clf.predict_proba(text)))
+    role, confidence = clf.predict(text, allowed=["AI Engineer", "Front-End Web Developer"])
+    # kelas terbaik di subset, tapi confidence = probabilitas mentahnya (tidak dibesarkan)
+    assert role == max(["AI Engineer", "Front-End Web Developer"], key=proba.get)
+    assert confidence == pytest.approx(proba[role])
+    assert clf.predict(text, allowed=["Data Scientist"]) == (None, 0.0)
+    assert clf.predict("zzz qqq") == (None, 0.0)
+
+
+def test_detect_uses_local_above_threshold(detector):
+    role = job_detector.detect_job_role("model deep learning tensorflow", ROLES, threshold=0.5)
+    assert role == "AI Engineer"
+    assert detector == []
+
+
+def test_detect_escalates_low_confidence_in_subset(detector):
+    # di luar subset, kelas "Back-End" paling cocok; subset tidak boleh menaikkan confidence
+    text = "membuat api dan database server"
+    role = job_detector.detect_job_role(text, ["AI Engineer", "Front-End Web Developer"], threshold=0.5)
+    assert detector == [text]
+    assert role == "Back-End Developer"
+
+
+def test_missing_model_falls_back_to_llm(monkeypatch, tmp_path, detector):
+    monkeypatch.setattr(job_role_classifier, "MODEL_PATH", tmp_path / "tidak-ada.joblib")
+    monkeypatch.setattr(job_role_classifier, "_classifier", None)
+    monkeypatch.setattr(job_role_classifier, "train_and_save", lambda *a, **k: pytest.fail("tidak boleh melatih"))
+    assert job_role_classifier.get_classifier() is None
+    monkeypatch.setattr(job_detector, "get_classifier", job_role_classifier.get_classifier)
+    assert job_detector.detect_job_role("model deep learning", ROLES) == "Back-End Developer"
+    assert detector == ["model deep learning"]
@@ -0,0 +1,76 @@
+"""
+Test KeywordIndex: exact match, fuzzy match, dan aturan seri yang sama untuk
+match, match_many, dan fallback difflib.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_keyword_index.py
+"""
+from __future__ import annotations
+
+import pytest
+
+from backend.ml import keyword_index
+from backend.ml.keyword_index import KeywordIndex, get_keyword_index
+
+
+KEYWORDS = ["Data Scientist", "Backend Developer", "Frontend Developer", "Machine Learning Engineer"]
+
+# "abcd" vs "abcdwxyz": 2*4/12 = 0.667, "abcd" vs "ab": 2*2/6 = 0.667 → seri.
+# Keyword panjang sengaja di depan supaya urutan per-panjang berbeda dari urutan asli.
+TIE_KEYWORDS = ["abcdwxyz", "ab", "zzzzzz"]
+
+
+@pytest.fixture(params=[True, False], ids=["rapidfuzz", "difflib"])
+def backend(request, monkeypatch):
+    if request.param and not keyword_index.RAPIDFUZZ_AVAILABLE:
+        pytest.skip("rapidfuzz tidak terpasang")
+    monkeypatch.setattr(keyword_index, "RAPIDFUZZ_AVAILABLE", request.param)
+    return request.param
+
+
+def test_exact_match_is_case_and_whitespace_insensitive(backend):
+    index = KeywordIndex(KEYWORDS)
+    assert index.match("  data   SCIENTIST ") == "Data Scientist"
+    assert "backend developer" in index
+    assert "devops" not in index
+    assert index.match_many(["BACKEND developer", "", "frontend  developer"]) == [
+        "Backend Developer", None, "Frontend Developer",
+    ]
+
+
+def test_fuzzy_match_respects_cutoff(backend):
+    index = KeywordIndex(KEYWORDS)
+    assert index.match("data scienist") == "Data Scientist"
+    assert index.match("backnd develper") == "Backend Developer"
+    assert index.match("kuliner") is None
+    assert index.match("data scienist", cutoff=0.99) is None
+
+
+def test_tie_prefers_first_keyword_in_original_order(backend):
+    index = KeywordIndex(TIE_KEYWORDS)
+    assert index.match("abcd") == "abcdwxyz"
+    assert index.match_many(["abcd"]) == ["abcdwxyz"]
+
+
+def test_match_many_agrees_with_match(backend):
+    index = KeywordIndex(KEYWORDS + TIE_KEYWORDS)
+    phrases = ["abcd", "data scienist", "frontend develper", "machine learning", "kuliner", "Data Scientist", "  "]
+    assert index.match_many(phrases) == [index.match(p) for p in phrases]
+
+
+def test_duplicates_and_empty_keywords_are_dropped():
+    index = KeywordIndex(["Python", "Python", "", None, "  ", "SQL"])
+    assert index.keywords == ["Python", "SQL"]
+    assert len(index) == 2
+
+
+def test_extract_finds_keywords_in_free_text():
+    if not keyword_index.RAPIDFUZZ_AVAILABLE:
+        pytest.skip("rapidfuzz tidak terpasang")
+    index = KeywordIndex(KEYWORDS)
+    found = dict(index.extract("saya ingin menjadi backend developer", limit=2))
+    assert found.get("Backend Developer") == 100.0
+
+
+def test_get_keyword_index_is_shared_per_list():
+    assert get_keyword_index(KEYWORDS) is get_keyword_index(list(KEYWORDS))
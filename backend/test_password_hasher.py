@@ -0,0 +1,136 @@
+"""
+Test PasswordHasher (auth.py): hash/verify lewat pool, HasherBusy saat antrian
+penuh, queue_depth/stats, shutdown, dan 503 di endpoint login saat hasher sibuk.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_password_hasher.py
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from backend import auth
+from backend.auth import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    h = PasswordHasher(workers=1, max_queue=1)
+    yield h
+    h.shutdown()
+
+
+async def _wait_started(started: threading.Event) -> None:
+    assert await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+
+
+def test_hash_verify_round_trip_runs_in_pool(hasher, monkeypatch):
+    threads = []
+    original = auth.hash_password
+
+    def recording_hash(password):
+        threads.append(threading.current_thread().name)
+        return original(password)
+
+    monkeypatch.setattr(auth, "hash_password", recording_hash)
+
+    async def scenario():
+        hashed = await hasher.hash("rahasia123")
+        return hashed, await hasher.verify("rahasia123", hashed), await hasher.verify("salah", hashed)
+
+    hashed, ok, wrong = asyncio.run(scenario())
+    assert hashed.startswith("$pbkdf2-sha256$")
+    assert ok is True and wrong is False
+    assert threads and threads[0].startswith("pwd-hash")
+    assert hasher.stats()["completed"] == 3
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_full_queue_raises_hasher_busy(hasher):
+    release, started = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    async def scenario():
+        running = hasher._submit(block)
+        await _wait_started(started)
+        queued = hasher._submit(block)
+        assert hasher.queue_depth == 1
+        assert hasher.stats()["in_flight"] == 2
+        with pytest.raises(HasherBusy):
+            await hasher.hash("rahasia123")
+        release.set()
+        return await asyncio.gather(running, queued)
+
+    assert asyncio.run(scenario()) == ["ok", "ok"]
+    stats = hasher.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["peak_queue_depth"] == 1
+    assert hasher.queue_depth == 0
+
+
+def test_shutdown_cancels_queued_work_and_recreates_executor(hasher):
+    release, started = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        running = hasher._submit(block)
+        await _wait_started(started)
+        queued = hasher._submit(block)
+        hasher.shutdown()
+        assert hasher._executor is None
+        release.set()
+        await running
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        # executor dibuat ulang saat dipakai lagi
+        return await hasher.verify("rahasia123", auth.hash_password("rahasia123"))
+
+    assert asyncio.run(scenario()) is True
+    assert hasher.stats()["in_flight"] == 0
+
+
+def test_login_returns_503_when_hasher_busy(tmp_path, monkeypatch):
+    import httpx
+    from backend import db, main
+
+    db.configure_pool(tmp_path / "hasher.db", size=2)
+    db.init_db()
+    auth.create_user("A", "busy@example.com", "rahasia123")
+    busy = PasswordHasher(workers=1, max_queue=0)
+    monkeypatch.setattr(main, "password_hasher", busy)
+    release, started = threading.Event(), threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    async def scenario():
+        holder = busy._submit(block)
+        await _wait_started(started)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            body = {"email": "busy@example.com", "password": "rahasia123"}
+            during = await client.post("/auth/login", json=body)
+            release.set()
+            await holder
+            after = await client.post("/auth/login", json=body)
+        return during, after
+
+    try:
+        during, after = asyncio.run(scenario())
+    finally:
+        busy.shutdown()
+        db.close_pool()
+    assert during.status_code == 503
+    assert after.status_code == 200 and after.json()["email"] == "busy@example.com"
@@ -0,0 +1,116 @@
+"""
+Test cache embedding query (ml/query_embedding_cache.py) dengan encoder palsu.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_query_embedding_cache.py
+"""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+from backend.ml import course_recommender as cr
+from backend.ml.query_embedding_cache import QueryEmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float64)
+
+
+def test_memory_and_disk_hits(tmp_path):
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(tmp_path / "q.db", max_entries=2)
+    first = cache.encode("m", ["ai engineer", "data scientist", "ai engineer"], enc.encode)
+    assert first.shape == (3, 3) and first.dtype == np.float32
+    assert enc.calls == [["ai engineer", "data scientist"]]
+    assert np.array_equal(first[0], first[2])
+
+    cache.encode("m", ["data scientist"], enc.encode)
+    assert len(enc.calls) == 1 and cache.stats()["hits"] == 1
+
+    # model lain = key lain
+    cache.encode("m2", ["data scientist"], enc.encode)
+    assert len(enc.calls) == 2
+
+    # restart: memori kosong, embedding dibaca dari disk
+    cache.close()
+    reopened = QueryEmbeddingCache(tmp_path / "q.db")
+    again = reopened.encode("m", ["ai engineer"], enc.encode)
+    assert len(enc.calls) == 2 and np.array_equal(again[0], first[0])
+    assert reopened.stats()["disk_hits"] == 1
+
+
+def test_lru_bound():
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(path=None, max_entries=2)
+    cache.encode("m", ["a", "b", "c"], enc.encode)
+    assert cache.stats()["entries"] == 2
+    cache.encode("m", ["a"], enc.encode)
+    assert enc.calls[-1] == ["a"]
+
+
+def test_recommender_warms_all_path_level_combinations(monkeypatch):
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(path=None)
+    monkeypatch.setattr(cr, "SENTENCE_TRANSFORMER_AVAILABLE", True)
+    monkeypatch.setattr(cr, "query_embedding_cache", cache)
+    rec = cr.CourseRecommenderST()
+    rec.model = enc
+    n_paths = len(rec.learning_path_mapping)
+    assert rec.warm_query_cache() == n_paths * 4
+    assert rec.warm_query_cache() == 0
+    rec.encode_queries([cr.clean_text("Front-End Web Developer Beginner")])
+    assert len(enc.calls) == 1
+    assert cache.stats()["misses"] == n_paths * 4
+
+
+def test_disk_table_is_bounded_lru(tmp_path):
+    enc = CountingEncoder()
+    cache = QueryEmbeddingCache(tmp_path / "q.db", max_entries=1, max_disk_entries=3)
+    for text in ["satu", "dua", "tiga"]:
+        cache.encode("m", [text], enc.encode)
+        time.sleep(0.01)
+    # memori cuma 1 entri -> "satu" dibaca dari disk dan jadi paling baru dipakai
+    cache.encode("m", ["satu"], enc.encode)
+    assert cache.stats()["disk_hits"] == 1
+    time.sleep(0.01)
+    # teks bebas baru mengusir baris yang paling lama tidak dipakai
+    cache.encode("m", ["empat"], enc.encode)
+    time.sleep(0.01)
+    cache.encode("m", ["lima"], enc.encode)
+    rows = {t for (t,) in cache._db().execute("SELECT text FROM query_embeddings")}
+    assert rows == {"satu", "empat", "lima"}
+    assert cache.stats()["disk_entries"] == 3 and cache.stats()["evicted"] == 2
+
+
+def test_disk_bound_counts_rows_from_other_workers(tmp_path):
+    enc = CountingEncoder()
+    other = QueryEmbeddingCache(tmp_path / "q.db", max_disk_entries=4)
+    other.encode("m", ["a", "b", "c"], enc.encode)
+    cache = QueryEmbeddingCache(tmp_path / "q.db", max_disk_entries=4)
+    cache.encode("m", ["d"], enc.encode)
+    other.encode("m", ["e"], enc.encode)  # hitungan lokal "other" 4, padahal di disk 5
+    assert other._db().execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0] == 4
+
+
+def test_legacy_file_without_last_used_is_migrated(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "q.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE query_embeddings (model TEXT NOT NULL, text TEXT NOT NULL, dim INTEGER NOT NULL, "
+        "embedding BLOB NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (model, text))"
+    )
+    conn.execute("INSERT INTO query_embeddings VALUES ('m', 'lama', 3, ?, 1.0)", (np.ones(3, np.float32).tobytes(),))
+    conn.commit()
+    conn.close()
+    cache = QueryEmbeddingCache(path, max_disk_entries=2)
+    assert np.array_equal(cache.encode("m", ["lama"], CountingEncoder().encode)[0], np.ones(3))
+    assert cache.stats()["disk_entries"] == 1
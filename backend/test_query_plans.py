@@ -0,0 +1,101 @@
+"""
+Regression test: setiap query SQL di main.py, auth.py dan routes/progress.py
+harus memakai index (tidak boleh full table scan).
+
+Jalankan dari root repo:
+    python -m pytest backend/test_query_plans.py
+"""
+from __future__ import annotations
+
+import ast
+import re
+import threading
+from pathlib import Path
+
+import pytest
+
+from backend import db
+
+BACKEND_DIR = Path(__file__).resolve().parent
+SOURCES = ["main.py", "auth.py", "routes/progress.py"]
+_SQL_START = re.compile(r"^\s*(SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+# "SCAN tabel" tanpa index = full table scan ("SCAN ... USING INDEX" masih oke)
+_FULL_SCAN = re.compile(r"^SCAN (\w+)\b(?! USING (COVERING )?INDEX)")
+
+
+def _collect_queries():
+    out = []
+    for rel in SOURCES:
+        tree = ast.parse((BACKEND_DIR / rel).read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and _SQL_START.match(node.value):
+                out.append(pytest.param(node.value, id=f"{rel}:{node.lineno}"))
+    return out
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    db.configure_pool(tmp_path_factory.mktemp("db") / "plan.db", size=2)
+    db.init_db()
+    c = db.get_conn()
+    yield c
+    c.close()
+    db.close_pool()
+
+
+def test_queries_collected():
+    assert len(_collect_queries()) >= 10
+
+
+def test_migrations_are_recorded(conn):
+    assert db.schema_version(conn) == db.MIGRATIONS[-1][0]
+    # menjalankan ulang tidak mengubah apa pun
+    assert db.migrate() == db.MIGRATIONS[-1][0]
+
+
+@pytest.mark.parametrize("sql", _collect_queries())
+def test_query_uses_index(conn, sql):
+    params = (None,) * sql.count("?")
+    plan = [row["detail"] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    scans = [d for d in plan if _FULL_SCAN.match(d)]
+    assert not scans, f"Full table scan: {scans}\n{sql}"
+
+
+@pytest.mark.parametrize("detail,full", [
+    ("SCAN progress", True),
+    ("SCAN progress USING INDEX idx_progress_email_course", False),
+    ("SCAN progress USING COVERING INDEX idx_progress_email_updated", False),
+    ("SEARCH progress USING INDEX idx_progress_email_course (email=?)", False),
+])
+def test_full_scan_pattern(detail, full):
+    assert bool(_FULL_SCAN.match(detail)) is full
+
+
+def test_concurrent_migrate_applies_each_version_once(tmp_path, monkeypatch):
+    # tabel dasar tanpa migrasi, lalu beberapa "worker" migrasi bersamaan
+    db.configure_pool(tmp_path / "race.db", size=6)
+    with monkeypatch.context() as m:
+        m.setattr(db, "migrate", lambda: 0)
+        db.init_db()
+    start = threading.Barrier(6)
+    errors = []
+
+    def worker():
+        start.wait()
+        try:
+            db.migrate()
+        except Exception as e:  # pragma: no cover - hanya terjadi jika ada race
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    try:
+        assert not errors
+        c = db.get_conn()
+        assert db.schema_version(c) == db.MIGRATIONS[-1][0]
+        c.close()
+    finally:
+        db.close_pool()
@@ -0,0 +1,144 @@
+"""
+Test stok soal pre-generate (ml/question_pool.py) dengan generator palsu.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_question_pool.py
+"""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+
+import pytest
+
+from backend import db
+from backend.ml.question_pool import QuestionPool, validate_question
+
+
+def _fake_generator(calls):
+    counter = itertools.count()
+
+    def generate(subskill, n):
+        calls.append((subskill, n))
+        return [
+            {
+                "question": f"{subskill} soal {next(counter)}?",
+                "options": ["A. satu", "B. dua", "C. tiga", "D. empat"],
+                "answer": "B",
+            }
+            for _ in range(n)
+        ]
+
+    return generate
+
+
+@pytest.fixture
+def pool(tmp_path):
+    db.configure_pool(tmp_path / "pool.db", size=2)
+    db.init_db()
+    calls = []
+    p = QuestionPool(generator=_fake_generator(calls), target=6, refill_at=3, batch=4, interval=0.05)
+    p.calls = calls
+    yield p
+    p.stop()
+    db.close_pool()
+
+
+def test_validate_question():
+    good = {"question": "Apa?", "options": ["A. a", "B. b", "C. c", "D. d"], "answer": "C"}
+    assert validate_question(good)
+    assert not validate_question(dict(good, options=good["options"][:3]))
+    assert not validate_question(dict(good, options=["B. a", "A. b", "C. c", "D. d"]))
+    assert not validate_question(dict(good, answer="E"))
+    assert not validate_question(dict(good, question="  "))
+
+
+def test_refill_only_demanded_subskills_up_to_target(pool):
+    assert pool.refill_once() == 0
+    pool.record_demand("Python  Dasar")
+    assert pool.refill_once() == 6
+    assert pool.inventory("python dasar") == {"python dasar": 6}
+    # batch dibatasi sisa kebutuhan menuju target
+    assert pool.calls == [("Python  Dasar", 4), ("Python  Dasar", 2)]
+    # stok di atas ambang: tidak ada generate baru
+    assert pool.refill_once() == 0
+
+
+def test_take_consumes_stock_and_triggers_refill(pool):
+    pool.record_demand("SQL")
+    pool.refill_once()
+    taken = pool.take("sql", 4)
+    assert len(taken) == 4 and all(validate_question(q) for q in taken)
+    assert len({q["question"] for q in taken}) == 4
+    assert pool.inventory("SQL") == {"sql": 2}
+    assert pool.refill_once() == 4
+    assert pool.stats()["served"] == 4
+
+
+def test_invalid_questions_rejected(pool):
+    pool._generator = lambda subskill, n: [{"question": "Rusak?", "options": ["A. x"], "answer": "A"}] * n
+    pool.record_demand("Git")
+    assert pool.refill_once() == 0
+    assert pool.stats()["rejected"] > 0 and pool.stats()["failures"] == 1
+    # subskill yang gagal tidak dicoba lagi sebelum jeda retry
+    assert pool.needs_refill() == []
+
+
+def test_worker_thread_fills_pool_after_demand(pool):
+    pool.start()
+    pool.record_demand("Docker")
+    for _ in range(100):
+        if pool.inventory("Docker").get("docker") == 6:
+            break
+        time.sleep(0.02)
+    assert pool.inventory("Docker") == {"docker": 6}
+    assert pool.stats()["running"]
+
+
+def test_only_lease_holder_refills(pool):
+    calls = []
+    other = QuestionPool(generator=_fake_generator(calls), target=6, refill_at=3, batch=4, interval=0.05)
+    pool.record_demand("Kotlin")
+    assert pool.refill_once() == 6
+    pool.take("kotlin", 6)
+    # worker lain (proses lain) tidak mengisi selama lease masih dipegang
+    assert other.refill_once() == 0
+    assert calls == [] and other.stats()["skipped"] == 1 and not other.leader
+    assert pool.refill_once() == 6 and pool.leader
+
+
+def test_expired_or_released_lease_is_taken_over(pool):
+    other = QuestionPool(generator=_fake_generator([]), target=6, refill_at=3, batch=4, interval=0.05)
+    pool.lease_ttl = 0.05
+    pool.record_demand("Swift")
+    assert pool.acquire_lease()
+    assert not other.acquire_lease()
+    time.sleep(0.1)
+    # pemegang lama "mati": lease kedaluwarsa dan diambil alih
+    assert other.acquire_lease()
+    assert not pool.acquire_lease()
+    other.release_lease()
+    assert pool.acquire_lease()
+
+
+def test_concurrent_workers_generate_once(pool):
+    calls = []
+    pools = [
+        QuestionPool(generator=_fake_generator(calls), target=6, refill_at=3, batch=6, interval=0.05)
+        for _ in range(4)
+    ]
+    pool.record_demand("Rust")
+    barrier = threading.Barrier(len(pools))
+
+    def run(p):
+        barrier.wait()
+        p.refill_once()
+
+    threads = [threading.Thread(target=run, args=(p,)) for p in pools]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [("Rust", 6)]
+    assert sum(p.leader for p in pools) == 1
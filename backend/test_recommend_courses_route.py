@@ -0,0 +1,90 @@
+"""
+Test endpoint /ml-advanced/recommend_courses_st/batch: butuh autentikasi, validasi
+ukuran batch, dan hasil per query sama dengan recommend().
+
+Jalankan dari root repo:
+    python -m pytest backend/test_recommend_courses_route.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.auth import user_from_auth
+from backend.ml import course_recommender as cr
+from backend.ml.query_embedding_cache import QueryEmbeddingCache
+from backend.routes import ml_advanced
+from backend.utils.fast_json import frame_records
+
+
+class HashEncoder:
+    def encode(self, texts, **kwargs):
+        rng = [np.random.default_rng(abs(hash(t)) % 2**32) for t in texts]
+        return np.stack([r.normal(size=16) for r in rng])
+
+
+@pytest.fixture
+def recommender(tmp_path, monkeypatch):
+    monkeypatch.setattr(cr, "EMBEDDING_STORE_PATH", tmp_path / "c.emb")
+    monkeypatch.setattr(cr, "SENTENCE_TRANSFORMER_AVAILABLE", True)
+    monkeypatch.setattr(cr, "query_embedding_cache", QueryEmbeddingCache(path=None))
+    rec = cr.CourseRecommenderST()
+    rec.model = HashEncoder()
+    n = 30
+    rec.lp_combined = pd.DataFrame({
+        "course_name": [f"Kursus {i}" for i in range(n)],
+        "learning_path": pd.Categorical([["AI Engineer", "Data Scientist"][i % 2] for i in range(n)]),
+        "course_level": pd.Categorical([cr.LEVELS[i % 3] for i in range(n)]),
+        "course_price": [float(i) if i % 4 else np.nan for i in range(n)],
+        "combined_text": [f"kursus {i}" for i in range(n)],
+    })
+    rec.refresh_embeddings()
+    monkeypatch.setattr(ml_advanced, "get_course_recommender", lambda: rec)
+    return rec
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(ml_advanced.router)
+    return app, TestClient(app)
+
+
+URL = "/ml-advanced/recommend_courses_st/batch"
+
+
+def test_batch_requires_auth(recommender, client):
+    _, http = client
+    body = {"queries": [{"user_input": "AI Engineer"}]}
+    assert http.post(URL, json=body).status_code == 401
+    assert http.post(URL, json=body, headers={"Authorization": "Bearer tidak-ada"}).status_code == 401
+
+
+def test_batch_matches_single_recommend(recommender, client):
+    app, http = client
+    app.dependency_overrides[user_from_auth] = lambda: "a@example.com"
+    queries = [
+        {"user_input": "AI Engineer", "user_level": "Beginner"},
+        {"user_input": "Data Scientist"},
+        {"user_input": "belajar apa saja", "user_level": "Advanced"},
+    ]
+    resp = http.post(URL, json={"queries": queries, "top_k": 4})
+    assert resp.status_code == 200
+    results = resp.json()["results"]
+    assert len(results) == 3
+    for q, got in zip(queries, results):
+        expected = frame_records(recommender.recommend(q["user_input"], q.get("user_level"), top_k=4))
+        # NaN harga menjadi null di JSON
+        expected = [{k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in r.items()} for r in expected]
+        assert got["courses"] == expected
+
+
+def test_batch_validates_size(recommender, client):
+    app, http = client
+    app.dependency_overrides[user_from_auth] = lambda: "a@example.com"
+    assert http.post(URL, json={"queries": []}).status_code == 422
+    assert http.post(URL, json={"queries": [{"user_input": "x"}] * 5001}).status_code == 422
+    assert http.post(URL, json={"queries": [{"user_input": "x"}], "top_k": 51}).status_code == 422
@@ -0,0 +1,129 @@
+"""
+Test cache jawaban LLM (llm/response_cache.py): exact hit, TTL, eviction LRU,
+scope lookup semantik dan cached_call_async.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_response_cache.py
+"""
+from __future__ import annotations
+
+import asyncio
+
+import numpy as np
+import pytest
+
+from backend.llm import response_cache as rc
+from backend.llm.response_cache import ResponseCache
+
+
+MODEL = "gemini-test"
+
+
+def _cache(tmp_path, **kwargs):
+    return ResponseCache(tmp_path / "llm_cache.db", **kwargs)
+
+
+def test_exact_hit_ignores_whitespace_and_case(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put("bot_reply", MODEL, "Apa itu  Python?", "bahasa pemrograman")
+    assert cache.get("bot_reply", MODEL, "apa itu python?\n") == "bahasa pemrograman"
+    assert cache.get("bot_reply", "model-lain", "apa itu python?") is None
+    stats = cache.stats()["call_sites"]["bot_reply"]
+    assert stats["hits"] == 1 and stats["misses"] == 1
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    cache = _cache(tmp_path, ttls={"bot_reply": 10})
+    cache.put("bot_reply", MODEL, "p", "r")
+    now[0] += 9
+    assert cache.get("bot_reply", MODEL, "p") == "r"
+    now[0] += 2
+    assert cache.get("bot_reply", MODEL, "p") is None
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    cache = _cache(tmp_path, max_entries=2)
+    for p in ("a", "b"):
+        now[0] += 1
+        cache.put("bot_reply", MODEL, p, p)
+    now[0] += 1
+    cache.get("bot_reply", MODEL, "a")  # "b" jadi yang paling lama tidak dipakai
+    now[0] += 1
+    cache.put("bot_reply", MODEL, "c", "c")
+    assert cache.get("bot_reply", MODEL, "b") is None
+    assert cache.get("bot_reply", MODEL, "a") == "a"
+    assert cache.stats()["entries"] == 2 and cache.evictions == 1
+
+    small = _cache(tmp_path / "bytes", max_bytes=10)
+    small.put("bot_reply", MODEL, "x", "12345")
+    small.put("bot_reply", MODEL, "y", "123456")
+    assert small.get("bot_reply", MODEL, "x") is None
+    assert small.get("bot_reply", MODEL, "y") == "123456"
+
+
+def test_put_skips_eviction_queries_under_limit(tmp_path):
+    cache = _cache(tmp_path, purge_interval=3600)
+    cache.put("bot_reply", MODEL, "pertama", "r")  # purge pertama + sinkron hitungan
+    statements = []
+    cache._db().set_trace_callback(statements.append)
+    for i in range(5):
+        cache.put("bot_reply", MODEL, f"p{i}", "r")
+    # replace entri yang sama tidak menambah jumlah entri
+    cache.put("bot_reply", MODEL, "p0", "lebih panjang")
+    assert not [s for s in statements if "COUNT(" in s or "ORDER BY last_used" in s]
+    assert cache._entries == 6
+    assert cache._bytes == sum(len(r) for r in ["r"] * 5 + ["lebih panjang"])
+
+
+def _embedder(text):
+    # vektor deterministik: pertanyaan yang "mirip" berbagi arah yang sama
+    vectors = {
+        "cara belajar python": [1.0, 0.0, 0.0],
+        "bagaimana cara belajar python": [0.99, 0.05, 0.0],
+        "cara memasak rendang": [0.0, 1.0, 0.0],
+    }
+    return np.array(vectors[text], dtype=np.float32)
+
+
+def test_semantic_hit_only_within_same_scope(tmp_path):
+    cache = _cache(tmp_path, embedder=_embedder, sim_threshold=0.95)
+
+    def prompt(persona, question):
+        return f"Persona: {persona}\nPertanyaan: {question}"
+
+    q = "cara belajar python"
+    cache.put("bot_reply", MODEL, prompt("pemula", q), "mulai dari dasar", semantic_text=q)
+    near = "bagaimana cara belajar python"
+    assert cache.get("bot_reply", MODEL, prompt("pemula", near), near) == "mulai dari dasar"
+    # konteks lain (persona) berbeda → scope berbeda → tidak boleh hit
+    assert cache.get("bot_reply", MODEL, prompt("senior", near), near) is None
+    far = "cara memasak rendang"
+    assert cache.get("bot_reply", MODEL, prompt("pemula", far), far) is None
+    assert cache.stats()["call_sites"]["bot_reply"]["semantic_hits"] == 1
+
+
+def test_cached_call_async(tmp_path):
+    cache = _cache(tmp_path)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        return "jawaban"
+
+    async def broken():
+        raise RuntimeError("gagal")
+
+    async def scenario():
+        first = await cache.cached_call_async("bot_reply", MODEL, "p", fn)
+        second = await cache.cached_call_async("bot_reply", MODEL, "p", fn)
+        with pytest.raises(RuntimeError):
+            await cache.cached_call_async("bot_reply", MODEL, "q", broken)
+        return first, second
+
+    assert asyncio.run(scenario()) == ("jawaban", "jawaban")
+    assert calls == [1]
+    assert cache.get("bot_reply", MODEL, "q") is None
@@ -0,0 +1,105 @@
+"""
+Test vector index (ml/vector_index.py): brute force vs IVF, filter, insert
+incremental dan persistensi.
+
+Jalankan dari root repo:
+    python -m pytest backend/test_vector_index.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from backend.ml.embedding_index import EmbeddingIndex
+from backend.ml.vector_index import BruteForceIndex, IVFIndex, VectorIndex, build_index, load_index
+
+PATHS = ["AI Engineer", "Data Scientist", "React Developer", "iOS Developer"]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(2)
+    centers = rng.normal(size=(40, 32))
+    labels = rng.integers(0, 40, size=4000)
+    vectors = (centers[labels] + 0.5 * rng.normal(size=(4000, 32))).astype(np.float32)
+    paths = [PATHS[c % 4] for c in labels]
+    levels = [LEVELS[i % 3] for i in range(4000)]
+    queries = centers[rng.integers(0, 40, size=50)] + 0.7 * rng.normal(size=(50, 32))
+    return vectors, paths, levels, queries
+
+
+def _recall(a, b):
+    return np.mean([len(set(x.tolist()) & set(y.tolist())) / len(y) for x, y in zip(a, b)])
+
+
+def test_brute_matches_embedding_index(data):
+    vectors, paths, levels, queries = data
+    brute = build_index(vectors, paths, levels, kind="brute")
+    ref = EmbeddingIndex(vectors, paths, levels)
+    for q in queries[:10]:
+        for lp, lv in [(None, None), ("AI Engineer", None), ("Data Scientist", "advanced")]:
+            assert brute.search(q, 7, lp, lv)[0].tolist() == ref.search(q, 7, lp, lv)[0].tolist()
+
+
+@pytest.mark.parametrize("lp,level", [(None, None), ("React Developer", None), ("AI Engineer", "Beginner")])
+def test_ivf_recall_and_filters(data, lp, level):
+    vectors, paths, levels, queries = data
+    brute = build_index(vectors, paths, levels, kind="brute")
+    ivf = build_index(vectors, paths, levels, kind="ivf", nprobe=8, exact_below=0)
+    assert ivf.trained and ivf.nlist > 1
+    exact = [brute.search(q, 10, lp, level)[0] for q in queries]
+    approx = [ivf.search(q, 10, lp, level)[0] for q in queries]
+    assert _recall(approx, exact) >= 0.9
+    for ids in approx:
+        assert all(lp is None or paths[i] == lp for i in ids)
+        assert all(level is None or levels[i] == level for i in ids)
+
+
+def test_incremental_insert_after_training(data):
+    vectors, paths, levels, _ = data
+    ivf = IVFIndex(32, nlist=16, train_min=1000)
+    ivf.add(vectors[:500], paths[:500], levels[:500])
+    assert not ivf.trained
+    ivf.add(vectors[500:1500], paths[500:1500], levels[500:1500])
+    assert ivf.trained and len(ivf) == 1500
+    new = np.zeros((1, 32), dtype=np.float32)
+    new[0, 3] = 1.0
+    (new_id,) = ivf.add(new, ["Gen AI Engineer"], ["Advanced"]).tolist()
+    ids, scores = ivf.search(new[0], 1, "Gen AI Engineer")
+    assert ids.tolist() == [new_id] and scores[0] == pytest.approx(1.0)
+    assert ivf.search(new[0], 5)[0][0] == new_id
+
+    brute = BruteForceIndex(32)
+    for start in range(0, 300, 10):
+        brute.add(vectors[start:start + 10], paths[start:start + 10], levels[start:start + 10])
+    assert len(brute) == 300 and np.allclose(np.linalg.norm(brute.vectors, axis=1), 1.0, atol=1e-5)
+
+
+@pytest.mark.parametrize("kind", ["brute", "ivf"])
+def test_save_and_load(tmp_path, data, kind):
+    vectors, paths, levels, queries = data
+    index = build_index(vectors, paths, levels, kind=kind)
+    path = index.save(tmp_path / f"{kind}.npz")
+    loaded = load_index(path)
+    assert type(loaded) is type(index) and len(loaded) == len(index)
+    if kind == "ivf":
+        assert np.array_equal(loaded.centroids, index.centroids)
+    for q in queries[:5]:
+        for lp, lv in [(None, None), ("iOS Developer", "intermediate")]:
+            assert loaded.search(q, 10, lp, lv)[0].tolist() == index.search(q, 10, lp, lv)[0].tolist()
+
+
+def test_score_many_matches_search(data):
+    vectors, paths, levels, queries = data
+    brute = build_index(vectors, paths, levels, kind="brute")
+    qs = queries[:3] / np.linalg.norm(queries[:3], axis=1, keepdims=True)
+    scores = brute.score_many(qs.astype(np.float32))
+    for q, row in zip(qs, scores):
+        ids, top = brute.search(q, 5)
+        assert np.allclose(row[ids], top, atol=1e-5)
+
+
+def test_base_index_is_abstract():
+    with pytest.raises(TypeError):
+        VectorIndex(8)
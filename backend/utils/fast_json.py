@@ -0,0 +1,87 @@
+"""
+Encoding JSON cepat untuk response rekomendasi.
+
+DataFrame / array NumPy langsung di-encode ke bytes dengan orjson: nilai per kolom
+diambil sebagai list native (tolist di C), NaN/Infinity menjadi null, tanpa salinan
+DataFrame dan tanpa serialisasi ulang oleh FastAPI. Tanpa orjson, jatuh ke json
+standar dengan sanitasi NaN/Infinity yang sama.
+"""
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+
+def _column_values(series: pd.Series) -> List[Any]:
+    if isinstance(series.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return [None if pd.isna(v) else v.isoformat() for v in series]
+    if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype == object:
+        return series.astype(object).tolist()
+    # numerik / bool: tolist() menghasilkan float/int/bool native (NaN tetap float -> null)
+    return series.to_numpy().tolist()
+
+
+def frame_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Setara df.to_dict('records') tapi per kolom, tanpa copy/replace/where."""
+    columns = [str(c) for c in df.columns]
+    values = [_column_values(df.iloc[:, i]) for i in range(df.shape[1])]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, pd.DataFrame):
+        return frame_records(obj)
+    if isinstance(obj, pd.Series):
+        return _column_values(obj)
+    if isinstance(obj, (pd.Timestamp,)):
+        return None if pd.isna(obj) else obj.isoformat()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipe {type(obj).__name__} tidak bisa di-encode ke JSON")
+
+
+def _sanitize(obj: Any) -> Any:
+    # hanya untuk fallback json standar (orjson sudah mengubah NaN/Infinity jadi null)
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_sanitize(v) for v in obj]
+    try:
+        return _sanitize(_default(obj))
+    except TypeError:
+        return obj
+
+
+def dumps(content: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        )
+    return json.dumps(_sanitize(content), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse yang body-nya langsung di-encode oleh dumps()."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
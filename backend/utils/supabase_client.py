@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
 import httpx
 
+try:  # HTTP/2 butuh paket h2 (httpx[http2])
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
 
 SUPABASE_URL = os.getenv(
     "SUPABASE_REST_URL",
@@ -13,6 +28,10 @@ SUPABASE_KEY = os.getenv(
     "SUPABASE_ANON_KEY",
     "sb_publishable_h889CjrPIGwCMA9I4oTTaA_2L22Y__R",
 )
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "15"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+SUPABASE_KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "60"))
 
 
 def _headers() -> Dict[str, str]:
@@ -30,26 +49,362 @@ def _build_params(params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
     return q
 
 
+def _client_kwargs() -> Dict[str, Any]:
+    return {
+        "headers": _headers(),
+        "timeout": SUPABASE_TIMEOUT,
+        "http2": HTTP2_AVAILABLE,
+        "limits": httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+# Satu client per proses supaya koneksi TCP+TLS ke Supabase dipakai ulang.
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(**_client_kwargs())
+    return _client
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**_client_kwargs())
+    return _async_client
+
+
+async def startup() -> None:
+    """Dipanggil saat aplikasi start: siapkan pool koneksi async."""
+    get_async_client()
+
+
+async def shutdown() -> None:
+    """Dipanggil saat aplikasi berhenti: tutup semua koneksi yang masih terbuka."""
+    global _client, _async_client
+    catalog_cache.shutdown()
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
 def get_table(table: str, params: Optional[Dict[str, Any]] = None):
     url = f"{SUPABASE_URL}/{table}"
-    with httpx.Client(timeout=15) as client:
-        r = client.get(url, headers=_headers(), params=_build_params(params))
-        r.raise_for_status()
-        return r.json()
+    r = get_client().get(url, params=_build_params(params))
+    r.raise_for_status()
+    return r.json()
+
+
+async def get_table_async(table: str, params: Optional[Dict[str, Any]] = None):
+    url = f"{SUPABASE_URL}/{table}"
+    r = await get_async_client().get(url, params=_build_params(params))
+    r.raise_for_status()
+    return r.json()
+
+
+# -------- Cache katalog --------
+# Tabel katalog jarang berubah: layani dari memori selama TTL, setelah itu tetap layani
+# data basi sambil refresh di background (stale-while-revalidate). Miss yang bersamaan
+# untuk key yang sama hanya memicu satu request (single-flight). Setiap hasil fetch
+# disimpan ke disk supaya worker yang baru start bisa langsung melayani.
+
+CATALOG_TTLS = {
+    "courses": float(os.getenv("CATALOG_TTL_COURSES", "600")),
+    "learning_paths": float(os.getenv("CATALOG_TTL_LEARNING_PATHS", "3600")),
+    "course_levels": float(os.getenv("CATALOG_TTL_COURSE_LEVELS", "86400")),
+    "tutorials": float(os.getenv("CATALOG_TTL_TUTORIALS", "3600")),
+}
+CATALOG_DEFAULT_TTL = float(os.getenv("CATALOG_TTL_DEFAULT", "600"))
+# Setelah TTL + MAX_STALE data dianggap kedaluwarsa dan request menunggu fetch baru
+CATALOG_MAX_STALE = float(os.getenv("CATALOG_MAX_STALE", "86400"))
+CATALOG_SNAPSHOT_DIR = Path(
+    os.getenv("CATALOG_SNAPSHOT_DIR", str(Path(__file__).resolve().parents[1] / "data" / "catalog_snapshot"))
+)
+
+_CacheKey = Tuple[str, str]
+
+
+@dataclass
+class _CatalogEntry:
+    data: Any
+    fetched_at: float
+    from_snapshot: bool = False
+
+
+class CatalogCache:
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = CATALOG_DEFAULT_TTL,
+        max_stale: float = CATALOG_MAX_STALE,
+        snapshot_dir: Optional[Path] = CATALOG_SNAPSHOT_DIR,
+    ):
+        self.ttls = dict(CATALOG_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.max_stale = max_stale
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self._entries: Dict[_CacheKey, _CatalogEntry] = {}
+        self._lock = threading.Lock()
+        self._inflight_async: Dict[_CacheKey, "asyncio.Future"] = {}
+        self._inflight_sync: Dict[_CacheKey, Future] = {}
+        self._revalidating: set = set()
+        self._background: set = set()
+        # satu worker untuk revalidasi sync di background, dipakai ulang antar request
+        self._refresher: Optional[ThreadPoolExecutor] = None
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "stale_hits": 0, "misses": 0, "fetches": 0, "errors": 0}
+        )
+
+    # ---- helpers ----
+    @staticmethod
+    def _key(table: str, params: Optional[Dict[str, Any]]) -> _CacheKey:
+        return table, json.dumps(_build_params(params), sort_keys=True, default=str)
+
+    def _count(self, table: str, field: str) -> None:
+        with self._lock:
+            self._stats[table][field] += 1
+
+    def _snapshot_path(self, key: _CacheKey) -> Optional[Path]:
+        if self.snapshot_dir is None:
+            return None
+        digest = hashlib.sha1(key[1].encode("utf-8")).hexdigest()[:12]
+        return self.snapshot_dir / f"{key[0]}-{digest}.json"
+
+    def _memory(self, key: _CacheKey) -> Optional[_CatalogEntry]:
+        with self._lock:
+            return self._entries.get(key)
+
+    def _lookup(self, key: _CacheKey) -> Optional[_CatalogEntry]:
+        entry = self._memory(key)
+        if entry is not None:
+            return entry
+        path = self._snapshot_path(key)
+        if path is None:
+            return None
+        try:
+            raw = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        entry = _CatalogEntry(raw["data"], float(raw["fetched_at"]), from_snapshot=True)
+        with self._lock:
+            self._entries.setdefault(key, entry)
+        return entry
+
+    def _state(self, table: str, entry: Optional[_CatalogEntry]) -> str:
+        if entry is None:
+            return "missing"
+        age = time.time() - entry.fetched_at
+        ttl = self.ttls.get(table, self.default_ttl)
+        if age < ttl and not entry.from_snapshot:
+            return "fresh"
+        # snapshot dari disk selalu boleh dilayani dulu, lalu diperbarui
+        if entry.from_snapshot or age < ttl + self.max_stale:
+            return "stale"
+        return "expired"
+
+    def _remember(self, key: _CacheKey, data: Any) -> _CatalogEntry:
+        entry = _CatalogEntry(data, time.time())
+        with self._lock:
+            self._entries[key] = entry
+            self._stats[key[0]]["fetches"] += 1
+        return entry
+
+    def _store(self, key: _CacheKey, data: Any) -> None:
+        self._write_snapshot(key, self._remember(key, data))
+
+    def _write_snapshot(self, key: _CacheKey, entry: _CatalogEntry) -> None:
+        path = self._snapshot_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(
+                json.dumps({"table": key[0], "params": key[1], "fetched_at": entry.fetched_at, "data": entry.data}),
+                encoding="utf-8",
+            )
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"Gagal menyimpan snapshot katalog {key[0]}: {e}")
+
+    # ---- async ----
+    async def _fetch_async(self, key: _CacheKey, params: Optional[Dict[str, Any]]):
+        data = await get_table_async(key[0], params)
+        entry = self._remember(key, data)
+        if self.snapshot_dir is not None:
+            # tulis snapshot di thread, event loop tidak menunggu disk
+            write = asyncio.get_running_loop().run_in_executor(None, self._write_snapshot, key, entry)
+            self._background.add(write)
+            write.add_done_callback(self._background.discard)
+        return data
+
+    def _refresh_async(self, key: _CacheKey, params: Optional[Dict[str, Any]]) -> "asyncio.Future":
+        fut = self._inflight_async.get(key)
+        if fut is None or fut.done():
+            fut = asyncio.ensure_future(self._fetch_async(key, params))
+            self._inflight_async[key] = fut
+            self._background.add(fut)
+            # dipasang sekali per fetch: satu fetch gagal = satu error, berapa pun yang menunggu
+            fut.add_done_callback(lambda f, k=key: self._fetch_done(k, f))
+        return fut
+
+    def _fetch_done(self, key: _CacheKey, fut: "asyncio.Future") -> None:
+        if self._inflight_async.get(key) is fut:
+            self._inflight_async.pop(key, None)
+        self._background.discard(fut)
+        if not fut.cancelled() and fut.exception() is not None:
+            self._count(key[0], "errors")
+
+    def _revalidate_async(self, key: _CacheKey, params: Optional[Dict[str, Any]]) -> None:
+        self._refresh_async(key, params)
+
+    async def get_async(self, table: str, params: Optional[Dict[str, Any]] = None):
+        key = self._key(table, params)
+        entry = self._memory(key)
+        if entry is None and self.snapshot_dir is not None:
+            # baca snapshot dari disk juga di luar event loop
+            entry = await asyncio.get_running_loop().run_in_executor(None, self._lookup, key)
+        state = self._state(table, entry)
+        if state == "fresh":
+            self._count(table, "hits")
+            return entry.data
+        if state == "stale":
+            self._count(table, "stale_hits")
+            self._revalidate_async(key, params)
+            return entry.data
+        self._count(table, "misses")
+        try:
+            return await asyncio.shield(self._refresh_async(key, params))
+        except Exception:
+            if entry is None:
+                raise
+            # Supabase gangguan: lebih baik data lama daripada error (error dihitung di _fetch_done)
+            return entry.data
+
+    # ---- sync ----
+    def _refresh_sync(self, key: _CacheKey, params: Optional[Dict[str, Any]]):
+        with self._lock:
+            fut = self._inflight_sync.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight_sync[key] = fut
+        if owner:
+            try:
+                data = get_table(key[0], params)
+                self._store(key, data)
+                fut.set_result(data)
+            except Exception as e:
+                self._count(key[0], "errors")
+                fut.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight_sync.pop(key, None)
+        return fut.result()
+
+    def _revalidate_sync(self, key: _CacheKey, params: Optional[Dict[str, Any]]) -> None:
+        # cek + tandai atomik: stale hit beruntun untuk key sama hanya menjadwalkan satu refresh
+        with self._lock:
+            if key in self._inflight_sync or key in self._revalidating:
+                return
+            self._revalidating.add(key)
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="catalog-refresh")
+            refresher = self._refresher
+
+        def run():
+            try:
+                self._refresh_sync(key, params)
+            except Exception:
+                pass  # sudah dihitung sebagai error di _refresh_sync
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        refresher.submit(run)
+
+    def get(self, table: str, params: Optional[Dict[str, Any]] = None):
+        key = self._key(table, params)
+        entry = self._lookup(key)
+        state = self._state(table, entry)
+        if state == "fresh":
+            self._count(table, "hits")
+            return entry.data
+        if state == "stale":
+            self._count(table, "stale_hits")
+            self._revalidate_sync(key, params)
+            return entry.data
+        self._count(table, "misses")
+        try:
+            return self._refresh_sync(key, params)
+        except Exception:
+            if entry is None:
+                raise
+            return entry.data
+
+    def shutdown(self) -> None:
+        with self._lock:
+            refresher, self._refresher = self._refresher, None
+        if refresher is not None:
+            refresher.shutdown(wait=False, cancel_futures=True)
+
+    def invalidate(self, table: Optional[str] = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if table is None or k[0] == table]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "tables": {t: dict(v) for t, v in self._stats.items()},
+            }
+
+
+catalog_cache = CatalogCache()
 
 
 def get_courses(params: Optional[Dict[str, Any]] = None):
-    return get_table("courses", params)
+    return catalog_cache.get("courses", params)
 
 
 def get_learning_paths(params: Optional[Dict[str, Any]] = None):
-    return get_table("learning_paths", params)
+    return catalog_cache.get("learning_paths", params)
 
 
 def get_course_levels(params: Optional[Dict[str, Any]] = None):
-    return get_table("course_levels", params)
+    return catalog_cache.get("course_levels", params)
 
 
 def get_tutorials(params: Optional[Dict[str, Any]] = None):
-    return get_table("tutorials", params)
+    return catalog_cache.get("tutorials", params)
+
+
+async def get_courses_async(params: Optional[Dict[str, Any]] = None):
+    return await catalog_cache.get_async("courses", params)
+
+
+async def get_learning_paths_async(params: Optional[Dict[str, Any]] = None):
+    return await catalog_cache.get_async("learning_paths", params)
+
+
+async def get_course_levels_async(params: Optional[Dict[str, Any]] = None):
+    return await catalog_cache.get_async("course_levels", params)
+
 
+async def get_tutorials_async(params: Optional[Dict[str, Any]] = None):
+    return await catalog_cache.get_async("tutorials", params)